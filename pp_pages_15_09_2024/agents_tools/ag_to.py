@@ -1,34 +1,249 @@
 import streamlit as st
-from langchain_openai import ChatOpenAI
-from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict
 import pandas as pd
+from utils.dataset import copia_isolada, dataset_tipado
+from utils.perfil import perfil_dataset
+from utils.metricas import metricas
+from utils.visoes import impressao_dataset
 
+# Quantos agentes (dataset, modelo) ficam prontos na memória do servidor
+MAX_AGENTES = 4
+
+# Limites de cada resposta: rodadas de ferramenta e tempo total em segundos
+MAX_ITERACOES_AGENTE = 10
+TEMPO_MAXIMO_AGENTE = 90.0
+
+PREFIXO_AGENTE = "Você é um assistente de análise de dados que responde sempre em português. Sua tarefa é analisar os dados fornecidos e responder às perguntas do usuário de forma clara e concisa em português."
+
+# Linhas de exemplo do df no prompt; o perfil já descreve tipos e distribuições
+LINHAS_EXEMPLO_AGENTE = 3
+
+
+def montar_prefixo(df, incluir_perfil=True):
+    """Prefixo do agente, com o perfil do dataset quando `incluir_perfil`."""
+    if not incluir_perfil:
+        return PREFIXO_AGENTE
+    return (
+        f"{PREFIXO_AGENTE}\n\n"
+        "Antes de usar a ferramenta python, confira se o perfil abaixo já responde à pergunta. "
+        "Use a ferramenta só para cálculos que o perfil não traz.\n\n"
+        f"Perfil dos dados:\n{perfil_dataset(df)}"
+    )
+
+
+def criar_modelo_chat(model_choice):
+    """Modelo de chat para o agente; MODELO_LOCAL usa o modelo local, sem API."""
+    # Os modelos (e o langchain) só são importados quando o primeiro agente é criado
+    from agents_tools.modelo_local import MODELO_LOCAL, ModeloChatLocal
+    if model_choice == MODELO_LOCAL:
+        return ModeloChatLocal()
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(temperature=0, model=model_choice)
+
+
+def criar_agente_dataframe(df, model_choice, chat=None, max_iteracoes=MAX_ITERACOES_AGENTE, tempo_maximo=TEMPO_MAXIMO_AGENTE, incluir_perfil=True):
+    from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 
-def criar_agente_dataframe(df, model_choice):
     # Garantir que df é um DataFrame
     if not isinstance(df, pd.DataFrame):
         df = pd.DataFrame(df)
-    
-    chat = ChatOpenAI(temperature=0, model=model_choice)
+    # O agente trabalha com os tipos reais, nunca com o texto formatado para exibição
+    df = dataset_tipado(df)
+
+    chat = chat if chat is not None else criar_modelo_chat(model_choice)
     agent = create_pandas_dataframe_agent(
         chat,
         df,
         verbose=True,
         agent_type='tool-calling',
-        max_iterations=None,
+        max_iterations=max_iteracoes,
+        max_execution_time=tempo_maximo,
+        early_stopping_method='force',
         allow_dangerous_code=True,
-        prefix="Você é um assistente de análise de dados que responde sempre em português. Sua tarefa é analisar os dados fornecidos e responder às perguntas do usuário de forma clara e concisa em português."
+        number_of_head_rows=LINHAS_EXEMPLO_AGENTE,
+        prefix=montar_prefixo(df, incluir_perfil)
     )
     return agent
 
-def get_or_create_agent(df, model_choice):
-    if "agent" not in st.session_state or st.session_state.agent is None:
-        st.session_state.agent = criar_agente_dataframe(df, model_choice)
+
+class CacheAgentes:
+    """
+    Cache LRU de agentes, por (impressão do dataset, modelo).
+
+    Compartilhado por todas as sessões e páginas do servidor: o mesmo dado com
+    o mesmo modelo reaproveita o agente já criado, e o menos usado sai quando
+    o limite é atingido.
+    """
+
+    def __init__(self, max_agentes=MAX_AGENTES, fabrica=criar_agente_dataframe):
+        self.max_agentes = max_agentes
+        self._fabrica = fabrica
+        self._agentes = OrderedDict()
+        self._lock = threading.Lock()
+        self.criados = 0
+        self.reaproveitados = 0
+
+    def __len__(self):
+        return len(self._agentes)
+
+    def obter(self, df, model_choice, **opcoes):
+        chave = (impressao_dataset(df), model_choice, tuple(sorted(opcoes.items())))
+        with self._lock:
+            agente = self._agentes.get(chave)
+            if agente is not None:
+                self._agentes.move_to_end(chave)
+                self.reaproveitados += 1
+                return agente
+        # Criado fora do lock; cada agente fica com sua própria cópia do df,
+        # então o código que ele executa não altera os dados da sessão
+        agente = self._fabrica(copia_isolada(df), model_choice, **opcoes)
+        with self._lock:
+            self._agentes[chave] = agente
+            self._agentes.move_to_end(chave)
+            self.criados += 1
+            while len(self._agentes) > self.max_agentes:
+                self._agentes.popitem(last=False)
+        return agente
+
+    def limpar(self):
+        with self._lock:
+            self._agentes.clear()
+
+
+cache_agentes = CacheAgentes()
+
+
+def get_or_create_agent(df, model_choice, **opcoes):
+    """
+    Agente para o DataFrame e o modelo atuais.
+
+    Só cria um agente novo quando os dados, o modelo ou as opções (como
+    max_iteracoes e tempo_maximo) mudam; trocar de página ou rodar o script de
+    novo reaproveita o agente do cache.
+    """
+    st.session_state.agent = cache_agentes.obter(df, model_choice, **opcoes)
     return st.session_state.agent
 
-def update_agent(df, model_choice):
-    # Verificar o conteúdo do DataFrame
-    print(df.head())  # Adicione esta linha para depuração
-    st.session_state.agent = criar_agente_dataframe(df, model_choice)
+def update_agent(df, model_choice, **opcoes):
+    return get_or_create_agent(df, model_choice, **opcoes)
+
+
+def limites_agente():
+    """Limites do agente escolhidos na barra lateral, ou os padrões."""
+    return st.session_state.get('limites_agente', {
+        'max_iteracoes': MAX_ITERACOES_AGENTE,
+        'tempo_maximo': TEMPO_MAXIMO_AGENTE,
+    })
+
+
+def nova_resposta():
+    """
+    Cancela a resposta ainda em andamento nesta sessão e devolve o sinal de
+    cancelamento da próxima. Chamado quando o usuário envia uma pergunta nova.
+    """
+    anterior = st.session_state.get('cancelar_resposta')
+    if anterior is not None:
+        anterior.set()
+    st.session_state.cancelar_resposta = threading.Event()
+    return st.session_state.cancelar_resposta
+
+
+def registrar_tokens(mensagem, pedacos=0):
+    """
+    Soma os tokens de uma chamada ao modelo em `metricas`.
+
+    Usa o usage_metadata da mensagem quando o modelo informa; senão, conta
+    cada pedaço do streaming como um token de saída.
+    """
+    uso = getattr(mensagem, 'usage_metadata', None) or {}
+    if uso:
+        metricas.incrementar('agente_tokens_total', uso.get('input_tokens', 0), tipo='entrada')
+        metricas.incrementar('agente_tokens_total', uso.get('output_tokens', 0), tipo='saida')
+    elif pedacos:
+        metricas.incrementar('agente_tokens_total', pedacos, tipo='saida')
+    metricas.incrementar('agente_chamadas_modelo_total')
+
+
+def transmitir_resposta(agent, pergunta, cancelar=None, tempo_maximo=TEMPO_MAXIMO_AGENTE):
+    """
+    Gera o texto da resposta do agente à medida que os tokens chegam.
+
+    O agente roda numa thread própria (astream_events do LangChain) e os
+    tokens passam por uma fila, então o gerador pode ser consumido direto por
+    st.write_stream. Para quando `cancelar` é sinalizado, quando o consumidor
+    deixa de ler (rerun do Streamlit) ou quando `tempo_maximo` se esgota.
+    Agentes sem astream_events são chamados com invoke e a resposta sai inteira.
+    """
+    cancelar = cancelar if cancelar is not None else threading.Event()
+    fila = queue.Queue()
+    fim = object()
+
+    async def consumir_eventos():
+        eventos = agent.astream_events({'input': pergunta}, version='v2')
+        houve_tokens = False
+        pedacos = 0
+        try:
+            async for evento in eventos:
+                if cancelar.is_set():
+                    break
+                if evento['event'] == 'on_chat_model_stream':
+                    pedacos += 1
+                    texto = evento['data']['chunk'].content
+                    if isinstance(texto, str) and texto:
+                        houve_tokens = True
+                        fila.put(texto)
+                elif evento['event'] == 'on_chat_model_end':
+                    registrar_tokens(evento['data'].get('output'), pedacos)
+                    pedacos = 0
+                elif evento['event'] == 'on_chain_end' and not evento.get('parent_ids') and not houve_tokens:
+                    # Resposta final sem tokens (por exemplo, parada forçada pelo limite de iterações)
+                    saida = evento['data'].get('output')
+                    if isinstance(saida, dict) and saida.get('output'):
+                        fila.put(saida['output'])
+        finally:
+            await eventos.aclose()
+
+    def executar():
+        try:
+            if hasattr(agent, 'astream_events'):
+                asyncio.run(consumir_eventos())
+            else:
+                fila.put(agent.invoke({'input': pergunta})['output'])
+        except Exception as e:
+            fila.put(e)
+        finally:
+            fila.put(fim)
+
+    threading.Thread(target=executar, daemon=True).start()
+    concluida = False
+    limite = time.monotonic() + tempo_maximo
+    try:
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                cancelar.set()
+                yield "\n\n_(Tempo limite da resposta atingido.)_"
+                return
+            try:
+                item = fila.get(timeout=min(restante, 0.5))
+            except queue.Empty:
+                if cancelar.is_set():
+                    return
+                continue
+            if item is fim:
+                concluida = True
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Se o consumidor parou antes do fim, a thread do agente também para
+        if not concluida:
+            cancelar.set()
+
 
 # Aqui você pode adicionar mais funções para criar outros tipos de agentes ou ferramentas
@@ -0,0 +1,71 @@
+import json
+import time
+from itertools import cycle
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Nome do modelo local aceito por criar_modelo_chat
+MODELO_LOCAL = "local"
+
+
+class ModeloChatLocal(BaseChatModel):
+    """
+    Modelo de chat local e determinístico, para testes e benchmarks sem API.
+
+    Devolve as respostas da lista `respostas` em ordem, recomeçando do início
+    quando acabam. Uma resposta pode ser texto ou um AIMessage (por exemplo,
+    com tool_calls, para simular o agente chamando a ferramenta python). No
+    modo streaming o texto sai palavra por palavra, com `atraso_token`
+    segundos entre elas; sem streaming o atraso total vem antes da resposta.
+    """
+
+    respostas: List[Any] = ["Resposta do modelo local."]
+    atraso_token: float = 0.0
+    chamadas: int = 0
+    _fila: Any = None
+
+    @property
+    def _llm_type(self):
+        return "modelo-local"
+
+    def bind_tools(self, tools, **kwargs):
+        # As ferramentas não mudam as respostas roteirizadas
+        return self
+
+    def _proxima(self):
+        if self._fila is None:
+            self._fila = cycle(self.respostas)
+        self.chamadas += 1
+        resposta = next(self._fila)
+        return resposta if isinstance(resposta, AIMessage) else AIMessage(content=str(resposta))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        resposta = self._proxima()
+        if self.atraso_token:
+            # Sem streaming o tempo de gerar todos os tokens é pago antes de devolver a resposta
+            time.sleep(self.atraso_token * len(resposta.content.split(" ")))
+        return ChatResult(generations=[ChatGeneration(message=resposta)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        resposta = self._proxima()
+        if resposta.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=resposta.content,
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(resposta.tool_calls)
+                ],
+            ))
+            return
+        palavras = resposta.content.split(" ")
+        for i, palavra in enumerate(palavras):
+            if self.atraso_token:
+                time.sleep(self.atraso_token)
+            texto = palavra if i == len(palavras) - 1 else palavra + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=texto))
+            if run_manager:
+                run_manager.on_llm_new_token(texto, chunk=chunk)
+            yield chunk
@@ -0,0 +1,236 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import pandas as pd
+from agents_tools.ag_to import TEMPO_MAXIMO_AGENTE, impressao_dataset, transmitir_resposta
+from utils.dataset import coluna_numerica
+from utils.metricas import metricas
+
+# Quantas respostas do agente ficam guardadas no servidor
+MAX_RESPOSTAS = 256
+
+# Palavras que podem aparecer numa pergunta respondida sem o agente.
+# Qualquer outra palavra (um filtro, um período, um nome) manda a pergunta para o agente.
+_PALAVRAS_NEUTRAS = {
+    'qual', 'quais', 'e', 'a', 'o', 'as', 'os', 'do', 'da', 'de', 'dos', 'das', 'me', 'diga', 'mostre',
+    'informe', 'calcule', 'liste', 'valor', 'valores', 'preco', 'precos', 'unitario', 'unitarios', 'por',
+    'em', 'no', 'na', 'nos', 'nas', 'cada', 'total', 'geral', 'dados', 'sao', 'ha', 'existem', 'tem',
+    'foi', 'atual', 'pago', 'pagos',
+}
+# Sem 'quantidade': é também o nome de uma coluna, e "média da quantidade" não é uma contagem
+_PALAVRAS_CONTAGEM = {'quantos', 'quantas', 'numero', 'registros', 'linhas', 'itens', 'compras', 'contagem', 'conte'}
+_ESTATISTICAS = {
+    'media': ('mean', 'Média do preço unitário'),
+    'medio': ('mean', 'Média do preço unitário'),
+    'mediana': ('median', 'Mediana do preço unitário'),
+    'minimo': ('min', 'Menor preço unitário'),
+    'menor': ('min', 'Menor preço unitário'),
+    'maximo': ('max', 'Maior preço unitário'),
+    'maior': ('max', 'Maior preço unitário'),
+    'desvio': ('std', 'Desvio padrão do preço unitário'),
+    'padrao': ('std', 'Desvio padrão do preço unitário'),
+}
+_AGRUPAMENTOS = {
+    'estado': 'estado',
+    'estados': 'estado',
+    'uf': 'estado',
+    'fornecedor': 'nomeFornecedor',
+    'fornecedores': 'nomeFornecedor',
+    'modalidade': 'modalidade',
+    'modalidades': 'modalidade',
+}
+# Palavras que, antes do agrupamento, pedem um valor por grupo ("registros por estado")
+_POR_GRUPO = {'por', 'cada'}
+# Linhas exibidas nas respostas agrupadas
+MAX_GRUPOS = 30
+
+
+def normalizar_pergunta(pergunta):
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples."""
+    texto = unicodedata.normalize('NFKD', pergunta.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', texto).split())
+
+
+def _moeda(valor):
+    return f"R$ {valor:.2f}"
+
+
+def resposta_rapida(df, pergunta):
+    """
+    Responde perguntas estatísticas simples direto com o pandas, sem o LLM.
+
+    Cobre média, mediana, mínimo, máximo e desvio padrão do preço unitário e a
+    contagem de registros, no total ou por estado, fornecedor ou modalidade.
+    "Quantos fornecedores" conta os fornecedores distintos; "quantos registros
+    por fornecedor" lista a contagem de cada um.
+    Só responde quando todas as palavras da pergunta são conhecidas; qualquer
+    outra coisa (inclusive o nome de outra coluna, como quantidade) devolve
+    None e segue para o agente.
+
+    :return: Texto em markdown ou None
+    """
+    palavras = normalizar_pergunta(pergunta).split()
+    if not palavras:
+        return None
+    estatisticas = {_ESTATISTICAS[p] for p in palavras if p in _ESTATISTICAS}
+    grupos = {_AGRUPAMENTOS[p] for p in palavras if p in _AGRUPAMENTOS}
+    contagem = any(p in _PALAVRAS_CONTAGEM for p in palavras)
+    conhecidas = _PALAVRAS_NEUTRAS | _PALAVRAS_CONTAGEM | _ESTATISTICAS.keys() | _AGRUPAMENTOS.keys()
+    if any(p not in conhecidas for p in palavras) or len(estatisticas) > 1 or len(grupos) > 1:
+        return None
+    if not estatisticas and not contagem:
+        return None
+
+    grupo = next(iter(grupos), None)
+    if grupo is not None and grupo not in df.columns:
+        return None
+
+    if estatisticas:
+        if 'precoUnitario' not in df.columns:
+            return None
+        funcao, nome = next(iter(estatisticas))
+        preco = coluna_numerica(df, 'precoUnitario')
+        if grupo is None:
+            valor = getattr(preco, funcao)()
+            return f"{nome}: **{_moeda(valor)}** ({preco.count()} registros com preço)."
+        por_grupo = preco.groupby(df[grupo], observed=True).agg(funcao).dropna().sort_values(ascending=False)
+        linhas = [f"| {indice} | {_moeda(valor)} |" for indice, valor in por_grupo.head(MAX_GRUPOS).items()]
+        return "\n".join([f"{nome} por {grupo}:", "", f"| {grupo} | {nome} |", "|---|---:|", *linhas])
+
+    if grupo is None:
+        return f"Há **{len(df)}** registros nos dados."
+    contar_por_grupo = any(
+        i > 0 and palavras[i - 1] in _POR_GRUPO for i, p in enumerate(palavras) if _AGRUPAMENTOS.get(p) == grupo
+    )
+    if not contar_por_grupo:
+        return f"Há **{df[grupo].nunique()}** valores distintos de {grupo} nos dados."
+    contagens = df[grupo].value_counts()
+    linhas = [f"| {indice} | {valor} |" for indice, valor in contagens.head(MAX_GRUPOS).items()]
+    return "\n".join([f"Registros por {grupo}:", "", f"| {grupo} | Registros |", "|---|---:|", *linhas])
+
+
+class CacheRespostas:
+    """
+    Respostas já dadas pelo agente, por (impressão do dataset, pergunta normalizada, modelo).
+
+    Guarda também os números de uso: quantas perguntas foram respondidas pela
+    regra, pelo cache ou pelo agente, e o tempo que deixou de ser gasto com o
+    LLM (estimado pela latência média das chamadas ao agente).
+    """
+
+    def __init__(self, max_respostas=MAX_RESPOSTAS):
+        self.max_respostas = max_respostas
+        self._respostas = OrderedDict()
+        self._lock = threading.Lock()
+        self.contagem = {'regra': 0, 'cache': 0, 'agente': 0}
+        self.tempo_agente = 0.0
+        self.tempo_atalhos = 0.0
+
+    def obter(self, chave):
+        with self._lock:
+            resposta = self._respostas.get(chave)
+            if resposta is not None:
+                self._respostas.move_to_end(chave)
+            return resposta
+
+    def guardar(self, chave, resposta):
+        with self._lock:
+            self._respostas[chave] = resposta
+            self._respostas.move_to_end(chave)
+            while len(self._respostas) > self.max_respostas:
+                self._respostas.popitem(last=False)
+
+    def registrar(self, origem, duracao):
+        with self._lock:
+            self.contagem[origem] += 1
+            if origem == 'agente':
+                self.tempo_agente += duracao
+            else:
+                self.tempo_atalhos += duracao
+
+    def resumo(self):
+        total = sum(self.contagem.values())
+        atalhos = self.contagem['regra'] + self.contagem['cache']
+        latencia_agente = self.tempo_agente / self.contagem['agente'] if self.contagem['agente'] else 0.0
+        return {
+            'perguntas': total,
+            **self.contagem,
+            'taxa_acerto': atalhos / total if total else 0.0,
+            'latencia_media_agente_s': latencia_agente,
+            'tempo_economizado_s': max(latencia_agente * atalhos - self.tempo_atalhos, 0.0),
+        }
+
+
+cache_respostas = CacheRespostas()
+
+
+def responder(agent, df, pergunta, model_choice, cache=None):
+    """
+    Responde a pergunta pelo caminho mais barato: regra, cache ou agente.
+
+    :return: Dicionário com 'output', 'origem' ('regra', 'cache' ou 'agente') e 'tempo' em segundos
+    """
+    cache = cache_respostas if cache is None else cache
+    inicio = time.perf_counter()
+    if isinstance(df, pd.DataFrame):
+        saida = resposta_rapida(df, pergunta)
+        if saida is not None:
+            origem = 'regra'
+        else:
+            chave = (impressao_dataset(df), normalizar_pergunta(pergunta), model_choice)
+            saida = cache.obter(chave)
+            origem = 'cache'
+            if saida is None:
+                saida = agent.invoke({'input': pergunta})['output']
+                origem = 'agente'
+                cache.guardar(chave, saida)
+    else:
+        saida = agent.invoke({'input': pergunta})['output']
+        origem = 'agente'
+    duracao = time.perf_counter() - inicio
+    cache.registrar(origem, duracao)
+    metricas.observar('agente_latencia_segundos', duracao, origem=origem)
+    return {'output': saida, 'origem': origem, 'tempo': duracao}
+
+
+def responder_em_streaming(obter_agente, df, pergunta, model_choice, cache=None, cancelar=None, tempo_maximo=TEMPO_MAXIMO_AGENTE):
+    """
+    Versão de `responder` que gera o texto aos poucos, para st.write_stream.
+
+    Regra e cache saem de uma vez; a resposta do agente sai token a token e
+    só vai para o cache se chegar completa (sem cancelamento nem tempo esgotado).
+
+    :param obter_agente: Função sem argumentos que devolve o agente; só é
+        chamada quando nem a regra nem o cache respondem
+    """
+    cache = cache_respostas if cache is None else cache
+    inicio = time.perf_counter()
+    saida = resposta_rapida(df, pergunta) if isinstance(df, pd.DataFrame) else None
+    if saida is not None:
+        cache.registrar('regra', time.perf_counter() - inicio)
+        metricas.observar('agente_latencia_segundos', time.perf_counter() - inicio, origem='regra')
+        yield saida
+        return
+
+    chave = (impressao_dataset(df), normalizar_pergunta(pergunta), model_choice) if isinstance(df, pd.DataFrame) else None
+    saida = cache.obter(chave) if chave is not None else None
+    if saida is not None:
+        cache.registrar('cache', time.perf_counter() - inicio)
+        metricas.observar('agente_latencia_segundos', time.perf_counter() - inicio, origem='cache')
+        yield saida
+        return
+
+    cancelar = cancelar if cancelar is not None else threading.Event()
+    partes = []
+    for parte in transmitir_resposta(obter_agente(), pergunta, cancelar=cancelar, tempo_maximo=tempo_maximo):
+        if not partes:
+            metricas.observar('agente_primeiro_token_segundos', time.perf_counter() - inicio)
+        partes.append(parte)
+        yield parte
+    cache.registrar('agente', time.perf_counter() - inicio)
+    metricas.observar('agente_latencia_segundos', time.perf_counter() - inicio, origem='agente')
+    if chave is not None and partes and not cancelar.is_set():
+        cache.guardar(chave, ''.join(partes))
@@ -4,29 +4,23 @@ import os
 import sys
 from dotenv import load_dotenv
 from utils.config import COLUMN_CONFIG, get_column_config
-from utils.utils import aplicar_mascara, calcular_estatisticas
-from utils.apis import consultar_api_governo_async
-from agents_tools.ag_to import criar_agente_dataframe, get_or_create_agent, update_agent
+from utils.utils import calcular_estatisticas, extrair_codigos_itens, ler_codigos_csv
+from utils.formatacao import aplicar_formatacoes_colunas
+from utils.dataset import coluna_numerica, ocultar_colunas_internas
+from utils.graficos import preparar_dispersao
+from utils.visoes import cache_visoes
+from utils.metricas import Perfilador, cronometrado, metricas
+from utils.acumulador import AcumuladorResultados
+from utils.catalogo import buscar_itens, carregar_catalogo, contar_itens, ler_arquivo_catalogo
+from utils.sessoes import abrir_sessao, descrever_sessao, listar_sessoes, salvar_sessao
+from agents_tools.ag_to import MAX_ITERACOES_AGENTE, TEMPO_MAXIMO_AGENTE, get_or_create_agent, limites_agente, nova_resposta, update_agent
+from agents_tools.respostas import responder_em_streaming
 import time
 import asyncio
-import plotly.express as px
-import numpy as np
-import altair as alt
 
 # Adicionar o diretório pai ao sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def limpar_e_converter(valor):
-    if isinstance(valor, str):
-        # Remove caracteres não numéricos, exceto ponto e vírgula
-        valor = ''.join(c for c in valor if c.isdigit() or c in ['.', ','])
-        # Substitui vírgula por ponto
-        valor = valor.replace(',', '.')
-    try:
-        return float(valor)
-    except ValueError:
-        return None
-
 # Configuração da página
 st.set_page_config(
     page_title="Pesquisa de Preços",
@@ -35,6 +29,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Perfil (cProfile) de um único rerun, pedido no painel de métricas
+if "perfilador" not in st.session_state:
+    st.session_state.perfilador = Perfilador()
+if st.session_state.perfilador.ativo:
+    # Rerun anterior interrompido (st.rerun) antes do fim do script
+    st.session_state.perfil_rerun = st.session_state.perfilador.parar()
+if st.session_state.pop("perfilar_rerun", False):
+    st.session_state.perfilador.iniciar()
+inicio_rerun = time.perf_counter()
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -54,45 +58,205 @@ if "tempos_resposta" not in st.session_state:
 if "progress_bar" not in st.session_state:
     st.session_state.progress_bar = st.progress(0)
 
+# Área onde os resultados parciais aparecem durante a busca
+area_parcial = st.empty()
+
+# Busca os dados exibindo a tabela e as estatísticas à medida que as páginas chegam
+def buscar_dados_em_streaming(codigo_item, data_inicial, data_final, usar_cache):
+    from utils.apis import consultar_api_governo_stream
+    acumulador = AcumuladorResultados()
+    with area_parcial.container():
+        st.subheader("Resultados parciais")
+        metricas_placeholder = st.empty()
+        tabela_placeholder = st.empty()
+
+    async def consumir():
+        resultado = {"total_paginas": 0, "paginas_faltantes": []}
+        async for lote in consultar_api_governo_stream(codigo_item, data_inicial, data_final, usar_cache=usar_cache):
+            acumulador.adicionar(lote['registros'])
+            resultado = lote
+            if lote['total_paginas']:
+                st.session_state.progress_bar.progress(min(lote['paginas_concluidas'] / lote['total_paginas'], 1.0))
+            n, media, cv = acumulador.estatisticas()
+            metricas_placeholder.markdown(
+                f"**Registros:** {len(acumulador)} · **Média:** R$ {media:.2f} · **CV:** {cv:.2f}%"
+                if n else f"**Registros:** {len(acumulador)}"
+            )
+            if acumulador.deve_exibir():
+                tabela_placeholder.dataframe(acumulador.para_dataframe(), use_container_width=True, hide_index=True)
+        return resultado
+
+    with metricas.medir('coleta'):
+        ultimo_lote = asyncio.run(consumir())
+    area_parcial.empty()
+    return {
+        "df": acumulador.para_dataframe() if len(acumulador) else None,
+        "total_registros": len(acumulador),
+        "total_paginas": ultimo_lote['total_paginas'],
+        "paginas_faltantes": sorted(ultimo_lote['paginas_faltantes']),
+    }
+
 # Função para limpar os dados e reiniciar a aplicação
 def limpar_dados():
     st.session_state.df = None
+    st.session_state.pop('df_analise', None)
+    st.session_state.pop('analise', None)
+    st.session_state.pop('parametros_consulta', None)
     st.session_state.tempos_resposta = []
     st.session_state.messages = []
     if "agent" in st.session_state:
         del st.session_state.agent
     st.session_state.agent = None  # Garante que o agente seja None após a limpeza
 
+# Painel com os tempos por etapa, a coleta, o agente e a exportação das métricas
+def exibir_painel_metricas():
+    if st.session_state.tempos_resposta:
+        st.caption(f"Última busca: {st.session_state.tempos_resposta[-1]:.2f} s")
+    col1, col2 = st.columns(2)
+    paginas_por_segundo = metricas.paginas_por_segundo()
+    col1.metric("Páginas/s", "-" if pd.isna(paginas_por_segundo) else f"{paginas_por_segundo:.1f}")
+    col2.metric("Repetições HTTP", metricas.contador('http_repeticoes_total'))
+    col1.metric("Páginas perdidas", metricas.contador('http_paginas_perdidas_total'))
+    col2.metric("Tokens do agente", metricas.contador('agente_tokens_total'))
+    resumo = pd.DataFrame(metricas.resumo())
+    if not resumo.empty:
+        resumo['rotulos'] = resumo['rotulos'].map(lambda rotulos: ", ".join(f"{k}={v}" for k, v in rotulos.items()))
+        st.dataframe(resumo[['nome', 'rotulos', 'n', 'media', 'p50', 'p95', 'maximo']], hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.4f") for c in ['media', 'p50', 'p95', 'maximo']})
+    st.download_button("Exportar (JSON lines)", metricas.para_jsonl(), file_name="metricas.jsonl", mime="application/x-ndjson")
+    st.download_button("Exportar (Prometheus)", metricas.para_prometheus(), file_name="metricas.prom", mime="text/plain")
+    if st.button("Perfilar o próximo rerun", help="Liga o cProfile durante uma execução do script"):
+        st.session_state.perfilar_rerun = True
+        st.rerun()
+    if st.session_state.get("perfil_rerun"):
+        st.download_button("Baixar perfil (cProfile)", st.session_state.perfil_rerun, file_name="perfil_rerun.txt", mime="text/plain")
+        st.code(st.session_state.perfil_rerun[:4000])
+    if st.button("Zerar métricas"):
+        metricas.limpar()
+        st.rerun()
+
+# Salva a análise atual (dados, marcações e parâmetros) e reabre as salvas sem consultar a API
+def exibir_sessoes_salvas():
+    if isinstance(st.session_state.df, pd.DataFrame) and st.button("Salvar análise", help="Grava os dados, as marcações da análise crítica e os parâmetros da busca"):
+        caminho = salvar_sessao(st.session_state.df, st.session_state.get('analise'), st.session_state.get('parametros_consulta'))
+        st.success(f"Análise salva em {caminho}")
+    salvas = listar_sessoes()
+    if not salvas:
+        st.caption("Nenhuma análise salva.")
+        return
+    escolhida = st.selectbox("Análises salvas", salvas, format_func=descrever_sessao)
+    if st.button("Abrir análise"):
+        try:
+            sessao = abrir_sessao(escolhida['caminho'])
+        except ValueError as e:
+            st.error(str(e))
+            return
+        limpar_dados()
+        st.session_state.df = sessao['df']
+        st.session_state.parametros_consulta = sessao['parametros']
+        st.session_state.total_registros = len(sessao['df'])
+        if sessao['analise'] is not None:
+            st.session_state.analise = sessao['analise']
+            st.session_state.df_analise = sessao['analise'].tabela()
+        st.rerun()
+
 # Sidebar para input de parâmetros, seleção de modelo e botão de limpar histórico
 with st.sidebar:
     st.header("Parâmetros de Consulta")
-    codigo_item = st.text_input("Código do Item")
+    modo_busca = st.radio("Modo de busca", ["Item único", "Lote de itens"], horizontal=True)
+    if modo_busca == "Item único":
+        termo_catalogo = st.text_input("Buscar no catálogo CATMAT", help="Parte da descrição ou do código do item")
+        sugestoes = buscar_itens(termo_catalogo) if termo_catalogo else []
+        item_sugerido = None
+        if sugestoes:
+            item_sugerido = st.selectbox("Itens encontrados", sugestoes, format_func=lambda item: f"{item[0]} - {item[1]}")
+        elif termo_catalogo:
+            st.caption("Nenhum item encontrado no catálogo local.")
+        codigo_item = st.text_input("Código do Item", value=str(item_sugerido[0]) if item_sugerido else "")
+    else:
+        codigos_texto = st.text_area("Códigos dos Itens", help="Códigos CATMAT separados por vírgula, espaço ou linha")
+        arquivo_codigos = st.file_uploader("Ou envie um CSV com os códigos", type=["csv", "txt"])
+        codigos_itens = ler_codigos_csv(arquivo_codigos) if arquivo_codigos is not None else extrair_codigos_itens(codigos_texto)
+        if codigos_itens:
+            st.caption(f"{len(codigos_itens)} item(ns) para buscar")
     data_inicial = st.date_input("Data Inicial")
     data_final = st.date_input("Data Final")
+    usar_cache = st.checkbox("Usar cache local", value=True, help="Busca na API apenas os períodos ainda não baixados")
+    exibir_parciais = st.checkbox("Exibir resultados parciais", value=True, help="Mostra a tabela e as estatísticas enquanto as páginas chegam")
     st.session_state.model_choice = st.selectbox("Escolha o Modelo", ["gpt-3.5-turbo-0125", "gpt-4o", "gpt-4o-mini"])
+    with st.expander("Limites do agente"):
+        st.session_state.limites_agente = {
+            'max_iteracoes': int(st.number_input("Máximo de iterações", min_value=1, max_value=50, value=MAX_ITERACOES_AGENTE)),
+            'tempo_maximo': float(st.number_input("Tempo máximo por resposta (s)", min_value=5, max_value=600, value=int(TEMPO_MAXIMO_AGENTE))),
+        }
     
     if st.button("Buscar Dados"):
+        # O cliente HTTP (aiohttp) só é carregado na primeira busca
+        from utils.apis import consultar_api_governo_async, consultar_itens_em_lote, descrever_paginas_faltantes
         with st.spinner("Buscando dados..."):
+            inicio_busca = time.perf_counter()
             try:
-                resultados = asyncio.run(consultar_api_governo_async(codigo_item, data_inicial.strftime("%Y-%m-%d"), data_final.strftime("%Y-%m-%d")))
+                if modo_busca == "Lote de itens":
+                    resultados = asyncio.run(consultar_itens_em_lote(codigos_itens, data_inicial.strftime("%Y-%m-%d"), data_final.strftime("%Y-%m-%d"), usar_cache=usar_cache))
+                    st.session_state.tempos_por_item = resultados['por_item']
+                    resultados['total_paginas'] = int(resultados['por_item']['paginas'].sum()) if not resultados['por_item'].empty else 0
+                elif exibir_parciais:
+                    resultados = buscar_dados_em_streaming(codigo_item, data_inicial.strftime("%Y-%m-%d"), data_final.strftime("%Y-%m-%d"), usar_cache)
+                else:
+                    resultados = asyncio.run(consultar_api_governo_async(codigo_item, data_inicial.strftime("%Y-%m-%d"), data_final.strftime("%Y-%m-%d"), usar_cache=usar_cache, progresso=st.session_state.progress_bar.progress))
                 if resultados['df'] is not None and not resultados['df'].empty:
                     st.session_state.df = resultados['df']
+                    # A análise crítica recomeça com os dados novos
+                    st.session_state.pop('df_analise', None)
+                    st.session_state.pop('analise', None)
                     st.session_state.total_registros = resultados['total_registros']
                     st.session_state.total_paginas = resultados['total_paginas']
+                    # Guardados com a análise quando ela é salva
+                    st.session_state.parametros_consulta = {
+                        'itens': list(codigos_itens) if modo_busca == "Lote de itens" else [codigo_item],
+                        'data_inicial': data_inicial.isoformat(),
+                        'data_final': data_final.isoformat(),
+                        'total_paginas': int(resultados['total_paginas']),
+                        'paginas_faltantes': descrever_paginas_faltantes(resultados['paginas_faltantes']),
+                    }
                     
-                    tempo_resposta = time.time() - time.time()
+                    tempo_resposta = time.perf_counter() - inicio_busca
                     st.session_state.tempos_resposta.append(tempo_resposta)
                     
                     st.success(f"Dados carregados com sucesso! Total de registros: {st.session_state.total_registros}")
+                    if resultados['paginas_faltantes']:
+                        st.warning("Dados incompletos: algumas páginas não puderam ser obtidas: "
+                                   + "; ".join(descrever_paginas_faltantes(resultados['paginas_faltantes'])))
                 else:
                     st.warning("Não foram encontrados dados para os parâmetros fornecidos.")
             except Exception as e:
                 st.error(f"Erro ao buscar dados: {str(e)}")
     
+    if modo_busca == "Lote de itens" and isinstance(st.session_state.get("tempos_por_item"), pd.DataFrame):
+        with st.expander("Tempo por item"):
+            st.dataframe(st.session_state.tempos_por_item, use_container_width=True, hide_index=True)
+
+    with st.expander("Catálogo CATMAT"):
+        st.caption(f"{contar_itens()} itens no catálogo local")
+        arquivo_catalogo = st.file_uploader("Carregar catálogo (CSV ou JSON)", type=["csv", "json"], key="arquivo_catalogo")
+        if arquivo_catalogo is not None and st.button("Importar catálogo"):
+            with st.spinner("Importando catálogo..."):
+                try:
+                    total_itens = carregar_catalogo(ler_arquivo_catalogo(arquivo_catalogo))
+                    st.success(f"{total_itens} itens importados.")
+                except ValueError as e:
+                    st.error(str(e))
+
+    with st.expander("Análises salvas"):
+        exibir_sessoes_salvas()
+
+    with st.expander("Métricas de desempenho"):
+        exibir_painel_metricas()
+
     if st.button("Limpar Dados"):
         limpar_dados()
         if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
-            update_agent(st.session_state.df, st.session_state.model_choice)
+            update_agent(st.session_state.df, st.session_state.model_choice, **limites_agente())
         st.success("Dados limpos e agente atualizado com sucesso!")
 
 # Criação das tabs
@@ -108,32 +272,39 @@ def get_friendly_name(col):
     else:
         return col.replace('_', ' ').title()
 
-# Função para aplicar formatações ao DataFrame
+# Função para aplicar formatações ao DataFrame (coluna inteira de uma vez)
 def aplicar_formatacoes(df):
-    for coluna in df.columns:
-        if coluna == 'niFornecedor':
-            df[coluna] = df[coluna].apply(lambda x: aplicar_mascara(x, 'cnpj'))
-        elif coluna == 'precoUnitario':
-            df[coluna] = df[coluna].apply(lambda x: aplicar_mascara(x, 'preco'))
-        elif coluna == 'quantidade':
-            df[coluna] = df[coluna].apply(lambda x: aplicar_mascara(x, 'quantidade'))
-        elif coluna == 'codigoItemCatalogo':
-            df[coluna] = df[coluna].apply(lambda x: aplicar_mascara(x, 'catmat'))
-        elif coluna == 'dataResultado':
-            df[coluna] = df[coluna].apply(lambda x: aplicar_mascara(x, 'data'))
-    return df
+    return aplicar_formatacoes_colunas(df)
+
+# Estatísticas do preço unitário exibidas na aba Parâmetros
+@cronometrado('estatisticas')
+def resumo_parametros(df):
+    preco_unitario = coluna_numerica(df, 'precoUnitario')
+    media, limite_inferior, limite_superior = calcular_estatisticas(preco_unitario)
+    desvio_padrao = preco_unitario.std()
+    return {
+        'media': media,
+        'limite_inferior': limite_inferior,
+        'limite_superior': limite_superior,
+        'mediana': preco_unitario.median(),
+        'minimo': preco_unitario.min(),
+        'maximo': preco_unitario.max(),
+        'cv': (desvio_padrao / media) * 100 if media != 0 else 0,
+    }
 
 with tab1:
     st.header("Dados brutos")
     if isinstance(st.session_state.df, pd.DataFrame):
-        df_formatado = aplicar_formatacoes(st.session_state.df.copy())
-        agent = get_or_create_agent(df_formatado, st.session_state.model_choice)
-        
+        # Visões guardadas pela versão dos dados: um rerun sem mudanças não formata de novo
+        df_formatado = cache_visoes.visao('formatada', st.session_state.df, lambda: aplicar_formatacoes(st.session_state.df.copy(deep=False)))
+        config_colunas = cache_visoes.visao('config_colunas', st.session_state.df, lambda: {
+            **{col: get_column_config(col) for col in df_formatado.columns}, **ocultar_colunas_internas()
+        })
         st.dataframe(
             df_formatado,
             use_container_width=True,
             hide_index=True,
-            column_config={col: get_column_config(col) for col in df_formatado.columns}
+            column_config=config_colunas
         )
         
         # Container para o histórico de mensagens
@@ -159,12 +330,15 @@ with tab1:
                     st.markdown(prompt)
 
                 with st.chat_message("assistant"):
-                    message_placeholder = st.empty()
-                    full_response = ""
-                    with st.spinner("Analisando..."):
-                        response = agent.invoke({'input': prompt})
-                        full_response = response['output']
-                    message_placeholder.markdown(full_response)
+                    # Uma pergunta nova cancela a resposta anterior que ainda estiver em andamento
+                    cancelar = nova_resposta()
+                    # O agente só é criado se a regra e o cache não responderem; mesmo
+                    # DataFrame da página do Analista, para as duas usarem o mesmo agente do cache
+                    full_response = st.write_stream(responder_em_streaming(
+                        lambda: get_or_create_agent(st.session_state.df, st.session_state.model_choice, **limites_agente()),
+                        st.session_state.df, prompt, st.session_state.model_choice,
+                        cancelar=cancelar, tempo_maximo=limites_agente()['tempo_maximo'],
+                    ))
             st.session_state.messages.append({"role": "assistant", "content": full_response})
             st.rerun()
     else:
@@ -174,24 +348,21 @@ with tab2:
     st.header("Parâmetros")
     
     if isinstance(st.session_state.df, pd.DataFrame) and 'precoUnitario' in st.session_state.df.columns:
-        # Processar a coluna de Preço Unitário
-        preco_unitario = pd.to_numeric(st.session_state.df['precoUnitario'], errors='coerce')
-        
-        # Cálculo das estatísticas
-        media, limite_inferior, limite_superior = calcular_estatisticas(preco_unitario)
-        desvio_padrao = preco_unitario.std()
-        cv = (desvio_padrao / media) * 100 if media != 0 else 0
+        # Cálculo das estatísticas (guardado pela versão dos dados)
+        parametros = cache_visoes.visao('parametros', st.session_state.df, lambda: resumo_parametros(st.session_state.df))
+        media, limite_inferior, limite_superior = parametros['media'], parametros['limite_inferior'], parametros['limite_superior']
+        cv = parametros['cv']
 
         # Exibição das estatísticas
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric(label="Média do Preço Unitário", value=f"R$ {media:.2f}")
-            st.metric(label="Mediana do Preço Unitário", value=f"R$ {preco_unitario.median():.2f}")
+            st.metric(label="Mediana do Preço Unitário", value=f"R$ {parametros['mediana']:.2f}")
         with col2:
-            st.metric(label="Menor Preço Unitário", value=f"R$ {preco_unitario.min():.2f}")
+            st.metric(label="Menor Preço Unitário", value=f"R$ {parametros['minimo']:.2f}")
             st.metric(label="Limite Inferior", value=f"R$ {limite_inferior:.2f}")
         with col3:
-            st.metric(label="Maior Preço Unitário", value=f"R$ {preco_unitario.max():.2f}")
+            st.metric(label="Maior Preço Unitário", value=f"R$ {parametros['maximo']:.2f}")
             st.metric(label="Limite Superior", value=f"R$ {limite_superior:.2f}")
         
         # Métrica para o Coeficiente de Variação
@@ -217,23 +388,36 @@ with tab3:
     
     if isinstance(st.session_state.df, pd.DataFrame):
         if 'quantidade' in st.session_state.df.columns and 'precoUnitario' in st.session_state.df.columns:
-            # Converter as colunas para numérico
-            quantidade = st.session_state.df['quantidade'].apply(limpar_e_converter)
-            preco_unitario = st.session_state.df['precoUnitario'].apply(limpar_e_converter)
+            # Pontos amostrados, densidade, histograma e tendência preparados no servidor e guardados com as outras visões
+            graficos = cache_visoes.visao('dispersao', st.session_state.df, lambda: preparar_dispersao(
+                coluna_numerica(st.session_state.df, 'quantidade'), coluna_numerica(st.session_state.df, 'precoUnitario')
+            ))
+            rotulos = {'x': 'Quantidade', 'y': 'Preço Unitário'}
             
-            # Criar DataFrame com dados válidos
-            dados_validos = pd.DataFrame({'quantidade': quantidade, 'preco_unitario': preco_unitario})
-            dados_validos = dados_validos.replace([np.inf, -np.inf], np.nan).dropna()
-            
-            if not dados_validos.empty:
+            if graficos['total']:
+                # Bibliotecas de gráficos carregadas só quando há dados para desenhar
+                import plotly.express as px
+                import altair as alt
+
                 # Gráfico de dispersão
-                fig_correlacao = px.scatter(dados_validos, x='quantidade', y='preco_unitario', 
-                                            labels={'quantidade': 'Quantidade', 'preco_unitario': 'Preço Unitário'},
+                fig_correlacao = px.scatter(graficos['pontos'], x='x', y='y', labels=rotulos,
                                             title="Correlação entre Quantidade e Preço Unitário")
                 st.plotly_chart(fig_correlacao, use_container_width=True)
+                if graficos['amostrado']:
+                    st.caption(f"Exibindo {len(graficos['pontos'])} de {graficos['total']} pontos (amostra estratificada). "
+                               "O mapa de densidade abaixo considera todos os pontos.")
+                    densidade = alt.Chart(graficos['densidade']).mark_rect().encode(
+                        alt.X('x_inicio', bin='binned', title='Quantidade'),
+                        alt.X2('x_fim'),
+                        alt.Y('y_inicio', bin='binned', title='Preço Unitário'),
+                        alt.Y2('y_fim'),
+                        alt.Color('registros', title='Registros'),
+                        tooltip=['registros']
+                    ).properties(title='Densidade de Quantidade x Preço Unitário', height=400)
+                    st.altair_chart(densidade, use_container_width=True)
                 
                 # Cálculo e exibição da correlação
-                correlacao = dados_validos['quantidade'].corr(dados_validos['preco_unitario'])
+                correlacao = graficos['correlacao']
                 st.write(f"Coeficiente de correlação: {correlacao:.2f}")
                 
                 # Interpretação da correlação
@@ -244,21 +428,23 @@ with tab3:
                 else:
                     st.info("Não há uma correlação forte entre quantidade e preço unitário.")
 
-                # Gráfico com linha de tendência
-                try:
-                    fig_correlacao_tendencia = px.scatter(dados_validos, x='quantidade', y='preco_unitario', 
-                                                          labels={'quantidade': 'Quantidade', 'preco_unitario': 'Preço Unitário'},
-                                                          title="Correlação com Linha de Tendência",
-                                                          trendline="ols")
+                # Gráfico com linha de tendência (reta ajustada sobre todos os pontos)
+                tendencia = graficos['tendencia']
+                if tendencia is not None:
+                    fig_correlacao_tendencia = px.scatter(graficos['pontos'], x='x', y='y', labels=rotulos,
+                                                          title="Correlação com Linha de Tendência")
+                    fig_correlacao_tendencia.add_scatter(x=tendencia['x'], y=tendencia['y'], mode='lines',
+                                                         name=f"Tendência (R² = {tendencia['r2']:.2f})")
                     st.plotly_chart(fig_correlacao_tendencia, use_container_width=True)
-                except Exception as e:
-                    st.warning(f"Erro ao gerar gráfico com linha de tendência: {str(e)}")
-
-                # Histograma de preço unitário
-                hist_preco = alt.Chart(dados_validos).mark_bar().encode(
-                    alt.X('preco_unitario', bin=alt.Bin(maxbins=30), title='Preço Unitário (R$)'),
-                    alt.Y('count()', title='Contagem'),
-                    tooltip=['count()']
+                else:
+                    st.warning("Não foi possível gerar a linha de tendência: a quantidade não varia entre os registros.")
+
+                # Histograma de preço unitário (faixas já contadas)
+                hist_preco = alt.Chart(graficos['histograma']).mark_bar().encode(
+                    alt.X('inicio', bin='binned', title='Preço Unitário (R$)'),
+                    alt.X2('fim'),
+                    alt.Y('registros', title='Contagem'),
+                    tooltip=['registros']
                 ).properties(
                     title='Distribuição do Preço Unitário',
                     width=600,
@@ -278,4 +464,9 @@ with tab3:
     else:
         st.info("Nenhum dado carregado. Use o painel lateral para buscar dados.")
 
-
+# Tempo total do script e fim do perfil pedido no painel
+metricas.observar('etapa_segundos', time.perf_counter() - inicio_rerun, etapa='rerun')
+if st.session_state.perfilador.ativo:
+    st.session_state.perfil_rerun = st.session_state.perfilador.parar()
+    # Mais um rerun, sem perfil, para o painel já mostrar o resultado
+    st.rerun()
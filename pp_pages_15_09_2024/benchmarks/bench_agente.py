@@ -0,0 +1,74 @@
+"""
+Confere o cache de agentes (reuso, troca de dados ou de modelo, LRU) e mede
+o custo da impressão do dataset e da criação do agente com o modelo local.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_agente --registros 100000
+"""
+import argparse
+import time
+
+from agents_tools.ag_to import CacheAgentes, criar_agente_dataframe, impressao_dataset
+from agents_tools.modelo_local import MODELO_LOCAL
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import construir_dataframe
+
+
+def verificar_cache(df):
+    criados = []
+
+    def fabrica(dados, modelo):
+        criados.append(modelo)
+        return object()
+
+    cache = CacheAgentes(max_agentes=2, fabrica=fabrica)
+    agente = cache.obter(df, "gpt-4o")
+    assert cache.obter(df, "gpt-4o") is agente, "mesmo dado e modelo devem reaproveitar o agente"
+    assert cache.obter(df.copy(), "gpt-4o") is agente, "cópia com o mesmo conteúdo deve reaproveitar o agente"
+    assert cache.obter(df, "gpt-4o-mini") is not agente, "troca de modelo deve criar outro agente"
+    assert cache.obter(df.head(10), "gpt-4o") is not agente, "dados novos devem criar outro agente"
+    assert len(cache) == 2 and len(criados) == 3
+    assert cache.obter(df, "gpt-4o") is not agente, "o agente menos usado deve sair do cache"
+    print(f"cache: {cache.criados} criados, {cache.reaproveitados} reaproveitados — ok")
+
+
+def medir(df):
+    inicio = time.perf_counter()
+    impressao_dataset(df.copy(deep=False))
+    t_impressao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    impressao_dataset(df)
+    impressao_dataset(df)
+    t_memo = (time.perf_counter() - inicio) / 2
+    print(f"impressão de {len(df)} linhas: {t_impressao * 1e3:.1f} ms (já calculada: {t_memo * 1e6:.1f} µs)")
+
+    try:
+        import langchain_experimental  # noqa: F401
+    except ImportError:
+        print("langchain_experimental não instalado; criação do agente não medida")
+        return
+    cache = CacheAgentes()
+    inicio = time.perf_counter()
+    cache.obter(df, MODELO_LOCAL)
+    t_criacao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    cache.obter(df, MODELO_LOCAL)
+    t_reuso = time.perf_counter() - inicio
+    print(f"agente: criação {t_criacao * 1e3:.1f} ms, reuso {t_reuso * 1e6:.1f} µs")
+    resposta = criar_agente_dataframe(df, MODELO_LOCAL).invoke({"input": "Quantos registros?"})
+    print(f"resposta do modelo local: {resposta['output']!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = construir_dataframe(gerar_registros(args.registros))
+    verificar_cache(df)
+    medir(df)
+
+
+if __name__ == "__main__":
+    main()
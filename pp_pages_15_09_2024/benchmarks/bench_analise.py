@@ -0,0 +1,108 @@
+"""
+Confere o estado da análise crítica (marcas, exclusões, desfazer e refazer)
+contra um recálculo completo e mede o custo de marcar uma linha.
+
+Sequências aleatórias de operações são aplicadas na AnaliseCritica; depois
+de cada uma, as estatísticas incrementais são comparadas com as do pandas
+sobre as linhas ativas, e desfazer tudo precisa voltar ao estado inicial.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_analise --registros 100000
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.analise import MAX_DESFAZER, AnaliseCritica
+from utils.dataset import coluna_numerica, construir_dataframe, normalizar_dataset
+
+
+def conferir(analise):
+    tabela = analise.tabela()
+    ativas = tabela[tabela['Desconsiderar'] == 'Não']
+    precos = coluna_numerica(ativas, 'precoUnitario')
+    resumo = analise.estatisticas.resumo()
+    esperado = {'media': precos.mean(), 'mediana': precos.median(), 'minimo': precos.min(), 'maximo': precos.max()}
+    for nome, valor in esperado.items():
+        assert math.isclose(resumo[nome], valor, rel_tol=1e-9) or (math.isnan(resumo[nome]) and math.isnan(valor)), nome
+    assert resumo['n'] == precos.notna().sum()
+
+
+def verificar(df, operacoes, seed):
+    rng = random.Random(seed)
+    analise = AnaliseCritica(df)
+    inicial = analise.tabela()
+    feitas = 0
+    for _ in range(operacoes):
+        escolha = rng.random()
+        if escolha < 0.5:
+            linhas = rng.sample(list(analise.tabela().index), min(5, len(analise.tabela())))
+            analise.marcar({linha: rng.random() < 0.7 for linha in linhas}, editor=True)
+        elif escolha < 0.6:
+            analise.excluir_desconsideradas()
+        elif escolha < 0.7:
+            analise.excluir_fora_limites()
+        elif escolha < 0.75:
+            analise.priorizar_fora_limites()
+        elif escolha < 0.8:
+            analise.marcar_outliers()
+        elif escolha < 0.9:
+            analise.desfazer()
+        else:
+            analise.refazer()
+        conferir(analise)
+        feitas += 1
+    while analise.desfazer():
+        conferir(analise)
+    assert analise.tabela().equals(inicial)
+    return feitas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, default=100_000)
+    parser.add_argument("--operacoes", type=int, default=MAX_DESFAZER, help="Por sequência; até MAX_DESFAZER para desfazer tudo")
+    args = parser.parse_args()
+
+    pequeno = normalizar_dataset(construir_dataframe(gerar_registros(400, seed=1)))
+    feitas = sum(verificar(pequeno, args.operacoes, seed) for seed in range(10))
+    print(f"{feitas} operações aleatórias conferidas contra o recálculo completo; desfazer tudo volta ao início — ok")
+
+    df = normalizar_dataset(construir_dataframe(gerar_registros(args.registros)))
+    analise = AnaliseCritica(df)
+    analise.tabela_editor()
+    linha = analise.tabela().index[10]
+
+    inicio = time.perf_counter()
+    analise.marcar({linha: True}, editor=True)
+    t_marcar = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    analise.tabela_editor()
+    t_tabela = time.perf_counter() - inicio
+
+    # Como era: o df inteiro do editor substituía o df_analise e as marcas eram comparadas coluna a coluna
+    antigo = analise.tabela_editor().copy()
+    editado = antigo.copy()
+    inicio = time.perf_counter()
+    editado.loc[linha, 'Desconsiderar'] = 'Não'
+    alteradas = editado['Desconsiderar'] != antigo['Desconsiderar']
+    editado.equals(antigo)
+    antigo = editado.copy(deep=False)
+    antigo['ForaLimites'] = np.zeros(len(antigo), dtype=bool)
+    t_antigo = time.perf_counter() - inicio
+    assert alteradas.sum() == 1
+
+    inicio = time.perf_counter()
+    analise.desfazer()
+    t_desfazer = time.perf_counter() - inicio
+    print(f"{len(df)} registros: marcar uma linha {t_marcar * 1e3:.2f} ms (+ tabela do editor {t_tabela * 1e3:.1f} ms), "
+          f"desfazer {t_desfazer * 1e3:.2f} ms; substituir o df inteiro {t_antigo * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Carrega um catálogo CATMAT sintético num banco temporário e mede a carga e a
+latência das buscas por código e por texto.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_catalogo --itens 300000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from utils.catalogo import buscar_itens, carregar_catalogo
+
+SUBSTANTIVOS = ["seringa", "agulha", "luva", "papel", "caneta", "cadeira", "mesa", "cabo", "lâmpada", "detergente",
+                "álcool", "gaze", "atadura", "cartucho", "toner", "parafuso", "tinta", "pneu", "bateria", "sabão"]
+ATRIBUTOS = ["descartável", "estéril", "látex", "nitrílica", "A4", "azul", "preta", "giratória", "LED", "neutro",
+             "70%", "algodão", "elástica", "compatível", "inox", "acrílica", "aro 15", "recarregável", "líquido", "em pó"]
+MEDIDAS = ["10 ml", "5 ml", "25x7", "tamanho M", "tamanho G", "75 g/m2", "1,5 mm", "2,5 mm2", "9 W", "500 ml", "1 L", "5 L"]
+
+
+def gerar_itens(quantidade, seed):
+    rng = random.Random(seed)
+    for i in range(quantidade):
+        descricao = " ".join([
+            rng.choice(SUBSTANTIVOS).upper(),
+            rng.choice(ATRIBUTOS),
+            rng.choice(ATRIBUTOS),
+            rng.choice(MEDIDAS),
+            f"modelo {rng.randint(1, 5000)}",
+        ])
+        yield 200000 + i * 3, descricao
+
+
+def medir_buscas(termos, caminho):
+    tempos = []
+    for termo in termos:
+        inicio = time.perf_counter()
+        buscar_itens(termo, caminho=caminho)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return statistics.median(tempos) * 1e3, tempos[int(len(tempos) * 0.95) - 1] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--itens", type=int, default=300_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "catalogo.db")
+        inicio = time.perf_counter()
+        total = carregar_catalogo(gerar_itens(args.itens, args.seed), caminho=caminho)
+        print(f"carga: {total} itens em {time.perf_counter() - inicio:.1f} s")
+
+        print("exemplo 'luva nitril':", buscar_itens("luva nitril", limite=3, caminho=caminho))
+        rng = random.Random(args.seed)
+        codigos = [str(rng.randint(200000, 200000 + args.itens * 3))[:rng.randint(2, 6)] for _ in range(200)]
+        textos = [f"{rng.choice(SUBSTANTIVOS)[:rng.randint(3, 6)]} {rng.choice(ATRIBUTOS)[:4]}" for _ in range(200)]
+        amplos = [rng.choice(SUBSTANTIVOS)[:2] for _ in range(50)]
+        for rotulo, termos in (("código (prefixo)", codigos), ("texto (2 palavras)", textos), ("texto (2 letras)", amplos)):
+            mediana, p95 = medir_buscas(termos, caminho)
+            print(f"busca por {rotulo}: mediana {mediana:.2f} ms, p95 {p95:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Mede o custo de cada exclusão de linha em EstatisticasIncrementais contra o
+recálculo completo com o pandas. A conferência com o pandas está em
+tests/test_estatisticas.py.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_estatisticas --linhas 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.estatisticas import EstatisticasIncrementais
+
+
+def medir(linhas, exclusoes, seed):
+    rng = np.random.default_rng(seed)
+    serie = pd.Series(rng.lognormal(3, 1, linhas))
+    inicio = time.perf_counter()
+    estatisticas = EstatisticasIncrementais(serie)
+    t_criacao = time.perf_counter() - inicio
+
+    escolhidas = rng.choice(linhas, size=exclusoes, replace=False)
+    inicio = time.perf_counter()
+    for linha in escolhidas:
+        estatisticas.remover_linhas([linha])
+        estatisticas.resumo()
+    t_incremental = (time.perf_counter() - inicio) / exclusoes
+
+    ativos = np.ones(linhas, dtype=bool)
+    inicio = time.perf_counter()
+    for linha in escolhidas[:20]:
+        ativos[linha] = False
+        ativa = serie[ativos]
+        ativa.mean(), ativa.std(), ativa.median(), ativa.min(), ativa.max()
+    t_completo = (time.perf_counter() - inicio) / 20
+
+    print(f"linhas={linhas}: criação {t_criacao * 1e3:.1f} ms | por exclusão: "
+          f"incremental {t_incremental * 1e6:.1f} µs, recálculo completo {t_completo * 1e6:.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--exclusoes", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    medir(args.linhas, args.exclusoes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Coleta de um período longo em fatias de datas, contra um servidor local que
+respeita dataInicial/dataFinal, usando um cache temporário.
+
+1. Coleta interrompida no meio e retomada: a segunda execução só busca as
+   fatias que faltaram e o resultado final tem todos os registros.
+2. Segunda consulta do mesmo item em outro período: a densidade guardada
+   já divide o período, sem as requisições de sondagem.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_fatias --registros 40000 --latencia 0.01
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.servidor_stub import iniciar_servidor
+from utils import apis, cache
+
+PERIODO = (date(2019, 1, 1), date(2023, 12, 31))
+
+
+async def coletar(url, inicio, fim, interromper_apos=None):
+    """Registros recebidos; para depois de `interromper_apos` páginas, como um usuário que fecha a página."""
+    registros = []
+    paginas = 0
+    stream = apis.consultar_api_governo_stream("123456", inicio, fim, url=url)
+    try:
+        async for lote in stream:
+            registros.extend(lote["registros"])
+            paginas += lote["paginas_concluidas"] > 0
+            if interromper_apos is not None and paginas >= interromper_apos:
+                break
+    finally:
+        await stream.aclose()
+    return registros
+
+
+async def executar(total_registros, latencia, concentracao):
+    requisicoes = []
+    runner, url = await iniciar_servidor(total_registros, latencia=latencia, periodo=PERIODO,
+                                         concentracao=concentracao, requisicoes=requisicoes)
+    paginas = apis.calcular_total_paginas(total_registros)
+    try:
+        inicio = time.perf_counter()
+        await coletar(url, "2019-01-01", "2023-12-31", interromper_apos=paginas // 2)
+        interrompida = len(requisicoes)
+        registros = await coletar(url, "2019-01-01", "2023-12-31")
+        duracao = time.perf_counter() - inicio
+        retomada = len(requisicoes) - interrompida
+        unicos = len({r["idItemCompra"] for r in registros})
+        assert unicos == total_registros, (unicos, total_registros)
+        print(f"{total_registros} registros ({paginas} páginas numa consulta só), concentração {concentracao}:")
+        print(f"  interrompida após {interrompida} requisições; retomada com {retomada} "
+              f"(total {interrompida + retomada}, {duracao:.1f} s) — {unicos} registros, nenhum faltando")
+        print(f"  densidade guardada: {cache.obter_densidade('123456'):.1f} registros por dia, "
+              f"fatias de {apis.dias_por_fatia(cache.obter_densidade('123456'))} dias")
+
+        # Mesmo item, período sem cache: as fatias já saem do tamanho certo
+        cache.limpar_cache()
+        cache.registrar_densidade("123456", total_registros / ((PERIODO[1] - PERIODO[0]).days + 1))
+        antes = len(requisicoes)
+        await coletar(url, "2019-01-01", "2023-12-31")
+        com_densidade = len(requisicoes) - antes
+        cache.limpar_cache()
+        antes = len(requisicoes)
+        await coletar(url, "2019-01-01", "2023-12-31")
+        sem_densidade = len(requisicoes) - antes
+        print(f"  coleta completa: {sem_densidade} requisições sem densidade conhecida, {com_densidade} com ela "
+              f"(mínimo possível: {paginas})")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, default=40_000)
+    parser.add_argument("--latencia", type=float, default=0.01)
+    parser.add_argument("--concentracao", type=float, nargs="+", default=[1.0, 3.0])
+    args = parser.parse_args()
+
+    apis.BACKOFF_BASE = 0.01
+    with tempfile.TemporaryDirectory() as pasta:
+        cache.CAMINHO_CATALOGO = os.path.join(pasta, "cache.db")
+        for concentracao in args.concentracao:
+            cache.limpar_cache()
+            asyncio.run(executar(args.registros, args.latencia, concentracao))
+
+
+if __name__ == "__main__":
+    main()
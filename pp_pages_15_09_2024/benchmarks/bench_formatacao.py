@@ -0,0 +1,75 @@
+"""
+Compara a formatação célula a célula (aplicar_mascara / limpar_e_converter
+com Series.apply) com a versão vetorizada de utils.formatacao.
+
+Confere que as saídas são idênticas e mede o ganho de tempo.
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_formatacao --linhas 200000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.formatacao import FORMATACOES_COLUNAS, converter_numerico, formatar_coluna
+from utils.utils import aplicar_mascara, limpar_e_converter
+
+
+def gerar_dataframe(linhas, seed=0):
+    rng = np.random.default_rng(seed)
+    precos = np.round(rng.lognormal(3, 1, linhas), 2)
+    # Como nos dados reais, poucos fornecedores e itens se repetem em muitas linhas
+    fornecedores = pd.Series(rng.integers(10**13, 10**14, 2_000)).astype(str)
+    df = pd.DataFrame({
+        "niFornecedor": fornecedores.sample(linhas, replace=True, random_state=seed).to_numpy(),
+        "precoUnitario": precos,
+        "quantidade": np.round(rng.lognormal(3, 2, linhas)).astype(float),
+        "codigoItemCatalogo": rng.choice(rng.integers(100_000, 999_999, 50), linhas),
+        "dataResultado": pd.to_datetime("2023-01-01") + pd.to_timedelta(rng.integers(0, 600, linhas), unit="D"),
+    })
+    # Preços como texto, do jeito que às vezes vêm formatados
+    df["precoTexto"] = pd.Series(precos).map("R$ {:.2f}".format).str.replace(".", ",", regex=False)
+    df.loc[rng.random(linhas) < 0.02, "dataResultado"] = pd.NaT
+    return df
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def iguais(a, b):
+    return a.astype(object).fillna("<nulo>").tolist() == b.astype(object).fillna("<nulo>").tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=200_000)
+    args = parser.parse_args()
+
+    df = gerar_dataframe(args.linhas)
+    casos = [(coluna, tipo) for coluna, tipo in FORMATACOES_COLUNAS.items()]
+    casos.append(("precoTexto", "preco"))
+
+    total_celula = total_vetor = 0.0
+    print(f"{'coluna':<22}{'tipo':<12}{'célula (s)':>12}{'vetor (s)':>12}{'ganho':>9}  idêntico")
+    for coluna, tipo in casos:
+        ref, t_ref = medir(lambda: df[coluna].apply(lambda x: aplicar_mascara(x, tipo)))
+        vet, t_vet = medir(lambda: formatar_coluna(df[coluna], tipo))
+        total_celula += t_ref
+        total_vetor += t_vet
+        print(f"{coluna:<22}{tipo:<12}{t_ref:>12.3f}{t_vet:>12.3f}{t_ref / t_vet:>8.1f}x  {iguais(ref, vet)}")
+
+    ref, t_ref = medir(lambda: df["precoTexto"].apply(limpar_e_converter))
+    vet, t_vet = medir(lambda: converter_numerico(df["precoTexto"]))
+    total_celula += t_ref
+    total_vetor += t_vet
+    print(f"{'precoTexto':<22}{'conversão':<12}{t_ref:>12.3f}{t_vet:>12.3f}{t_ref / t_vet:>8.1f}x  {iguais(ref, vet)}")
+    print(f"{'total':<34}{total_celula:>12.3f}{total_vetor:>12.3f}{total_celula / total_vetor:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
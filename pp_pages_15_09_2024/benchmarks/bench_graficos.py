@@ -0,0 +1,59 @@
+"""
+Mede o preparo dos gráficos de quantidade x preço e o tamanho do que vai para
+o navegador, comparando com o envio de todos os pontos.
+
+Confere também que a reta de tendência é a de mínimos quadrados (np.polyfit)
+e que a amostra mantém os extremos de preço.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_graficos --registros 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.graficos import preparar_dispersao
+
+
+def gerar_dados(quantidade, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.lognormal(3, 1.2, quantidade).round()
+    y = rng.lognormal(2, 0.6, quantidade) * (1 - 0.002 * np.log1p(x))
+    # Alguns preços muito fora da curva, que a amostra não pode perder
+    y[rng.choice(quantidade, max(1, quantidade // 10_000), replace=False)] *= 50
+    return pd.Series(x), pd.Series(y)
+
+
+def tamanho_json(df):
+    return len(json.dumps(df.to_dict(orient='list')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for quantidade in args.registros:
+        x, y = gerar_dados(quantidade)
+        inicio = time.perf_counter()
+        graficos = preparar_dispersao(x, y)
+        t_preparo = time.perf_counter() - inicio
+
+        inclinacao, intercepto = np.polyfit(x, y, 1)
+        tendencia = graficos['tendencia']
+        assert np.isclose(tendencia['inclinacao'], inclinacao) and np.isclose(tendencia['intercepto'], intercepto)
+        assert graficos['pontos']['y'].max() == y.max() and graficos['pontos']['y'].min() == y.min()
+
+        completo = tamanho_json(pd.DataFrame({'x': x, 'y': y}))
+        enviado = sum(tamanho_json(graficos[parte]) for parte in ('pontos', 'densidade', 'histograma'))
+        print(f"{quantidade:>9} registros: preparo {t_preparo * 1e3:.0f} ms, "
+              f"{len(graficos['pontos'])} pontos, {len(graficos['densidade'])} células; "
+              f"enviado {enviado / 1e3:.0f} kB em vez de {completo / 1e3:.0f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tempo de partida de cada ponto de entrada (app, páginas e cli.py).
+
+Roda num processo novo, com `python -X importtime`, só os imports do topo do
+arquivo: o que o Streamlit executa antes de desenhar qualquer coisa. Para
+cada entrada mostra o tempo total (a menor de várias repetições), os pacotes
+mais pesados e se algum módulo que deveria ser importado só no primeiro uso
+(gráficos, agentes, cliente HTTP) entrou na partida.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_importacao --repeticoes 5
+"""
+import argparse
+import ast
+import subprocess
+import sys
+from collections import defaultdict
+
+ENTRADAS = ['app.py', 'pages/1_🤖_Analista.py', 'pages/2_📊_Analise.py', 'pages/3_📄_Relatório.py', 'cli.py']
+
+# Módulos carregados só quando a aba, a página ou o agente que os usa aparece
+# (o Streamlit já importa a base do plotly, mas não o plotly.express)
+ADIADOS = ('plotly.express', 'altair', 'langchain_core', 'langchain_openai', 'langchain_experimental',
+           'openai', 'aiohttp')
+
+# Orçamento de partida (ms) de cada entrada
+ORCAMENTO_MS = 1500
+
+
+# Módulos que o interpretador carrega antes do código (site, encodings...), fora da conta
+PARTIDA_INTERPRETADOR = set()
+
+
+def imports_do_topo(caminho):
+    """Código com os imports de nível de módulo do arquivo, na ordem em que aparecem."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read())
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def medir(codigo):
+    """
+    Tempo dos imports pela saída de -X importtime.
+
+    :return: (milissegundos, {pacote importado diretamente: milissegundos}, nomes de todos os módulos carregados)
+    """
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+    pacotes = defaultdict(float)
+    carregados = set()
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha.split('|')
+        carregados.add(nome.strip())
+        # Só os módulos importados diretamente (sem recuo); os demais já estão no acumulado deles
+        if not nome.startswith('  ', 1) and nome.strip() not in PARTIDA_INTERPRETADOR:
+            pacotes[nome.strip().split('.')[0]] += int(acumulado) / 1e3
+    return sum(pacotes.values()), dict(pacotes), carregados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--orcamento", type=float, default=ORCAMENTO_MS, help="Tempo máximo de partida (ms) por entrada")
+    parser.add_argument("entradas", nargs="*", default=ENTRADAS)
+    args = parser.parse_args()
+
+    PARTIDA_INTERPRETADOR.update(medir('pass')[2])
+    acima = []
+    for entrada in args.entradas:
+        codigo = imports_do_topo(entrada)
+        try:
+            total, pacotes, carregados = min((medir(codigo) for _ in range(args.repeticoes)), key=lambda medida: medida[0])
+        except RuntimeError as erro:
+            print(f"{entrada}: não importa neste ambiente ({erro})")
+            acima.append(entrada)
+            continue
+        pesados = sorted(pacotes.items(), key=lambda item: -item[1])[:5]
+        adiantados = [a for a in ADIADOS if any(m == a or m.startswith(a + '.') for m in carregados)]
+        print(f"{entrada}: {total:.0f} ms")
+        print("  mais pesados: " + ", ".join(f"{nome} {ms:.0f} ms" for nome, ms in pesados))
+        if adiantados:
+            print(f"  importados na partida, mas deveriam esperar o primeiro uso: {', '.join(adiantados)}")
+        if total > args.orcamento or adiantados:
+            acima.append(entrada)
+
+    if acima:
+        print(f"Fora do orçamento ({args.orcamento:.0f} ms, sem {', '.join(ADIADOS[:2])}...): {', '.join(acima)}")
+        sys.exit(1)
+    print(f"Todas as entradas dentro do orçamento de {args.orcamento:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compara o uso de memória do DataFrame montado direto da lista de registros
+(tudo object, como era antes) com o DataFrame compactado pelo esquema de
+utils/config.py, e confere que a exibição formatada não muda.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_memoria --registros 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.acumulador import converter_colunas_data
+from utils.dataset import construir_dataframe, normalizar_dataset
+from utils.formatacao import aplicar_formatacoes_colunas
+from utils.referencias import TRADUCOES_COLUNAS
+
+
+def bytes_por_linha(df):
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registros = gerar_registros(args.registros, seed=args.seed)
+
+    inicio = time.perf_counter()
+    antes = normalizar_dataset(converter_colunas_data(pd.DataFrame(registros)))
+    t_antes = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    depois = normalizar_dataset(converter_colunas_data(construir_dataframe(registros)))
+    t_depois = time.perf_counter() - inicio
+
+    b_antes, b_depois = bytes_por_linha(antes), bytes_por_linha(depois)
+    print(f"registros={len(registros)}")
+    print(f"antes:  {b_antes:8.0f} bytes/linha, {len(antes.columns)} colunas, montagem {t_antes:.2f} s")
+    print(f"depois: {b_depois:8.0f} bytes/linha, {len(depois.columns)} colunas, montagem {t_depois:.2f} s")
+    print(f"redução: {b_antes / b_depois:.1f}x")
+
+    # A sessão guarda df, a cópia formatada e df_analise; cópias rasas não duplicam os dados
+    sessao = depois.copy(deep=False)
+    compartilha = np.shares_memory(sessao['precoUnitario'].to_numpy(), depois['precoUnitario'].to_numpy())
+    print(f"cópia rasa compartilha os dados: {compartilha}")
+
+    # Colunas traduzidas (código -> nome) mudam de propósito
+    colunas = [c for c in depois.columns if c in antes.columns and c not in TRADUCOES_COLUNAS]
+    formatado_antes = aplicar_formatacoes_colunas(antes[colunas].copy()).astype(str)
+    formatado_depois = aplicar_formatacoes_colunas(depois[colunas].copy()).astype(str)
+    diferencas = (formatado_antes != formatado_depois).sum()
+    print("exibição idêntica:", not diferencas.any(), "" if not diferencas.any() else diferencas[diferencas > 0].to_dict())
+
+
+if __name__ == "__main__":
+    main()
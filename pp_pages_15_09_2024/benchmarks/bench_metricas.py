@@ -0,0 +1,92 @@
+"""
+Instrumentação (utils.metricas): custo por observação, precisão dos quantis
+dos histogramas e as métricas de uma coleta contra o servidor local.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_metricas --paginas 300 --taxa-erro 0.05
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.servidor_stub import iniciar_servidor
+from utils import apis
+from utils.metricas import Histograma, Metricas, metricas
+
+
+def medir_custo(repeticoes=100_000):
+    registro = Metricas()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        registro.observar('http_latencia_segundos', 0.05, status='200')
+    t_observar = (time.perf_counter() - inicio) / repeticoes
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        with registro.medir('formatacao'):
+            pass
+    t_medir = (time.perf_counter() - inicio) / repeticoes
+    print(f"custo: observar {t_observar * 1e6:.1f} µs, bloco medido {t_medir * 1e6:.1f} µs por chamada")
+
+
+def conferir_quantis(amostras=50_000, seed=0):
+    # Latências com cauda longa, como as da API
+    valores = np.random.default_rng(seed).lognormal(mean=np.log(0.2), sigma=0.8, size=amostras)
+    histograma = Histograma()
+    for valor in valores:
+        histograma.observar(float(valor))
+    for q in (0.5, 0.95):
+        estimado, exato = histograma.quantil(q), float(np.quantile(valores, q))
+        indice = next(i for i, limite in enumerate(histograma.faixas) if exato <= limite)
+        largura = histograma.faixas[indice] - (histograma.faixas[indice - 1] if indice else 0.0)
+        assert abs(estimado - exato) <= largura, (q, estimado, exato)
+        print(f"p{int(q * 100)}: histograma {estimado * 1e3:.0f} ms, exato {exato * 1e3:.0f} ms "
+              f"(erro dentro da faixa de {largura * 1e3:.0f} ms)")
+
+
+async def coletar(paginas, latencia, taxa_erro):
+    total_registros = paginas * apis.REGISTROS_POR_PAGINA
+    runner, url = await iniciar_servidor(total_registros, latencia=latencia, taxa_erro=taxa_erro,
+                                         periodo=(date(2024, 1, 1), date(2024, 12, 31)))
+    try:
+        resultado = await apis.consultar_api_governo_async("123456", "2024-01-01", "2024-12-31", url=url, usar_cache=False)
+    finally:
+        await runner.cleanup()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paginas", type=int, default=300)
+    parser.add_argument("--latencia", type=float, default=0.01)
+    parser.add_argument("--taxa-erro", type=float, default=0.05)
+    args = parser.parse_args()
+
+    medir_custo()
+    conferir_quantis()
+
+    apis.BACKOFF_BASE = 0.01
+    metricas.limpar()
+    resultado = asyncio.run(coletar(args.paginas, args.latencia, args.taxa_erro))
+    recebidas = metricas.contador('http_paginas_total')
+    perdidas = metricas.contador('http_paginas_perdidas_total')
+    # As fatias de datas podem somar algumas páginas de sondagem às do período inteiro
+    assert recebidas + perdidas >= args.paginas, (recebidas, perdidas)
+    assert len(resultado['paginas_faltantes']) == perdidas
+    print(f"coleta de {args.paginas} páginas (taxa de erro {args.taxa_erro:.0%}): {metricas.paginas_por_segundo():.0f} páginas/s, "
+          f"{metricas.contador('http_repeticoes_total')} repetições, {perdidas} páginas perdidas")
+    resumo = pd.DataFrame(metricas.resumo())
+    resumo['rotulos'] = resumo['rotulos'].map(lambda rotulos: ",".join(f"{k}={v}" for k, v in rotulos.items()))
+    print(resumo[['nome', 'rotulos', 'n', 'media', 'p50', 'p95', 'maximo']].to_string(index=False, float_format="%.4f"))
+
+    prometheus = metricas.para_prometheus()
+    jsonl = metricas.para_jsonl()
+    print(f"exportação: {len(prometheus.splitlines())} linhas no formato do Prometheus, {len(jsonl.splitlines())} eventos em JSON lines")
+
+
+if __name__ == "__main__":
+    main()
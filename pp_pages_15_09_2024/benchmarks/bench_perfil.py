@@ -0,0 +1,94 @@
+"""
+Compara o agente com e sem o perfil do dataset no prompt, numa lista
+roteirizada de perguntas: chamadas à ferramenta python, iterações e tokens
+de entrada por pergunta.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_perfil --modelo gpt-4o-mini
+
+Rodar o agente exige langchain_experimental e a chave da OpenAI; sem eles o
+script mostra só o tamanho e o custo de montar o perfil.
+"""
+import argparse
+import os
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agents_tools.ag_to import criar_agente_dataframe, montar_prefixo
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import construir_dataframe, normalizar_dataset
+from utils.perfil import perfil_dataset
+
+PERGUNTAS = [
+    "Quais são as colunas e os tipos dos dados?",
+    "Qual a faixa de preço unitário mais comum?",
+    "Qual estado tem a maior mediana de preço?",
+    "Em qual período as compras aconteceram?",
+    "Quais os fornecedores mais frequentes?",
+    "A modalidade influencia o preço unitário?",
+    "Qual o preço médio em SP em 2024?",
+    "Quantos fornecedores distintos venderam acima de R$ 50?",
+]
+
+
+class ContadorAgente(BaseCallbackHandler):
+    """Conta chamadas à ferramenta, chamadas ao LLM e tokens de entrada."""
+
+    def __init__(self):
+        self.ferramentas = 0
+        self.chamadas_llm = 0
+        self.tokens_entrada = 0
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.ferramentas += 1
+
+    def on_llm_end(self, response, **kwargs):
+        self.chamadas_llm += 1
+        for geracoes in response.generations:
+            for geracao in geracoes:
+                uso = getattr(getattr(geracao, 'message', None), 'usage_metadata', None) or {}
+                self.tokens_entrada += uso.get('input_tokens', 0)
+
+
+def rodar_perguntas(df, modelo, incluir_perfil):
+    agente = criar_agente_dataframe(df, modelo, incluir_perfil=incluir_perfil)
+    contador = ContadorAgente()
+    for pergunta in PERGUNTAS:
+        agente.invoke({'input': pergunta}, config={'callbacks': [contador]})
+    n = len(PERGUNTAS)
+    return contador.ferramentas / n, contador.chamadas_llm / n, contador.tokens_entrada / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modelo", default="gpt-4o-mini")
+    parser.add_argument("--registros", type=int, default=20_000)
+    args = parser.parse_args()
+
+    df = normalizar_dataset(construir_dataframe(gerar_registros(args.registros)))
+    inicio = time.perf_counter()
+    perfil = perfil_dataset(df)
+    t_perfil = time.perf_counter() - inicio
+    print(f"perfil: {len(perfil)} caracteres (~{len(perfil) // 4} tokens), montado em {t_perfil * 1e3:.0f} ms")
+    print(f"prefixo: {len(montar_prefixo(df, False))} -> {len(montar_prefixo(df))} caracteres")
+
+    try:
+        import langchain_experimental  # noqa: F401
+    except ImportError:
+        print("langchain_experimental não instalado; comparação com o agente não executada")
+        return
+    if not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY não definida; comparação com o agente não executada")
+        return
+
+    for incluir_perfil in (False, True):
+        ferramentas, chamadas, tokens = rodar_perguntas(df, args.modelo, incluir_perfil)
+        rotulo = "com perfil" if incluir_perfil else "sem perfil"
+        print(f"{rotulo}: {ferramentas:.2f} chamadas à ferramenta, {chamadas:.2f} chamadas ao LLM "
+              f"e {tokens:.0f} tokens de entrada por pergunta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Pipeline de lote (cli.py) contra um servidor local.
+
+1. Partida a frio: tempo para importar cli e utils.pipeline num processo novo,
+   e se algum módulo de interface ou de agentes (Streamlit, Plotly, Altair,
+   LangChain, OpenAI) foi carregado junto.
+2. Execução completa para vários itens: busca, análise crítica, estatísticas
+   e exportação, com o tempo de cada etapa e os arquivos gravados.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_pipeline --itens 8 --registros 2000 --processos 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.servidor_stub import iniciar_servidor
+
+MODULOS_PROIBIDOS = ('streamlit', 'plotly', 'altair', 'langchain', 'langchain_experimental', 'openai')
+
+PARTIDA = f"""
+import sys, time
+inicio = time.perf_counter()
+import cli
+from utils import pipeline
+duracao = time.perf_counter() - inicio
+print(duracao)
+print(','.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({MODULOS_PROIBIDOS!r}))))
+"""
+
+# Como referência: o que o app importa antes de fazer qualquer coisa
+PARTIDA_INTERFACE = """
+import time
+inicio = time.perf_counter()
+import streamlit, plotly.express, altair
+print(time.perf_counter() - inicio)
+"""
+
+
+def medir_partida(repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, "-c", PARTIDA], capture_output=True, text=True, check=True).stdout.split("\n")
+        tempos.append((time.perf_counter() - inicio, float(saida[0])))
+        carregados = saida[1]
+    processo, importacao = min(tempos)
+    print(f"partida a frio: {processo * 1e3:.0f} ms com o interpretador ({importacao * 1e3:.0f} ms de imports)")
+    print(f"  módulos de interface/agentes carregados: {carregados or 'nenhum'}")
+    assert not carregados, carregados
+    interface = subprocess.run([sys.executable, "-c", PARTIDA_INTERFACE], capture_output=True, text=True)
+    if interface.returncode == 0:
+        print(f"  (só Streamlit, Plotly e Altair, que o app importa antes de tudo: {float(interface.stdout) * 1e3:.0f} ms)")
+
+
+def servir_em_segundo_plano(registros, latencia):
+    """Sobe o servidor local num laço de eventos próprio, porque o pipeline roda o seu com asyncio.run."""
+    pronto = threading.Event()
+    estado = {}
+
+    def rodar():
+        laco = asyncio.new_event_loop()
+        estado['runner'], estado['url'] = laco.run_until_complete(iniciar_servidor(registros, latencia=latencia))
+        pronto.set()
+        laco.run_forever()
+
+    threading.Thread(target=rodar, daemon=True).start()
+    pronto.wait()
+    return estado['url']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--itens", type=int, default=8)
+    parser.add_argument("--registros", type=int, default=2000, help="Registros por item")
+    parser.add_argument("--latencia", type=float, default=0.01)
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--formato", nargs="+", default=["csv", "html"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    medir_partida(args.repeticoes)
+
+    from utils import apis, cache, pipeline
+    apis.BACKOFF_BASE = 0.01
+    url = servir_em_segundo_plano(args.registros, args.latencia)
+    itens = [str(150000 + i) for i in range(args.itens)]
+    with tempfile.TemporaryDirectory() as pasta:
+        cache.CAMINHO_CATALOGO = os.path.join(pasta, "cache.db")
+        saida = os.path.join(pasta, "saida")
+        inicio = time.perf_counter()
+        resumo = pipeline.executar_pipeline(itens, "2024-01-01", "2024-12-31", saida, formatos=args.formato,
+                                            usar_cache=False, max_processos=args.processos, url=url)
+        duracao = time.perf_counter() - inicio
+        with open(os.path.join(saida, "resumo.json"), encoding="utf-8") as arquivo:
+            tempos = json.load(arquivo)
+        arquivos = sorted(os.listdir(saida))
+
+    assert len(resumo) == args.itens and (resumo['registros'] == args.registros).all()
+    assert len(arquivos) == args.itens * len(args.formato) + 2
+    print(f"{args.itens} itens x {args.registros} registros, {args.processos} processos: {duracao:.2f} s "
+          f"(busca {tempos['tempo_coleta_s']:.2f} s, análise e exportação {tempos['tempo_processamento_s']:.2f} s)")
+    print(f"  {len(arquivos)} arquivos; desconsiderados por item: {resumo['desconsiderados'].tolist()}")
+
+
+if __name__ == "__main__":
+    main()
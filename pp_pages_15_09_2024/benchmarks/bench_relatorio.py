@@ -0,0 +1,63 @@
+"""
+Mede a montagem do mapa de preços com e sem o cache de seções, a exportação
+em cada formato e a exportação de vários itens em processos separados.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_relatorio --itens 8 --registros 5000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import construir_dataframe, normalizar_dataset
+from utils.relatorio import CacheSecoes, exportar_itens, exportar_relatorio, montar_relatorio
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--itens", type=int, default=8)
+    parser.add_argument("--registros", type=int, default=5_000, help="Registros por item")
+    parser.add_argument("--processos", type=int, default=4)
+    args = parser.parse_args()
+
+    df = pd.concat([
+        normalizar_dataset(construir_dataframe(gerar_registros(args.registros, codigo_item=codigo, seed=codigo)))
+        .assign(codigoItemPesquisado=str(codigo))
+        for codigo in range(100000, 100000 + args.itens)
+    ], ignore_index=True)
+    df_analise = df.copy(deep=False)
+    df_analise['Desconsiderar'] = 'Não'
+
+    cache = CacheSecoes()
+    relatorio, t_inicial = cronometrar(lambda: montar_relatorio(df, df_analise, cache=cache))
+    _, t_igual = cronometrar(lambda: montar_relatorio(df, df_analise, cache=cache))
+    df_analise.loc[df_analise.index[0], 'Desconsiderar'] = 'Sim'
+    _, t_uma_linha = cronometrar(lambda: montar_relatorio(df, df_analise, cache=cache))
+    print(f"{len(df)} registros: montagem inicial {t_inicial * 1e3:.0f} ms, sem mudanças {t_igual * 1e3:.0f} ms, "
+          f"uma linha desconsiderada {t_uma_linha * 1e3:.0f} ms ({cache.montadas} seções montadas, {cache.reaproveitadas} reaproveitadas)")
+
+    for formato in ("html", "xlsx", "pdf"):
+        try:
+            conteudo, t_primeira = cronometrar(lambda: exportar_relatorio(relatorio, formato, cache))
+            _, t_segunda = cronometrar(lambda: exportar_relatorio(relatorio, formato, cache))
+        except RuntimeError as e:
+            print(f"{formato}: {e}")
+            continue
+        print(f"{formato}: {len(conteudo) / 1e6:.1f} MB, {t_primeira * 1e3:.0f} ms (de novo: {t_segunda * 1e3:.0f} ms)")
+
+    _, t_sequencial = cronometrar(lambda: exportar_itens(df, df_analise, "html", max_processos=1))
+    _, t_paralelo = cronometrar(lambda: exportar_itens(df, df_analise, "html", max_processos=args.processos))
+    print(f"{args.itens} itens em HTML: sequencial {t_sequencial:.1f} s, {args.processos} processos {t_paralelo:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
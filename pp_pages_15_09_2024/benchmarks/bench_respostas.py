@@ -0,0 +1,79 @@
+"""
+Roda uma sessão roteirizada de perguntas de analistas e mostra quantas foram
+respondidas pela regra, pelo cache ou pelo agente, e o tempo economizado.
+
+O agente é simulado com o modelo local e uma latência fixa por chamada, no
+lugar de uma ida ao LLM. Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_respostas --latencia 2.0
+"""
+import argparse
+import time
+
+from agents_tools.modelo_local import ModeloChatLocal
+from agents_tools.respostas import CacheRespostas, resposta_rapida, responder
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import construir_dataframe
+
+PERGUNTAS = [
+    "Qual a média do preço?",
+    "qual a media do preco",
+    "Qual a mediana do preço unitário?",
+    "Qual o menor preço?",
+    "Qual o maior preço?",
+    "Quantos registros existem?",
+    "Quantos registros por estado?",
+    "Conte os registros por fornecedor",
+    "Qual a média do preço por estado?",
+    "Quais fornecedores venderam acima de R$ 50?",
+    "Quais fornecedores venderam acima de R$ 50?",
+    "Existe tendência de alta no preço em 2024?",
+    "existe tendencia de alta no preco em 2024",
+    "Qual a média do preço em SP?",
+    "Qual a média do preço?",
+]
+
+
+class AgenteLocal:
+    """Imita agent.invoke com o modelo local e uma latência fixa."""
+
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.chat = ModeloChatLocal()
+
+    def invoke(self, entrada):
+        time.sleep(self.latencia)
+        return {'output': self.chat.invoke(entrada['input']).content}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latencia", type=float, default=2.0, help="Segundos por chamada ao agente")
+    parser.add_argument("--registros", type=int, default=20_000)
+    args = parser.parse_args()
+
+    df = construir_dataframe(gerar_registros(args.registros))
+    agente = AgenteLocal(args.latencia)
+    cache = CacheRespostas()
+
+    # A regra precisa concordar com o pandas
+    esperado = df['precoUnitario'].mean()
+    assert f"R$ {esperado:.2f}" in resposta_rapida(df, "qual a média do preço?")
+    assert resposta_rapida(df, "Qual a média do preço em SP?") is None
+    assert f"{len(df)}" in resposta_rapida(df, "quantos registros há?")
+    # Perguntas sobre outra coluna vão para o agente, não para o preço ou a contagem
+    for pergunta in ["qual a média da quantidade?", "qual o maior valor de quantidade?", "qual a quantidade total?"]:
+        assert resposta_rapida(df, pergunta) is None, pergunta
+
+    for pergunta in PERGUNTAS:
+        resposta = responder(agente, df, pergunta, "gpt-4o", cache=cache)
+        print(f"{resposta['origem']:>6}  {resposta['tempo'] * 1e3:8.1f} ms  {pergunta}")
+
+    resumo = cache.resumo()
+    print(f"\n{resumo['perguntas']} perguntas: {resumo['regra']} por regra, {resumo['cache']} do cache, "
+          f"{resumo['agente']} pelo agente")
+    print(f"taxa de acerto: {resumo['taxa_acerto']:.0%} | tempo economizado: {resumo['tempo_economizado_s']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
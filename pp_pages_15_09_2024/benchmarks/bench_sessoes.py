@@ -0,0 +1,92 @@
+"""
+Sessões salvas (utils.sessoes): gravar e reabrir uma análise grande sem a API.
+
+Monta a análise de N registros sintéticos (com desconsideradas, excluídas e
+a ordem alterada), grava a sessão e mede a reabertura em partes: o mapeamento
+do arquivo (que não deve alocar nada), a conversão para pandas e a volta da
+análise crítica. Confere que dados, marcações e estatísticas voltam iguais.
+Como referência, mostra o tempo de montar o mesmo DataFrame a partir dos
+registros da API, sem contar a busca.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_sessoes --registros 500000
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from benchmarks.dados_sinteticos import PERFIL_REALISTA, gerar_registros
+from utils import sessoes
+from utils.acumulador import converter_colunas_data
+from utils.analise import AnaliseCritica
+from utils.dataset import construir_dataframe, normalizar_dataset
+
+
+def melhor_de(repeticoes, funcao):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, default=500_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    registros = gerar_registros(args.registros, **PERFIL_REALISTA)
+    t_montar, df = melhor_de(1, lambda: normalizar_dataset(converter_colunas_data(construir_dataframe(registros))))
+    del registros
+    analise = AnaliseCritica(df)
+    analise.marcar_outliers()
+    analise.excluir_desconsideradas()
+    analise.marcar({linha: True for linha in df.index[:100]})
+    analise.priorizar_fora_limites()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        t_salvar, caminho = melhor_de(1, lambda: sessoes.salvar_sessao(
+            df, analise, {'itens': ['1000'], 'data_inicial': '2024-01-01', 'data_final': '2024-12-31'}, pasta=pasta))
+        tamanho = os.path.getsize(caminho)
+
+        def mapear():
+            with pa.memory_map(caminho, 'r') as origem:
+                return ipc.open_file(origem).read_all()
+
+        alocado = pa.total_allocated_bytes()
+        t_mapear, tabela = melhor_de(args.repeticoes, mapear)
+        # Zero cópia: as colunas apontam para o arquivo mapeado, nada é alocado pelo Arrow
+        assert pa.total_allocated_bytes() == alocado, pa.total_allocated_bytes() - alocado
+        dados = tabela.drop_columns(list(sessoes.COLUNAS_ESTADO.values()))
+        t_pandas, _ = melhor_de(args.repeticoes, lambda: dados.to_pandas(split_blocks=True))
+        t_abrir, sessao = melhor_de(args.repeticoes, lambda: sessoes.abrir_sessao(caminho))
+        t_listar, lista = melhor_de(args.repeticoes, lambda: sessoes.listar_sessoes(pasta))
+
+    pd.testing.assert_frame_equal(sessao['df'], df)
+    reaberta = sessao['analise']
+    pd.testing.assert_frame_equal(reaberta.tabela(), analise.tabela())
+    for chave, valor in analise.estatisticas.resumo().items():
+        assert math.isclose(reaberta.estatisticas.resumo()[chave], valor, rel_tol=1e-9, abs_tol=1e-6), (chave, reaberta.estatisticas.resumo()[chave], valor)
+    assert len(lista) == 1 and lista[0]['registros'] == args.registros
+
+    print(f"{args.registros} registros, {analise.excluidas.sum()} excluídas, {analise.desconsideradas.sum()} desconsideradas")
+    print(f"  arquivo: {tamanho / 1e6:.1f} MB (DataFrame: {df.memory_usage(deep=True).sum() / 1e6:.1f} MB), gravado em {t_salvar * 1e3:.0f} ms")
+    print(f"  reabrir: {t_abrir * 1e3:.1f} ms no total")
+    print(f"    mapear o arquivo: {t_mapear * 1e3:.2f} ms, sem alocar memória")
+    print(f"    converter para pandas: {t_pandas * 1e3:.1f} ms")
+    print(f"    restaurar a análise crítica: ~{(t_abrir - t_mapear - t_pandas) * 1e3:.1f} ms")
+    print(f"  listar as sessões (só metadados): {t_listar * 1e3:.2f} ms")
+    print(f"  referência: montar o DataFrame a partir dos registros da API: {t_montar * 1e3:.0f} ms (sem a busca)")
+
+
+if __name__ == "__main__":
+    main()
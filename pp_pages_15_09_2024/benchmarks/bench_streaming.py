@@ -0,0 +1,69 @@
+"""
+Mede o tempo até o primeiro token das respostas em streaming, comparado com
+esperar a resposta inteira, e confere cancelamento e tempo limite.
+
+Usa o modelo local com um atraso por token, no lugar do LLM. Execute a partir
+da raiz do projeto:
+
+    python -m benchmarks.bench_streaming --palavras 120 --atraso-token 0.02
+"""
+import argparse
+import threading
+import time
+
+from langchain_core.runnables import RunnableLambda
+
+from agents_tools.ag_to import transmitir_resposta
+from agents_tools.modelo_local import ModeloChatLocal
+
+
+def criar_cadeia(palavras, atraso_token):
+    # Mesma entrada do agente ({'input': ...}) e eventos de streaming do modelo de chat
+    resposta = " ".join(f"palavra{i}" for i in range(palavras))
+    modelo = ModeloChatLocal(respostas=[resposta], atraso_token=atraso_token)
+    return RunnableLambda(lambda entrada: entrada['input']) | modelo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--palavras", type=int, default=120)
+    parser.add_argument("--atraso-token", type=float, default=0.02)
+    args = parser.parse_args()
+
+    cadeia = criar_cadeia(args.palavras, args.atraso_token)
+
+    inicio = time.perf_counter()
+    cadeia.invoke({'input': "Resuma os dados"})
+    t_inteira = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    t_primeiro = None
+    partes = []
+    for parte in transmitir_resposta(cadeia, "Resuma os dados"):
+        if t_primeiro is None:
+            t_primeiro = time.perf_counter() - inicio
+        partes.append(parte)
+    t_total = time.perf_counter() - inicio
+    assert len("".join(partes).split()) == args.palavras
+    print(f"resposta inteira: {t_inteira * 1e3:.0f} ms")
+    print(f"streaming: primeiro token em {t_primeiro * 1e3:.0f} ms, total {t_total * 1e3:.0f} ms")
+
+    # Cancelamento: uma pergunta nova sinaliza a anterior, que para de gerar
+    cancelar = threading.Event()
+    recebidas = 0
+    inicio = time.perf_counter()
+    for _ in transmitir_resposta(cadeia, "Resuma os dados", cancelar=cancelar):
+        recebidas += 1
+        if recebidas == 3:
+            cancelar.set()
+    print(f"cancelamento: {recebidas} partes recebidas, parou em {(time.perf_counter() - inicio) * 1e3:.0f} ms")
+    assert recebidas < args.palavras
+
+    # Tempo limite menor que a resposta inteira
+    partes = list(transmitir_resposta(cadeia, "Resuma os dados", tempo_maximo=t_inteira / 4))
+    assert "Tempo limite" in partes[-1]
+    print(f"tempo limite: resposta interrompida após {len(partes) - 1} partes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Suíte de desempenho das etapas do app, em vários tamanhos de lote.
+
+Para cada tamanho (padrão: 1 mil, 100 mil e 1 milhão de registros no
+PERFIL_REALISTA de dados_sinteticos) mede:
+
+- coleta: consultar_api_governo_async contra o servidor local (até --max-coleta registros)
+- dataframe: construir_dataframe + converter_colunas_data + normalizar_dataset
+- formatacao: aplicar_formatacoes_colunas, como na tabela do app
+- limpar_e_converter: a versão escalar de utils.utils, aplicada a cada valor do preço
+- converter_numerico: a versão vetorizada que o app usa no lugar dela
+- estatisticas: calcular_estatisticas sobre o preço
+- graficos: preparar_dispersao (quantidade x preço)
+
+Cada etapa repete até --repeticoes vezes (menos, se passar de --tempo-etapa
+segundos) e fica com o menor tempo. Os resultados podem ser gravados em JSON e
+comparados com uma execução anterior, que serve de base:
+
+    python -m benchmarks.bench_suite --salvar base.json
+    python -m benchmarks.bench_suite --base base.json --tolerancia 0.25
+
+Com --base, termina com código 1 se alguma etapa ficou mais lenta que a
+tolerância permite.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados_sinteticos import PERFIL_REALISTA, gerar_registros
+from benchmarks.servidor_stub import gerar_registro, gerar_registro_realista, iniciar_servidor
+from utils import apis
+from utils.acumulador import converter_colunas_data
+from utils.config import COLUMN_CONFIG
+from utils.dataset import coluna_numerica, construir_dataframe, normalizar_dataset
+from utils.formatacao import aplicar_formatacoes_colunas, converter_numerico
+from utils.graficos import preparar_dispersao
+from utils.utils import calcular_estatisticas, limpar_e_converter
+
+TAMANHOS = [1_000, 100_000, 1_000_000]
+# Diferenças menores que esta (s) são ruído, mesmo que passem da tolerância
+RUIDO_S = 0.005
+
+
+def medir(funcao, repeticoes, tempo_etapa):
+    """Menor tempo de até `repeticoes` chamadas, parando quando a soma passar de `tempo_etapa` segundos."""
+    tempos = []
+    while len(tempos) < repeticoes and sum(tempos) < tempo_etapa:
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), len(tempos)
+
+
+async def coletar(quantidade, latencia, taxa_erro, realista):
+    runner, url = await iniciar_servidor(quantidade, latencia=latencia, taxa_erro=taxa_erro,
+                                         periodo=(date(2024, 1, 1), date(2024, 12, 31)),
+                                         gerador=gerar_registro_realista if realista else gerar_registro)
+    try:
+        resultado = await apis.consultar_api_governo_async("123456", "2024-01-01", "2024-12-31", url=url, usar_cache=False)
+    finally:
+        await runner.cleanup()
+    assert resultado['total_registros'] == quantidade and not resultado['paginas_faltantes'], resultado['paginas_faltantes']
+
+
+def medir_tamanho(quantidade, args, proporcoes):
+    """Tempos das etapas para um tamanho de lote: {etapa: (segundos, repetições)}."""
+    tempos = {}
+    if quantidade <= args.max_coleta:
+        tempos['coleta'] = medir(lambda: asyncio.run(coletar(quantidade, args.latencia, args.taxa_erro, bool(proporcoes))),
+                                 args.repeticoes, args.tempo_etapa)
+
+    registros = gerar_registros(quantidade, seed=args.seed, **proporcoes)
+    precos = pd.Series([registro['precoUnitario'] for registro in registros], dtype=object)
+    montado = {}
+
+    def construir():
+        montado['df'] = normalizar_dataset(converter_colunas_data(construir_dataframe(registros)))
+
+    tempos['dataframe'] = medir(construir, args.repeticoes, args.tempo_etapa)
+    df = montado.pop('df')
+    # Os registros em dicionário ocupam bem mais que o DataFrame: liberados antes das outras etapas
+    del registros
+    gc.collect()
+
+    preco, quantidade_ = coluna_numerica(df, 'precoUnitario'), coluna_numerica(df, 'quantidade')
+
+    def graficos():
+        preparar_dispersao(quantidade_.to_numpy(), preco.to_numpy())
+
+    tempos['formatacao'] = medir(lambda: aplicar_formatacoes_colunas(df.copy(deep=False)), args.repeticoes, args.tempo_etapa)
+    tempos['limpar_e_converter'] = medir(lambda: precos.map(limpar_e_converter), args.repeticoes, args.tempo_etapa)
+    tempos['converter_numerico'] = medir(lambda: converter_numerico(precos), args.repeticoes, args.tempo_etapa)
+    tempos['estatisticas'] = medir(lambda: calcular_estatisticas(preco), args.repeticoes, args.tempo_etapa)
+    tempos['graficos'] = medir(graficos, args.repeticoes, args.tempo_etapa)
+    return tempos
+
+
+def ambiente():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def comparar(atual, base, tolerancia):
+    """
+    Tabela atual x base por etapa e tamanho.
+
+    :return: (DataFrame com as duas medidas e a razão, DataFrame só com as regressões)
+    """
+    chaves = ['etapa', 'registros']
+    tabela = pd.DataFrame(atual['resultados']).merge(
+        pd.DataFrame(base['resultados'])[chaves + ['segundos']], on=chaves, how='left', suffixes=('', '_base'))
+    tabela['razao'] = tabela['segundos'] / tabela['segundos_base']
+    regressoes = tabela[(tabela['razao'] > 1 + tolerancia) & (tabela['segundos'] - tabela['segundos_base'] > RUIDO_S)]
+    return tabela, regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS)
+    parser.add_argument("--perfil", choices=["realista", "limpo"], default="realista", help="Proporções de dados sujos dos registros")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--tempo-etapa", type=float, default=10.0, help="Segundos a partir dos quais uma etapa para de repetir")
+    parser.add_argument("--max-coleta", type=int, default=100_000,
+                        help="Maior lote buscado pelo servidor local (acima dele a coleta fica de fora: 1 milhão são 50 mil páginas)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência do servidor local na etapa de coleta")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Taxa de erro do servidor local na etapa de coleta")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salvar", help="Grava os resultados neste JSON")
+    parser.add_argument("--base", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento relativo de tempo aceito em relação à base")
+    args = parser.parse_args()
+
+    proporcoes = PERFIL_REALISTA if args.perfil == "realista" else {}
+    # Os registros sintéticos têm os mesmos campos que a tabela do app configura
+    faltando = set(COLUMN_CONFIG) - set(gerar_registros(1, **proporcoes)[0])
+    assert not faltando, faltando
+
+    apis.BACKOFF_BASE = 0.01
+    resultados = []
+    for quantidade in args.tamanhos:
+        for etapa, (segundos, repeticoes) in medir_tamanho(quantidade, args, proporcoes).items():
+            resultados.append({'etapa': etapa, 'registros': quantidade, 'segundos': segundos, 'repeticoes': repeticoes,
+                               'registros_s': quantidade / segundos if segundos else None})
+            print(f"{quantidade:>9} {etapa:<20} {segundos * 1e3:10.1f} ms ({repeticoes}x)", flush=True)
+
+    atual = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': ambiente(),
+        'parametros': {'perfil': args.perfil, 'seed': args.seed, 'repeticoes': args.repeticoes,
+                       'latencia': args.latencia, 'taxa_erro': args.taxa_erro},
+        'resultados': resultados,
+    }
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as arquivo:
+            json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+        print(f"Resultados gravados em {args.salvar}")
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        if base['ambiente'] != atual['ambiente']:
+            print(f"Atenção: a base foi medida em outro ambiente ({base['ambiente']})")
+        tabela, regressoes = comparar(atual, base, args.tolerancia)
+        print(tabela[['etapa', 'registros', 'segundos_base', 'segundos', 'razao']].to_string(index=False, float_format="%.4f"))
+        if len(regressoes):
+            print(f"Mais lentas que a base (tolerância de {args.tolerancia:.0%}): "
+                  + ", ".join(f"{linha.etapa}/{linha.registros} ({linha.razao:.2f}x)" for linha in regressoes.itertuples()))
+            sys.exit(1)
+        print(f"Nenhuma etapa mais lenta que a base além da tolerância de {args.tolerancia:.0%}")
+
+
+if __name__ == "__main__":
+    main()
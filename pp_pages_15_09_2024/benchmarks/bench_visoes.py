@@ -0,0 +1,80 @@
+"""
+Mede o custo de um rerun sem mudanças nas visões derivadas (tabela formatada,
+máscara de outliers, dados dos gráficos), com e sem o cache de visões, e o
+limite de memória do cache. Confere que, na análise crítica, marcar uma linha
+em Desconsiderar não refaz o gráfico e excluir uma linha refaz.
+
+Execute a partir da raiz do projeto:
+
+    python -m benchmarks.bench_visoes --registros 100000
+"""
+import argparse
+import time
+
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import coluna_numerica, construir_dataframe, normalizar_dataset
+from utils.formatacao import aplicar_formatacoes_colunas
+from utils.analise import AnaliseCritica
+from utils.graficos import preparar_dispersao
+from utils.visoes import CacheVisoes
+
+
+def montar_visoes(df, cache=None):
+    visoes = {
+        'formatada': lambda: aplicar_formatacoes_colunas(df.copy(deep=False)),
+        'fora_limites': lambda: coluna_numerica(df, 'precoUnitario').between(10, 100),
+        'dispersao': lambda: preparar_dispersao(coluna_numerica(df, 'quantidade'), coluna_numerica(df, 'precoUnitario')),
+    }
+    for nome, construir in visoes.items():
+        if cache is None:
+            construir()
+        else:
+            cache.visao(nome, df, construir)
+
+
+def cronometrar(funcao, repeticoes=5):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = normalizar_dataset(construir_dataframe(gerar_registros(args.registros)))
+    cache = CacheVisoes()
+    t_sem_cache = cronometrar(lambda: montar_visoes(df))
+    t_primeiro = cronometrar(lambda: montar_visoes(df, cache), repeticoes=1)
+    t_rerun = cronometrar(lambda: montar_visoes(df, cache))
+    print(f"{len(df)} registros: rerun sem cache {t_sem_cache * 1e3:.0f} ms, primeiro com cache {t_primeiro * 1e3:.0f} ms, "
+          f"rerun com cache {t_rerun * 1e3:.2f} ms ({cache.bytes / 1e6:.1f} MB guardados)")
+
+    # A chave é o objeto, não o conteúdo: nada dos dados é lido num rerun
+    t_chave = cronometrar(lambda: cache.visao('formatada', df, lambda: None), repeticoes=1000)
+    print(f"chave de uma visão: {t_chave * 1e6:.1f} µs, qualquer que seja o tamanho dos dados")
+
+    analise = AnaliseCritica(df)
+    montados = []
+
+    def grafico():
+        return cache.visao('dispersao', analise.base, lambda: montados.append(1), versao=analise.versao_linhas)
+
+    grafico()
+    analise.marcar({df.index[0]: True})
+    grafico()
+    assert len(montados) == 1, "marcar em Desconsiderar não muda as linhas do gráfico"
+    analise.excluir_desconsideradas()
+    grafico()
+    assert len(montados) == 2, "excluir uma linha muda as linhas do gráfico"
+
+    pequeno = CacheVisoes(max_bytes=cache.bytes // 2)
+    montar_visoes(df, pequeno)
+    assert pequeno.bytes <= pequeno.max_bytes
+    print(f"limite de {pequeno.max_bytes / 1e6:.1f} MB: {len(pequeno)} de 3 visões guardadas, {pequeno.bytes / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Registros sintéticos no formato do endpoint 1_consultarMaterial, com todos os
+campos que a API devolve (inclusive os que o app descarta) e cardinalidades
+parecidas com as reais: poucos estados e modalidades, alguns milhares de
+órgãos e fornecedores, descrições e marcas repetidas.
+
+Por padrão os registros vêm limpos. As proporções de gerar_registro (ou o
+PERFIL_REALISTA) sujam o lote como a API costuma fazer: números em texto,
+datas nulas e preços discrepantes (embalagem no lugar da unidade).
+"""
+import random
+
+ESTADOS = ["AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+           "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO"]
+PODERES = ["E", "L", "J"]
+ESFERAS = ["F", "E", "M"]
+UNIDADES = ["UN", "CX", "PCT", "FR", "KG", "L", "RL"]
+
+# Proporções de registros com números em texto, datas nulas e preços discrepantes
+PERFIL_REALISTA = {'numeros_texto': 0.15, 'datas_nulas': 0.05, 'discrepantes': 0.02}
+
+
+def _preco_texto(preco, rng):
+    texto = f"{preco:.2f}"
+    return rng.choice([texto, texto.replace('.', ','), "R$ " + texto.replace('.', ',')])
+
+
+def gerar_registro(codigo_item, indice, rng=random, numeros_texto=0.0, datas_nulas=0.0, discrepantes=0.0, data=None):
+    """
+    Gera um registro completo da API.
+
+    :param codigo_item: Código CATMAT pesquisado
+    :param indice: Posição do registro; vira o idItemCompra, que é único
+    :param rng: Instância de random.Random, para resultados reproduzíveis
+    :param numeros_texto: Proporção com preço e quantidade em texto ("12,50", "R$ 12,50", "120")
+    :param datas_nulas: Proporção sem dataResultado (metade delas também sem dataCompra)
+    :param discrepantes: Proporção com o preço multiplicado por 10, 100 ou 1000
+    :param data: Data (AAAA-MM-DD) das compras; sem ela, uma data qualquer de 2022 a 2024
+    """
+    uasg = rng.randint(150000, 154000)
+    orgao = uasg // 10
+    municipio = rng.randint(1, 800)
+    fornecedor = rng.randint(1, 5000)
+    ano = rng.choice([2022, 2023, 2024])
+    mes = rng.randint(1, 12)
+    dia = rng.randint(1, 28)
+    unidade = rng.choice(UNIDADES)
+    dia_compra = data or f"{ano}-{mes:02d}-{dia:02d}"
+    registro = {
+        "idItemCompra": indice,
+        "idCompra": f"{uasg}0500{rng.randint(1, 999):03d}{ano}",
+        "numeroItemCompra": rng.randint(1, 200),
+        "codigoItemCatalogo": int(codigo_item),
+        "descricaoItem": f"Item {codigo_item} - especificação {rng.randint(1, 40)}",
+        "siglaUnidadeFornecimento": unidade,
+        "nomeUnidadeFornecimento": f"Unidade {unidade}",
+        "capacidadeUnidadeFornecimento": rng.choice([1, 1, 1, 10, 12, 100]),
+        "siglaUnidadeMedida": unidade,
+        "nomeUnidadeMedida": f"Unidade {unidade}",
+        "quantidade": rng.randint(1, 1000),
+        "precoUnitario": round(rng.lognormvariate(3, 0.6), 2),
+        "percentualMaiorDesconto": round(rng.uniform(0, 30), 2),
+        "niFornecedor": f"{fornecedor:08d}0001{fornecedor % 97:02d}",
+        "nomeFornecedor": f"FORNECEDOR {fornecedor} LTDA",
+        "marca": rng.choice(["", "GENÉRICA", f"MARCA {rng.randint(1, 60)}"]),
+        "codigoUasg": str(uasg),
+        "nomeUasg": f"UASG {uasg}",
+        "codigoMunicipio": municipio,
+        "municipio": f"MUNICÍPIO {municipio}",
+        "estado": rng.choice(ESTADOS),
+        "codigoOrgao": orgao,
+        "nomeOrgao": f"ÓRGÃO {orgao}",
+        "poder": rng.choice(PODERES),
+        "esfera": rng.choice(ESFERAS),
+        "modalidade": rng.choice([5, 6, 6, 6, 7, 8]),
+        "forma": "SISRP",
+        "criterioJulgamento": "Menor Preço",
+        "dataCompra": f"{dia_compra}T00:00:00",
+        "dataResultado": f"{dia_compra}T00:00:00",
+        "dataHoraAtualizacaoCompra": f"{dia_compra}T10:21:33",
+        "dataHoraAtualizacaoItem": f"{dia_compra}T10:21:33",
+        "dataHoraAtualizacaoUasg": f"{dia_compra}T10:21:33",
+    }
+    # Cada proporção só sorteia quando ligada, para não mudar a sequência dos lotes limpos
+    if discrepantes and rng.random() < discrepantes:
+        registro["precoUnitario"] = round(registro["precoUnitario"] * rng.choice([10, 100, 1000]), 2)
+    if numeros_texto and rng.random() < numeros_texto:
+        registro["precoUnitario"] = _preco_texto(registro["precoUnitario"], rng)
+        registro["quantidade"] = str(registro["quantidade"])
+    if datas_nulas and rng.random() < datas_nulas:
+        registro["dataResultado"] = None
+        if rng.random() < 0.5:
+            registro["dataCompra"] = None
+    return registro
+
+
+def gerar_registros(quantidade, codigo_item=1000, seed=0, **proporcoes):
+    """Lote reproduzível; `proporcoes` são as de gerar_registro (por exemplo, **PERFIL_REALISTA)."""
+    rng = random.Random(seed)
+    return [gerar_registro(codigo_item, i, rng, **proporcoes) for i in range(quantidade)]
@@ -0,0 +1,143 @@
+"""
+Servidor HTTP local que imita o endpoint 1_consultarMaterial, com latência e
+taxa de erro configuráveis.
+
+Também roda sozinho, para usar o app contra ele (o app lê o endereço da
+variável de ambiente URL_CONSULTAR_MATERIAL):
+
+    python -m benchmarks.servidor_stub --registros 20000 --latencia 0.2 --taxa-erro 0.05 --realista --porta 8080
+    URL_CONSULTAR_MATERIAL=http://127.0.0.1:8080/modulo-pesquisa-preco/1_consultarMaterial streamlit run app.py
+"""
+import argparse
+import asyncio
+import bisect
+import random
+from datetime import date, datetime, timedelta
+from aiohttp import web
+
+from benchmarks import dados_sinteticos
+
+
+def gerar_registro(codigo_item, indice, data_resultado="2024-01-15"):
+    return {
+        "idItemCompra": indice,
+        "codigoItemCatalogo": codigo_item,
+        "precoUnitario": round(random.uniform(1, 100), 2),
+        "quantidade": random.randint(1, 1000),
+        "estado": random.choice(["DF", "SP", "RJ", "MG"]),
+        "dataResultado": data_resultado,
+    }
+
+
+def gerar_registro_realista(codigo_item, indice, data_resultado="2024-01-15"):
+    """Registro completo de dados_sinteticos, com o PERFIL_REALISTA; o mesmo índice gera sempre o mesmo registro."""
+    return dados_sinteticos.gerar_registro(codigo_item, indice, random.Random(indice), data=data_resultado[:10],
+                                           **dados_sinteticos.PERFIL_REALISTA)
+
+
+def distribuir_datas(total_registros, periodo, concentracao=1.0):
+    """
+    Datas (ISO, em ordem) dos registros espalhados pelo período.
+
+    Com concentracao > 1 os registros se acumulam no fim do período, como nos
+    itens cujas compras cresceram nos últimos anos.
+    """
+    inicio, fim = periodo
+    dias = (fim - inicio).days + 1
+    return [
+        (inicio + timedelta(days=min(int(dias * (i / total_registros) ** (1 / concentracao)), dias - 1))).isoformat()
+        for i in range(total_registros)
+    ]
+
+
+async def iniciar_servidor(total_registros, latencia=0.0, taxa_erro=0.0, registros_por_pagina=20, porta=0,
+                           periodo=None, concentracao=1.0, requisicoes=None, variacao_latencia=0.0, gerador=gerar_registro):
+    """
+    Sobe um servidor HTTP local que imita o endpoint 1_consultarMaterial.
+
+    :param latencia: Atraso em segundos de cada resposta
+    :param variacao_latencia: Desvio (log-normal) do atraso; com ele, umas poucas respostas demoram bem mais
+    :param taxa_erro: Probabilidade de responder 429 ou 503 em vez dos dados
+    :param periodo: (data inicial, data final) em que os registros se espalham; com ele, o
+                    servidor respeita dataInicial e dataFinal. Sem ele, todos os registros
+                    têm a mesma data e qualquer período devolve todos
+    :param concentracao: Ver distribuir_datas
+    :param requisicoes: Lista opcional que recebe (dataInicial, dataFinal, pagina) de cada requisição
+    :param gerador: Função (codigo_item, indice, data) que monta cada registro; gerar_registro_realista
+                    devolve os registros completos, com números em texto e datas nulas
+    :return: (runner, url) — chame `await runner.cleanup()` ao terminar
+    """
+    datas = distribuir_datas(total_registros, periodo, concentracao) if periodo else None
+
+    def selecionar(query):
+        # Posições [primeira, ultima) dos registros no período pedido; as datas estão em ordem
+        if datas is None:
+            return 0, total_registros
+        data_inicial = datetime.strptime(query["dataInicial"], "%d-%m-%Y").date().isoformat()
+        data_final = datetime.strptime(query["dataFinal"], "%d-%m-%Y").date().isoformat()
+        return bisect.bisect_left(datas, data_inicial), bisect.bisect_right(datas, data_final)
+
+    async def consultar_material(request):
+        await asyncio.sleep(latencia * random.lognormvariate(0, variacao_latencia) if variacao_latencia else latencia)
+        if requisicoes is not None:
+            requisicoes.append((request.query.get("dataInicial"), request.query.get("dataFinal"), request.query.get("pagina")))
+        if random.random() < taxa_erro:
+            status = random.choice([429, 503])
+            return web.Response(status=status, headers={"Retry-After": "0"} if status == 429 else None)
+
+        pagina = int(request.query.get("pagina", 1))
+        codigo_item = request.query.get("codigoItemCatalogo")
+        primeira, ultima = selecionar(request.query)
+        encontrados = ultima - primeira
+        inicio = primeira + (pagina - 1) * registros_por_pagina
+        fim = min(inicio + registros_por_pagina, ultima)
+        resultado = [gerador(codigo_item, i, datas[i] if datas else "2024-01-15") for i in range(inicio, fim)]
+        return web.json_response({
+            "resultado": resultado,
+            "totalRegistros": encontrados,
+            "totalPaginas": (encontrados - 1) // registros_por_pagina + 1 if encontrados else 0,
+        })
+
+    app = web.Application()
+    app.router.add_get("/modulo-pesquisa-preco/1_consultarMaterial", consultar_material)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", porta)
+    await site.start()
+    porta_real = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{porta_real}/modulo-pesquisa-preco/1_consultarMaterial"
+
+
+async def servir(args):
+    runner, url = await iniciar_servidor(
+        args.registros, latencia=args.latencia, taxa_erro=args.taxa_erro, porta=args.porta,
+        periodo=(date.fromisoformat(args.inicio), date.fromisoformat(args.fim)),
+        variacao_latencia=args.variacao_latencia,
+        gerador=gerar_registro_realista if args.realista else gerar_registro,
+    )
+    print(f"Servindo {args.registros} registros por item em {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registros", type=int, default=10_000, help="Registros de cada item no período")
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--variacao-latencia", type=float, default=0.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--inicio", default="2023-01-01")
+    parser.add_argument("--fim", default="2024-12-31")
+    parser.add_argument("--realista", action="store_true", help="Registros completos, com números em texto e datas nulas")
+    parser.add_argument("--porta", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
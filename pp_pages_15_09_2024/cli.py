@@ -0,0 +1,72 @@
+"""
+Pesquisa de preços em lote, sem interface: busca os itens na API, faz a
+análise crítica automática (aparo iterativo dos preços discrepantes) e grava
+a tabela e o mapa de preços de cada item, mais um resumo.csv/resumo.json.
+
+Execute a partir da raiz do projeto (usa o cache em data/catalogo.db):
+
+    python cli.py 150000 236000 --inicio 2024-01-01 --fim 2024-06-30 --saida saida --formato csv html
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+# Mesmos valores de utils.outliers.METODOS_OUTLIERS e utils.pipeline.FORMATOS_SAIDA;
+# repetidos aqui para o --help não precisar importar o pandas
+METODOS = ('desvio', 'mad', 'iqr', 'tukey')
+FORMATOS = ('csv', 'html', 'xlsx', 'pdf')
+
+
+def criar_parser():
+    hoje = date.today()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("itens", nargs="+", help="Códigos CATMAT")
+    parser.add_argument("--inicio", default=(hoje - timedelta(days=365)).isoformat(), help="Data inicial (AAAA-MM-DD); padrão: um ano atrás")
+    parser.add_argument("--fim", default=hoje.isoformat(), help="Data final (AAAA-MM-DD); padrão: hoje")
+    parser.add_argument("--saida", default="saida", help="Pasta onde os arquivos são gravados")
+    parser.add_argument("--formato", nargs="+", choices=FORMATOS, default=["csv", "html"])
+    parser.add_argument("--metodo", choices=METODOS, default="desvio", help="Critério de preço discrepante")
+    parser.add_argument("--limite-cv", type=float, default=25.0, help="Coeficiente de variação (%%) em que o aparo para")
+    parser.add_argument("--processos", type=int, default=None, help="Processos para análise e exportação (padrão: até 4)")
+    parser.add_argument("--sem-cache", action="store_true", help="Ignora o cache local e busca tudo na API")
+    parser.add_argument("--metricas", help="Grava as métricas da execução (.prom: texto do Prometheus; senão, JSON lines)")
+    parser.add_argument("--perfil", help="Grava o perfil do cProfile da execução (formato do pstats)")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    # Importado só depois dos argumentos validados
+    from utils import pipeline
+    from utils.metricas import Perfilador, metricas
+
+    perfilador = Perfilador()
+    if args.perfil:
+        perfilador.iniciar()
+    resumo = pipeline.executar_pipeline(
+        args.itens, args.inicio, args.fim, args.saida,
+        formatos=args.formato,
+        metodo=args.metodo,
+        limite_cv=args.limite_cv,
+        usar_cache=not args.sem_cache,
+        max_processos=args.processos or pipeline.MAX_PROCESSOS_EXPORTACAO,
+    )
+    if args.perfil:
+        perfilador.parar()
+        perfilador.salvar(args.perfil)
+    if args.metricas:
+        with open(args.metricas, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(metricas.para_prometheus() if args.metricas.endswith('.prom') else metricas.para_jsonl())
+    colunas = [c for c in ['item', 'registros', 'desconsiderados', 'media', 'mediana', 'cv', 'paginas_faltantes'] if c in resumo.columns]
+    print(resumo[colunas].to_string(index=False))
+    if 'paginas_nao_obtidas' in resumo.columns:
+        for item, paginas in resumo.set_index('item')['paginas_nao_obtidas'].items():
+            if paginas:
+                print(f"Páginas não obtidas do item {item}: {'; '.join(paginas)}")
+    print(f"Arquivos gravados em {args.saida}")
+    # Código 1 se algum item ficou com páginas faltando, para agendadores repetirem
+    return 1 if resumo['paginas_faltantes'].gt(0).any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
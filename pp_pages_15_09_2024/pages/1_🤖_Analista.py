@@ -1,7 +1,7 @@
 import streamlit as st
-from langchain_openai import ChatOpenAI
 import pandas as pd
-from agents_tools.ag_to import get_or_create_agent
+from agents_tools.ag_to import get_or_create_agent, limites_agente, nova_resposta
+from agents_tools.respostas import cache_respostas, responder_em_streaming
 
 
 
@@ -15,9 +15,6 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
     
     # Verificar se model_choice está no estado da sessão, caso contrário, usar um valor padrão
     model_choice = st.session_state.get("model_choice", "gpt-3.5-turbo")
-    
-    # Criação do agente DataFrame usando a função de ag_to.py
-    agent = get_or_create_agent(df, model_choice)
 
     # Inicialização do histórico de mensagens
     if "messages" not in st.session_state:
@@ -40,12 +37,13 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
                 st.markdown(prompt)
 
             with st.chat_message("assistant"):
-                message_placeholder = st.empty()
-                full_response = ""
-                with st.spinner("Analisando..."):
-                    response = agent.invoke({'input': prompt})
-                    full_response = response['output']
-                message_placeholder.markdown(full_response)
+                # Uma pergunta nova cancela a resposta anterior que ainda estiver em andamento
+                cancelar = nova_resposta()
+                # Agente DataFrame de ag_to.py, criado só se a regra e o cache não responderem
+                full_response = st.write_stream(responder_em_streaming(
+                    lambda: get_or_create_agent(df, model_choice, **limites_agente()), df, prompt, model_choice,
+                    cancelar=cancelar, tempo_maximo=limites_agente()['tempo_maximo'],
+                ))
         st.session_state.messages.append({"role": "assistant", "content": full_response})
         st.rerun()
 
@@ -56,10 +54,10 @@ with st.sidebar:
     if st.button("Limpar Histórico"):
         st.session_state.messages = []
         st.rerun()
-
-
-if "agent" in st.session_state:
-    agent = st.session_state.agent
-else:
-    st.error("Agente não encontrado. Por favor, carregue os dados na página principal primeiro.")
-
+    uso = cache_respostas.resumo()
+    if uso['perguntas']:
+        st.caption(
+            f"Respondidas sem o LLM: {uso['taxa_acerto']:.0%} de {uso['perguntas']} perguntas "
+            f"({uso['regra']} por regra, {uso['cache']} do cache) · "
+            f"tempo economizado: {uso['tempo_economizado_s']:.1f} s"
+        )
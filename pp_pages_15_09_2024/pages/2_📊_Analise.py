@@ -1,25 +1,52 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from plotly import express as px
-from utils.utils import calcular_estatisticas, aplicar_formatacoes, get_column_config, limpar_e_converter
-import altair as alt
+from utils.utils import aplicar_formatacoes, get_column_config
+from utils.analise import AnaliseCritica
+from utils.outliers import METODOS_OUTLIERS
+from utils.dataset import coluna_numerica, colunas_exibicao, ocultar_colunas_internas
+from utils.graficos import preparar_dispersao
+from utils.sessoes import salvar_sessao
+from utils.visoes import cache_visoes
 
 st.set_page_config(page_title="Análise Crítica", page_icon="📊", layout="wide")
 st.title("Análise dos Preços Coletados")
 
+# Estado da análise crítica: criado uma vez a partir do df e alterado só pelas operações (marcar, excluir, desfazer)
+def obter_analise():
+    if st.session_state.get('analise') is None:
+        st.session_state.analise = AnaliseCritica(st.session_state.df)
+        st.session_state.df_analise = st.session_state.analise.tabela()
+    return st.session_state.analise
+
 # Definição da função atualizar_estatisticas
 def atualizar_estatisticas():
-    if 'df_analise' in st.session_state and isinstance(st.session_state.df_analise, pd.DataFrame):
-        preco_unitario = st.session_state.df_analise['precoUnitario'].apply(limpar_e_converter)
-        st.session_state.media, st.session_state.limite_inferior, st.session_state.limite_superior = calcular_estatisticas(preco_unitario)
-        st.session_state.desvio_padrao = preco_unitario.std()
-        st.session_state.cv = (st.session_state.desvio_padrao / st.session_state.media) * 100 if st.session_state.media != 0 else 0
+    if 'df' in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
+        analise = obter_analise()
+        # df_analise continua disponível para as outras páginas (sem as linhas excluídas)
+        st.session_state.df_analise = analise.tabela()
+        resumo = analise.estatisticas.resumo()
+        st.session_state.media = resumo['media']
+        st.session_state.limite_inferior = resumo['limite_inferior']
+        st.session_state.limite_superior = resumo['limite_superior']
+        st.session_state.desvio_padrao = resumo['desvio_padrao']
+        st.session_state.cv = resumo['cv']
+        st.session_state.mediana = resumo['mediana']
+        st.session_state.minimo = resumo['minimo']
+        st.session_state.maximo = resumo['maximo']
+
+# Aplica só as linhas alteradas no data_editor (edited_rows guarda posição -> colunas alteradas)
+def aplicar_edicoes(chave, linhas):
+    edicoes = st.session_state[chave].get('edited_rows', {})
+    marcas = {
+        linhas[int(posicao)]: valores['Desconsiderar'] == 'Sim'
+        for posicao, valores in edicoes.items() if 'Desconsiderar' in valores
+    }
+    if obter_analise().marcar(marcas, editor=True):
+        atualizar_estatisticas()
 
 # Verificar se há dados carregados
 if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
-    if 'df_analise' not in st.session_state:
-        st.session_state.df_analise = st.session_state.df.copy()
+    analise = obter_analise()
     
     # Chama a função para inicializar as estatísticas
     atualizar_estatisticas()
@@ -30,74 +57,92 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
         filtrar_button = st.button('Filtrar pre-selecionadas')
         excluir_pre_selecionadas = st.button('Excluir pre-selecionadas')
         excluir_fora_limites = st.button('Excluir fora dos limites')
+        col_desfazer, col_refazer = st.columns(2)
+        desfazer_button = col_desfazer.button('Desfazer', disabled=not analise.pode_desfazer, use_container_width=True)
+        refazer_button = col_refazer.button('Refazer', disabled=not analise.pode_refazer, use_container_width=True)
 
-        # Lógica dos botões
+        # Lógica dos botões (as linhas excluídas continuam na base e podem voltar com Desfazer)
         if filtrar_button:
-            df_fora_limites = st.session_state.df_analise[st.session_state.df_analise['ForaLimites'] == True]
-            df_dentro_limites = st.session_state.df_analise[st.session_state.df_analise['ForaLimites'] == False]
-            st.session_state.df_analise = pd.concat([df_fora_limites, df_dentro_limites]).reset_index(drop=True)
+            analise.priorizar_fora_limites()
             st.success('Linhas filtradas com sucesso!')
             atualizar_estatisticas()
             st.rerun()
 
         if excluir_pre_selecionadas:
-            st.session_state.df_analise = st.session_state.df_analise[st.session_state.df_analise['ForaLimites'] == False].drop(columns=['ForaLimites', 'Desconsiderar'])
+            analise.excluir_fora_limites()
             st.success('Linhas pre-selecionadas excluídas')
             atualizar_estatisticas()
             st.rerun()
 
         if excluir_fora_limites:
-            st.session_state.df_analise = st.session_state.df_analise[st.session_state.df_analise['Desconsiderar'] == 'Não'].drop(columns=['ForaLimites', 'Desconsiderar'])
+            analise.excluir_desconsideradas()
             st.success('Dados atualizados')
             atualizar_estatisticas()
             st.rerun()
 
+        if desfazer_button or refazer_button:
+            analise.desfazer() if desfazer_button else analise.refazer()
+            atualizar_estatisticas()
+            st.rerun()
+
+        # Reaberta depois pela página principal, em "Análises salvas"
+        if st.button('Salvar análise', help='Grava os dados, as marcações e os parâmetros da busca'):
+            caminho = salvar_sessao(st.session_state.df, analise, st.session_state.get('parametros_consulta'))
+            st.success(f'Análise salva em {caminho}')
+
+        st.subheader("Exclusão automática")
+        metodo_outliers = st.selectbox("Método", list(METODOS_OUTLIERS), format_func=METODOS_OUTLIERS.get)
+        limite_cv = st.number_input("CV máximo (%)", min_value=1.0, max_value=100.0, value=25.0, step=1.0)
+        if st.button('Excluir automaticamente'):
+            # Só as linhas ainda consideradas entram no cálculo
+            linhas_excluidas, resultado = analise.marcar_outliers(metodo=metodo_outliers, limite_cv=limite_cv)
+            st.session_state.rodadas_exclusao = pd.DataFrame(resultado['iteracoes'])
+            st.success(f'{len(linhas_excluidas)} linha(s) marcadas para desconsiderar em {len(resultado["iteracoes"])} rodada(s). CV final: {resultado["cv_final"]:.2f}%')
+            atualizar_estatisticas()
+            st.rerun()
+
+        if isinstance(st.session_state.get('rodadas_exclusao'), pd.DataFrame) and not st.session_state.rodadas_exclusao.empty:
+            with st.expander("Rodadas da exclusão automática"):
+                st.dataframe(st.session_state.rodadas_exclusao, hide_index=True, use_container_width=True)
+
     # Criação das tabs
     tab1, tab2, tab3, tab4 = st.tabs(["Análise Crítica", "Parâmetros", "Gráficos", "Dados Personalizados"])
 
     with tab1:
         st.header("Análise Crítica")
-        if isinstance(st.session_state.df_analise, pd.DataFrame):
-            df = st.session_state.df_analise.copy()
-            
-            # Marca as linhas fora dos limites
-            df['ForaLimites'] = (df['precoUnitario'].apply(limpar_e_converter) < st.session_state.limite_inferior) | (df['precoUnitario'].apply(limpar_e_converter) > st.session_state.limite_superior)
-
-            # Adiciona a coluna Desconsiderar se não existir
-            if 'Desconsiderar' not in df.columns:
-                df['Desconsiderar'] = 'Não'
-
-            # Configuração do editor de dados
-            config = {
-                'Resultado': st.column_config.TextColumn("Resultado", width="medium"),
-                'dataHoraAtualizacaoUasg': st.column_config.DatetimeColumn("Data Hora Atualização", format="DD/MM/YYYY HH:mm:ss"),
-                'ForaLimites': st.column_config.CheckboxColumn(
-                    'Fora dos Limites',
-                    help='Indica se o valor está fora dos limites',
-                    default=False,
-                ),
-                'Desconsiderar': st.column_config.SelectboxColumn(
-                    'Desconsiderar',
-                    help='Selecione para desconsiderar esta linha',
-                    options=['Não', 'Sim'],
-                    default='Não',
-                )
-            }
-
-            edited_df = st.data_editor(
-                df,
-                column_config=config,
-                hide_index=True,
-                disabled=['ForaLimites'],
-                use_container_width=True,
-                key="data_editor"
+        # Linhas não excluídas, com ForaLimites e Desconsiderar; remontada só quando a análise muda
+        df = analise.tabela_editor()
+
+        # Configuração do editor de dados
+        config = {
+            'Resultado': st.column_config.TextColumn("Resultado", width="medium"),
+            'dataHoraAtualizacaoUasg': st.column_config.DatetimeColumn("Data Hora Atualização", format="DD/MM/YYYY HH:mm:ss"),
+            'ForaLimites': st.column_config.CheckboxColumn(
+                'Fora dos Limites',
+                help='Indica se o valor está fora dos limites',
+                default=False,
+            ),
+            'Desconsiderar': st.column_config.SelectboxColumn(
+                'Desconsiderar',
+                help='Selecione para desconsiderar esta linha',
+                options=['Não', 'Sim'],
+                default='Não',
             )
-
-            # Atualiza df_analise com as edições
-            st.session_state.df_analise = edited_df
-
-        else:
-            st.warning("Nenhum dado carregado para análise.")
+        }
+
+        # Só Desconsiderar é editável. A chave muda quando a tabela é remontada por um botão
+        # (ou desfazer), descartando edições antigas que o editor ainda guardaria
+        chave_editor = f"data_editor_{analise.geracao}"
+        st.data_editor(
+            df,
+            column_config={**config, **ocultar_colunas_internas()},
+            hide_index=True,
+            disabled=[coluna for coluna in df.columns if coluna != 'Desconsiderar'],
+            use_container_width=True,
+            key=chave_editor,
+            on_change=aplicar_edicoes,
+            args=(chave_editor, df.index),
+        )
 
     with tab2:
         st.header("Parâmetros")
@@ -106,12 +151,12 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric(label="Média do Preço Unitário", value=f"R$ {st.session_state.media:.2f}")
-            st.metric(label="Mediana do Preço Unitário", value=f"R$ {st.session_state.df_analise['precoUnitario'].apply(limpar_e_converter).median():.2f}")
+            st.metric(label="Mediana do Preço Unitário", value=f"R$ {st.session_state.mediana:.2f}")
         with col2:
-            st.metric(label="Menor Preço Unitário", value=f"R$ {st.session_state.df_analise['precoUnitario'].apply(limpar_e_converter).min():.2f}")
+            st.metric(label="Menor Preço Unitário", value=f"R$ {st.session_state.minimo:.2f}")
             st.metric(label="Limite Inferior", value=f"R$ {st.session_state.limite_inferior:.2f}")
         with col3:
-            st.metric(label="Maior Preço Unitário", value=f"R$ {st.session_state.df_analise['precoUnitario'].apply(limpar_e_converter).max():.2f}")
+            st.metric(label="Maior Preço Unitário", value=f"R$ {st.session_state.maximo:.2f}")
             st.metric(label="Limite Superior", value=f"R$ {st.session_state.limite_superior:.2f}")
         
         # Métrica para o Coeficiente de Variação
@@ -129,14 +174,15 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
         if 'quantidade' in st.session_state.df_analise.columns and 'precoUnitario' in st.session_state.df_analise.columns:
             st.subheader("Correlação entre Quantidade e Preço Unitário")
             
-            # Converter as colunas para numérico
-            quantidade = st.session_state.df_analise['quantidade'].apply(limpar_e_converter)
-            preco_unitario = st.session_state.df_analise['precoUnitario'].apply(limpar_e_converter)
-            
-            # Criar o gráfico de dispersão
-            dados_grafico = pd.DataFrame({'quantidade': quantidade, 'preco_unitario': preco_unitario})
-            dados_grafico = dados_grafico.dropna()  # Remover linhas com valores nulos
+            # Criar o gráfico de dispersão (amostra limitada; correlação sobre todos os pontos).
+            # Marcar em Desconsiderar não muda as linhas visíveis, então não refaz o gráfico
+            graficos = cache_visoes.visao('dispersao', analise.base, lambda: preparar_dispersao(
+                coluna_numerica(st.session_state.df_analise, 'quantidade'), coluna_numerica(st.session_state.df_analise, 'precoUnitario')
+            ), versao=analise.versao_linhas)
+            dados_grafico = graficos['pontos'].rename(columns={'x': 'quantidade', 'y': 'preco_unitario'})
             
+            # Carregado só quando o gráfico é desenhado
+            import altair as alt
             grafico = alt.Chart(dados_grafico).mark_circle().encode(
                 x='quantidade',
                 y='preco_unitario',
@@ -148,9 +194,11 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
             )
             
             st.altair_chart(grafico, use_container_width=True)
+            if graficos['amostrado']:
+                st.caption(f"Exibindo {len(dados_grafico)} de {graficos['total']} pontos (amostra estratificada).")
             
             # Calcular e exibir o coeficiente de correlação
-            correlacao = dados_grafico['quantidade'].corr(dados_grafico['preco_unitario'])
+            correlacao = graficos['correlacao']
             st.write(f"Coeficiente de correlação: {correlacao:.2f}")
             
             # Interpretar a correlação
@@ -175,7 +223,7 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
             st.session_state.colunas_selecionadas = []  # Limpa as seleções
 
         # Usar o multiselect para selecionar colunas
-        colunas_selecionadas = st.multiselect("Selecione as colunas para visualizar:", st.session_state.df_analise.columns)
+        colunas_selecionadas = st.multiselect("Selecione as colunas para visualizar:", colunas_exibicao(st.session_state.df_analise))
 
         # Atualizar o estado da sessão com as colunas selecionadas
         if colunas_selecionadas:
@@ -184,12 +232,16 @@ if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
             colunas_selecionadas = st.session_state.colunas_selecionadas  # Manter a seleção anterior se nada for selecionado
 
         if st.session_state.colunas_selecionadas:
-            df_personalizado = st.session_state.df_analise[st.session_state.colunas_selecionadas]
+            colunas = tuple(st.session_state.colunas_selecionadas)
+            df_personalizado = cache_visoes.visao(
+                'personalizada', analise.base,
+                lambda: aplicar_formatacoes(st.session_state.df_analise[list(colunas)]), versao=analise.versao, colunas=colunas,
+            )
             st.dataframe(
-                aplicar_formatacoes(df_personalizado),
+                df_personalizado,
                 use_container_width=True,
                 hide_index=True,
-                column_config={col: get_column_config(col) for col in st.session_state.colunas_selecionadas}
+                column_config=cache_visoes.obter(('config_colunas', colunas), lambda: {col: get_column_config(col) for col in colunas})
             )
 
 else:
@@ -1,6 +1,72 @@
 import streamlit as st
+import pandas as pd
+from utils.relatorio import COLUNAS_ITEM, FORMATOS_RELATORIO, CacheSecoes, exportar_itens, exportar_relatorio, montar_relatorio
 
 st.set_page_config(page_title="Relatórios", page_icon="📄", layout="wide")
 st.title("Relatório e mapa de preços")
 
-# Resto do código da página...
+if "df" in st.session_state and isinstance(st.session_state.df, pd.DataFrame):
+    # Seções e arquivos já gerados ficam guardados na sessão; só o que mudou na análise é refeito
+    if "cache_relatorio" not in st.session_state:
+        st.session_state.cache_relatorio = CacheSecoes()
+    cache = st.session_state.cache_relatorio
+
+    df = st.session_state.df
+    df_analise = st.session_state.get("df_analise")
+    if not isinstance(df_analise, pd.DataFrame):
+        st.info("A análise crítica ainda não foi feita: todos os registros entram como aceitos.")
+        df_analise = None
+
+    titulo = st.text_input("Título do relatório", value="Mapa de preços")
+    relatorio = montar_relatorio(df, df_analise, titulo=titulo, cache=cache)
+    versao = (titulo, tuple(chave for chave, _ in relatorio["secoes"]))
+
+    for _, secao in relatorio["secoes"]:
+        st.subheader(secao["titulo"])
+        if secao["tipo"] == "metricas":
+            colunas = st.columns(3)
+            for i, (rotulo, valor) in enumerate(secao["dados"]):
+                colunas[i % 3].metric(label=rotulo, value=valor)
+        elif secao["tipo"] == "histograma":
+            bordas, contagens = secao["dados"]["bordas"], secao["dados"]["contagens"]
+            faixas = pd.DataFrame({"inicio": bordas[:-1], "fim": bordas[1:], "registros": contagens})
+            # Carregado só quando o relatório tem histograma
+            import altair as alt
+            grafico = alt.Chart(faixas).mark_bar().encode(
+                x=alt.X("inicio", bin="binned", title="Preço unitário"),
+                x2="fim",
+                y=alt.Y("registros", title="Registros"),
+                tooltip=["inicio", "fim", "registros"],
+            )
+            st.altair_chart(grafico, use_container_width=True)
+        else:
+            st.dataframe(secao["dados"], use_container_width=True, hide_index=True)
+
+    st.subheader("Exportar")
+    col_formato, col_gerar = st.columns([1, 3])
+    with col_formato:
+        formato = st.selectbox("Formato", list(FORMATOS_RELATORIO), format_func=str.upper)
+    with col_gerar:
+        if st.button("Gerar arquivo"):
+            try:
+                with st.spinner("Gerando relatório..."):
+                    st.session_state.arquivo_relatorio = (versao, formato, exportar_relatorio(relatorio, formato, cache))
+            except RuntimeError as e:
+                st.error(str(e))
+        # O arquivo gerado só é oferecido enquanto corresponder ao relatório exibido
+        if st.session_state.get("arquivo_relatorio") and st.session_state.arquivo_relatorio[:2] == (versao, formato):
+            tipo, extensao = FORMATOS_RELATORIO[formato]
+            st.download_button("Baixar relatório", st.session_state.arquivo_relatorio[2], file_name=f"mapa_de_precos.{extensao}", mime=tipo)
+
+    coluna_item = next((c for c in COLUNAS_ITEM if c in df.columns), None)
+    if coluna_item is not None and df[coluna_item].nunique() > 1:
+        if st.button(f"Gerar um relatório por item ({df[coluna_item].nunique()} itens, ZIP)"):
+            try:
+                with st.spinner("Gerando relatórios..."):
+                    st.session_state.arquivo_itens = (versao, formato, exportar_itens(df, df_analise, formato))
+            except RuntimeError as e:
+                st.error(str(e))
+        if st.session_state.get("arquivo_itens") and st.session_state.arquivo_itens[:2] == (versao, formato):
+            st.download_button("Baixar relatórios (ZIP)", st.session_state.arquivo_itens[2], file_name="mapas_de_precos.zip", mime="application/zip")
+else:
+    st.info("Por favor, carregue os dados usando o painel lateral antes de gerar o relatório.")
@@ -0,0 +1,63 @@
+"""
+AcumuladorResultados com registros repetidos: o cache entrega uma versão de
+cada compra e a API, depois, a versão atualizada dos últimos dias.
+
+    python -m pytest tests
+"""
+import math
+import random
+import statistics
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.acumulador import AcumuladorResultados
+from utils.utils import limpar_e_converter
+
+
+def precos_validos(registros):
+    precos = [limpar_e_converter(r['precoUnitario']) for r in registros if r['precoUnitario'] is not None]
+    return [p for p in precos if p is not None and not math.isnan(p)]
+
+
+def test_registro_posterior_substitui_o_anterior():
+    cache = gerar_registros(10)
+    atualizados = [{**registro, 'precoUnitario': 99.0} for registro in cache[5:]]
+    acumulador = AcumuladorResultados()
+    acumulador.adicionar(cache)
+    assert acumulador.adicionar(atualizados) == 5
+    assert len(acumulador) == 10
+    df = acumulador.para_dataframe()
+    assert df['precoUnitario'].tolist()[5:] == [99.0] * 5
+    n, media, _ = acumulador.estatisticas()
+    assert n == 10 and math.isclose(media, statistics.mean(precos_validos(cache[:5] + atualizados)))
+
+
+def test_estatisticas_iguais_as_dos_registros_finais():
+    rng = random.Random(0)
+    for caso in range(200):
+        base = gerar_registros(rng.randint(1, 80), seed=caso, numeros_texto=0.15)
+        acumulador = AcumuladorResultados()
+        finais = {}
+        for _ in range(rng.randint(1, 8)):
+            lote = []
+            for _ in range(rng.randint(0, 30)):
+                registro = dict(rng.choice(base))
+                if rng.random() < 0.7:
+                    registro['precoUnitario'] = round(rng.uniform(1, 100), 2)
+                elif rng.random() < 0.2:
+                    registro['precoUnitario'] = None
+                lote.append(registro)
+            acumulador.adicionar(lote)
+            finais.update((registro['idItemCompra'], registro) for registro in lote)
+
+        # Cada compra fica na posição em que apareceu pela primeira vez, com o conteúdo mais recente
+        esperado = AcumuladorResultados()
+        esperado.adicionar(list(finais.values()))
+        pd.testing.assert_frame_equal(acumulador.para_dataframe(), esperado.para_dataframe())
+        precos = precos_validos(finais.values())
+        n, media, cv = acumulador.estatisticas()
+        assert len(acumulador) == len(finais) and n == len(precos)
+        if len(precos) > 1:
+            assert math.isclose(media, statistics.mean(precos), rel_tol=1e-9)
+            assert math.isclose(cv, statistics.stdev(precos) / statistics.mean(precos) * 100, rel_tol=1e-6, abs_tol=1e-6)
@@ -0,0 +1,97 @@
+"""
+CacheAgentes com o modelo de chat local no lugar do LLM.
+
+A fábrica de agentes dos testes monta um agente simples sobre ModeloChatLocal,
+então nada aqui chama uma API. Com langchain_experimental instalado, o agente
+de verdade (criar_agente_dataframe) também é criado com o modelo local.
+
+    python -m pytest tests
+"""
+import pytest
+
+from agents_tools.ag_to import CacheAgentes, criar_agente_dataframe
+from agents_tools.modelo_local import MODELO_LOCAL, ModeloChatLocal
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import construir_dataframe
+
+
+class AgenteLocal:
+    """Responde com o modelo local; guarda os dados e as opções com que foi criado."""
+
+    def __init__(self, df, model_choice, **opcoes):
+        self.df = df
+        self.model_choice = model_choice
+        self.opcoes = opcoes
+        self.chat = ModeloChatLocal(respostas=[f"{len(df)} registros"])
+
+    def invoke(self, entrada):
+        return {'output': self.chat.invoke(entrada['input']).content}
+
+
+@pytest.fixture
+def criados():
+    return []
+
+
+@pytest.fixture
+def cache(criados):
+    def fabrica(df, model_choice, **opcoes):
+        agente = AgenteLocal(df, model_choice, **opcoes)
+        criados.append(agente)
+        return agente
+    return CacheAgentes(max_agentes=2, fabrica=fabrica)
+
+
+@pytest.fixture(scope='module')
+def df():
+    return construir_dataframe(gerar_registros(500))
+
+
+def test_mesmos_dados_modelo_e_opcoes_reaproveitam_o_agente(cache, criados, df):
+    agente = cache.obter(df, MODELO_LOCAL, max_iteracoes=5)
+    assert cache.obter(df, MODELO_LOCAL, max_iteracoes=5) is agente
+    # Mesmo conteúdo em outro objeto tem a mesma impressão
+    assert cache.obter(df.copy(), MODELO_LOCAL, max_iteracoes=5) is agente
+    assert len(criados) == 1 and cache.reaproveitados == 2
+    assert agente.invoke({'input': "Quantos registros?"})['output'] == "500 registros"
+
+
+def test_modelo_ou_opcoes_diferentes_criam_outro_agente(cache, criados, df):
+    agente = cache.obter(df, MODELO_LOCAL, max_iteracoes=5)
+    assert cache.obter(df, "gpt-4o", max_iteracoes=5) is not agente
+    assert cache.obter(df, MODELO_LOCAL, max_iteracoes=10) is not agente
+    assert len(criados) == 3
+
+
+def test_dados_alterados_recriam_o_agente(cache, criados, df):
+    agente = cache.obter(df, MODELO_LOCAL)
+    alterado = df.copy()
+    alterado.loc[alterado.index[0], 'precoUnitario'] = 123456.0
+    novo = cache.obter(alterado, MODELO_LOCAL)
+    assert novo is not agente and novo.df['precoUnitario'].iloc[0] == 123456.0
+    assert len(criados) == 2
+
+
+def test_sai_o_agente_menos_usado(cache, criados, df):
+    primeiro = cache.obter(df, MODELO_LOCAL)
+    segundo = cache.obter(df.head(10), MODELO_LOCAL)
+    # Usar o primeiro de novo faz do segundo o menos usado
+    assert cache.obter(df, MODELO_LOCAL) is primeiro
+    cache.obter(df.head(20), MODELO_LOCAL)
+    assert len(cache) == 2
+    assert cache.obter(df, MODELO_LOCAL) is primeiro
+    assert cache.obter(df.head(10), MODELO_LOCAL) is not segundo
+    assert len(criados) == 4
+
+
+def test_agente_nao_altera_os_dados_da_sessao(cache, df):
+    agente = cache.obter(df, MODELO_LOCAL)
+    agente.df.loc[agente.df.index[0], 'precoUnitario'] = -1.0
+    assert df['precoUnitario'].iloc[0] != -1.0
+
+
+def test_agente_dataframe_com_modelo_local(df):
+    pytest.importorskip('langchain_experimental')
+    chat = ModeloChatLocal(respostas=["Há 500 registros."])
+    agente = CacheAgentes(fabrica=lambda dados, modelo, **opcoes: criar_agente_dataframe(dados, modelo, chat=chat, **opcoes)).obter(df, MODELO_LOCAL)
+    assert agente.invoke({'input': "Quantos registros?"})['output'] == "Há 500 registros."
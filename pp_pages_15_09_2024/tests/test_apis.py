@@ -0,0 +1,53 @@
+"""
+Coleta (utils.apis) contra o servidor local de benchmarks.servidor_stub.
+
+    python -m pytest tests
+"""
+import asyncio
+import random
+from datetime import date, datetime
+
+from benchmarks.servidor_stub import iniciar_servidor
+from utils import apis
+from utils.metricas import metricas
+
+
+def coletar(total_registros, taxa_erro, requisicoes):
+    async def executar():
+        runner, url = await iniciar_servidor(total_registros, taxa_erro=taxa_erro, periodo=(date(2024, 1, 1), date(2024, 12, 31)),
+                                             requisicoes=requisicoes)
+        try:
+            return await apis.consultar_api_governo_async("123456", "2024-01-01", "2024-12-31", url=url, usar_cache=False)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(executar())
+
+
+def test_paginas_faltantes_identificam_a_fatia(monkeypatch):
+    # Fatias pequenas e uma tentativa só: várias fatias perdem páginas com o mesmo número
+    monkeypatch.setattr(apis, 'MAX_PAGINAS_FATIA', 3)
+    monkeypatch.setattr(apis, 'MAX_TENTATIVAS', 1)
+    random.seed(0)
+    metricas.limpar()
+    requisicoes = []
+    resultado = coletar(2_000, 0.2, requisicoes)
+
+    faltantes = resultado['paginas_faltantes']
+    assert faltantes and faltantes == sorted(faltantes)
+    assert len({pagina for _, _, pagina in faltantes}) < len(faltantes)
+    pedidas = {(datetime.strptime(inicio, "%d-%m-%Y").date(), datetime.strptime(fim, "%d-%m-%Y").date(), int(pagina))
+               for inicio, fim, pagina in requisicoes}
+    for data_inicial, data_final, pagina in faltantes:
+        assert isinstance(data_inicial, date) and isinstance(data_final, date) and data_inicial <= data_final
+        # Cada entrada é uma requisição que foi feita e pode ser repetida
+        assert (data_inicial, data_final, pagina) in pedidas
+    # Falhas e divisões de fatias chegam às métricas, não à saída padrão
+    assert metricas.contador('http_paginas_perdidas_total') == len(faltantes)
+    assert metricas.contador('coleta_fatias_divididas_total') > 0
+    assert apis.descrever_pagina_faltante((date(2024, 1, 1), date(2024, 1, 31), 3)) == "01/01/2024 a 31/01/2024, página 3"
+
+
+def test_coleta_completa_sem_paginas_faltantes(capsys):
+    resultado = coletar(500, 0.0, None)
+    assert capsys.readouterr().out == ""
+    assert resultado['total_registros'] == 500 and resultado['paginas_faltantes'] == []
@@ -0,0 +1,137 @@
+"""
+EstatisticasIncrementais contra o pandas em sequências aleatórias de exclusões
+e inclusões de linhas, pelos dois caminhos de atualização: linha a linha
+(Welford e árvore de Fenwick) e reconstrução vetorizada do lote inteiro.
+
+    python -m pytest tests
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.estatisticas import MIN_LINHAS_RECONSTRUCAO, PROPORCAO_RECONSTRUCAO, EstatisticasIncrementais
+
+
+def proximos(a, b, escala, tolerancia=1e-7):
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    # Remover valores de uma soma acumula erro de arredondamento proporcional à escala dos dados
+    return math.isclose(a, b, rel_tol=tolerancia, abs_tol=tolerancia * escala)
+
+
+def conferir(estatisticas, serie, ativos):
+    ativa = serie[ativos]
+    esperado = {
+        'media': ativa.mean(),
+        'desvio_padrao': ativa.std(),
+        'mediana': ativa.median(),
+        'minimo': ativa.min(),
+        'maximo': ativa.max(),
+        'n': ativa.count(),
+    }
+    obtido = estatisticas.resumo()
+    escala = max(1.0, float(np.nanmax(np.abs(serie.to_numpy()), initial=0.0)))
+    for chave, valor in esperado.items():
+        assert proximos(float(obtido[chave]), float(valor), escala), f"{chave}: esperado {valor}, obtido {obtido[chave]}"
+
+
+def gerar_serie(rng, tamanho):
+    valores = np.round(rng.lognormal(3, 1, tamanho), 2)
+    valores[rng.random(tamanho) < 0.1] = np.nan
+    # Preços repetidos são comuns nos dados reais
+    valores[rng.random(tamanho) < 0.2] = 10.0
+    return pd.Series(valores, index=rng.permutation(tamanho) * 7)
+
+
+@pytest.fixture
+def caminhos(monkeypatch):
+    """Conta as atualizações linha a linha e as reconstruções feitas durante o teste."""
+    contagem = {'incremental': 0, 'reconstrucao': 0}
+    atualizar, reconstruir = EstatisticasIncrementais._atualizar_arvore, EstatisticasIncrementais._reconstruir
+
+    def atualizar_contando(self, *args):
+        contagem['incremental'] += 1
+        return atualizar(self, *args)
+
+    def reconstruir_contando(self):
+        contagem['reconstrucao'] += 1
+        return reconstruir(self)
+
+    monkeypatch.setattr(EstatisticasIncrementais, '_atualizar_arvore', atualizar_contando)
+    monkeypatch.setattr(EstatisticasIncrementais, '_reconstruir', reconstruir_contando)
+    return contagem
+
+
+def executar_operacoes(rng, estatisticas, serie, operacoes, maior_lote):
+    tamanho = len(serie)
+    ativos = np.ones(tamanho, dtype=bool)
+    conferir(estatisticas, serie, ativos)
+    for _ in range(operacoes):
+        linhas = rng.choice(tamanho, size=int(rng.integers(1, min(tamanho, maior_lote) + 1)), replace=False)
+        if rng.random() < 0.6:
+            estatisticas.remover_linhas(serie.index[linhas])
+            ativos[linhas] = False
+        else:
+            estatisticas.adicionar_linhas(serie.index[linhas])
+            ativos[linhas] = True
+        conferir(estatisticas, serie, ativos)
+
+
+@pytest.mark.parametrize('limite, caminho', [(math.inf, 'incremental'), (0, 'reconstrucao')])
+def test_propriedades_por_caminho(caminhos, limite, caminho):
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        serie = gerar_serie(rng, int(rng.integers(1, 60)))
+        estatisticas = EstatisticasIncrementais(serie, limite_reconstrucao=limite)
+        executar_operacoes(rng, estatisticas, serie, int(rng.integers(1, 40)), maior_lote=3)
+    outro = 'reconstrucao' if caminho == 'incremental' else 'incremental'
+    assert caminhos[caminho] > 0 and caminhos[outro] == 0, caminhos
+
+
+def test_limite_padrao_mistura_os_dois_caminhos(caminhos):
+    # Lotes pequenos e lotes acima do mínimo na mesma sequência, com o limite padrão
+    rng = np.random.default_rng(1)
+    serie = gerar_serie(rng, 3 * MIN_LINHAS_RECONSTRUCAO)
+    estatisticas = EstatisticasIncrementais(serie)
+    assert estatisticas.limite_reconstrucao == MIN_LINHAS_RECONSTRUCAO
+    executar_operacoes(rng, estatisticas, serie, 60, maior_lote=2 * MIN_LINHAS_RECONSTRUCAO)
+    assert caminhos['incremental'] > 0 and caminhos['reconstrucao'] > 0, caminhos
+
+
+@pytest.mark.parametrize('tamanho', [10, MIN_LINHAS_RECONSTRUCAO, 3 * int(MIN_LINHAS_RECONSTRUCAO / PROPORCAO_RECONSTRUCAO)])
+def test_limite_padrao(caminhos, tamanho):
+    # O maior entre o mínimo fixo e a proporção das linhas; lotes até o limite ficam no caminho incremental
+    serie = pd.Series(np.arange(tamanho, dtype='float64'))
+    estatisticas = EstatisticasIncrementais(serie)
+    limite = max(MIN_LINHAS_RECONSTRUCAO, PROPORCAO_RECONSTRUCAO * tamanho)
+    assert estatisticas.limite_reconstrucao == limite
+    lote = min(tamanho, int(limite))
+    estatisticas.remover_linhas(serie.index[:lote])
+    assert caminhos['reconstrucao'] == 0
+    if tamanho > limite:
+        estatisticas.remover_linhas(serie.index[lote:2 * lote + 1])
+        assert caminhos['reconstrucao'] == 1
+    conferir(estatisticas, serie, np.arange(tamanho) >= (2 * lote + 1 if tamanho > limite else lote))
+
+
+def test_alternar_poucas_linhas_nao_reconstroi(caminhos):
+    serie = gerar_serie(np.random.default_rng(2), 50)
+    estatisticas = EstatisticasIncrementais(serie)
+    estatisticas.remover_linhas(serie.index[:2])
+    estatisticas.adicionar_linhas(serie.index[:2])
+    assert caminhos['reconstrucao'] == 0
+
+
+def test_definir_ativas():
+    rng = np.random.default_rng(3)
+    serie = gerar_serie(rng, 500)
+    estatisticas = EstatisticasIncrementais(serie)
+    ativos = rng.random(len(serie)) < 0.5
+    estatisticas.definir_ativas(ativos)
+    conferir(estatisticas, serie, ativos)
+    # Depois de uma troca em bloco, o caminho incremental continua consistente
+    estatisticas.remover_linhas(serie.index[:3])
+    ativos[:3] = False
+    conferir(estatisticas, serie, ativos)
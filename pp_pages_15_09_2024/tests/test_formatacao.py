@@ -0,0 +1,47 @@
+"""
+Formatação vetorizada de colunas contra as funções escalares aplicadas célula a
+célula, numa série que mistura textos ASCII, dígitos Unicode, números guardados
+como objeto e nulos.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.formatacao import converter_numerico, formatar_coluna
+from utils.utils import aplicar_mascara, limpar_e_converter
+
+MISTURA = [
+    '12,50', 'R$ 1.234', '٣', 'R$ ١٢,٥٠', '１２', '۴,۵', 'abc', '', None,
+    7, 3.25, np.nan, '0', ' 8 ',
+]
+
+
+def como_lista(serie):
+    return serie.astype(object).where(serie.notna(), '<nulo>').tolist()
+
+
+@pytest.fixture
+def mistura():
+    return pd.Series(MISTURA, dtype=object)
+
+
+def test_preco_vetorizado_igual_ao_escalar(mistura):
+    esperado = mistura.apply(lambda x: aplicar_mascara(x, 'preco'))
+    assert como_lista(formatar_coluna(mistura, 'preco')) == como_lista(esperado)
+
+
+def test_digitos_unicode_viram_numero(mistura):
+    resultado = formatar_coluna(mistura, 'preco')
+    assert resultado[2] == 3.0
+    assert resultado[3] == 12.5
+    assert resultado[4] == 12.0
+
+
+def test_conversao_vetorizada_igual_a_escalar(mistura):
+    # limpar_e_converter levanta TypeError com None; o caminho vetorizado devolve NaN
+    sem_none = mistura[[valor is not None for valor in mistura]].reset_index(drop=True)
+    esperado = sem_none.apply(limpar_e_converter)
+    assert como_lista(converter_numerico(sem_none)) == como_lista(esperado)
+    assert np.isnan(converter_numerico(mistura)[mistura.isna()]).all()
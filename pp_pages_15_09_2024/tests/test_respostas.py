@@ -0,0 +1,54 @@
+"""
+Respostas por regra (agents_tools.respostas.resposta_rapida) contra o pandas.
+
+    python -m pytest tests
+"""
+import pytest
+
+from agents_tools.respostas import resposta_rapida
+from benchmarks.dados_sinteticos import gerar_registros
+from utils.dataset import construir_dataframe
+
+
+@pytest.fixture(scope='module')
+def df():
+    return construir_dataframe(gerar_registros(2_000))
+
+
+def test_media_do_preco(df):
+    assert resposta_rapida(df, "qual a média do preço?").startswith(f"Média do preço unitário: **R$ {df['precoUnitario'].mean():.2f}**")
+
+
+def test_rotulo_do_menor_preco(df):
+    assert resposta_rapida(df, "qual o menor preço?").startswith(f"Menor preço unitário: **R$ {df['precoUnitario'].min():.2f}**")
+
+
+def test_quantos_registros(df):
+    assert f"**{len(df)}**" in resposta_rapida(df, "quantos registros há?")
+
+
+@pytest.mark.parametrize('pergunta, coluna', [
+    ("quantos fornecedores?", 'nomeFornecedor'),
+    ("Quantos estados existem?", 'estado'),
+    ("quantas modalidades há?", 'modalidade'),
+])
+def test_quantos_grupos_conta_valores_distintos(df, pergunta, coluna):
+    resposta = resposta_rapida(df, pergunta)
+    assert resposta == f"Há **{df[coluna].nunique()}** valores distintos de {coluna} nos dados."
+
+
+def test_registros_por_grupo_lista_as_contagens(df):
+    resposta = resposta_rapida(df, "quantos registros por estado?")
+    contagens = df['estado'].value_counts()
+    assert resposta.startswith("Registros por estado:")
+    assert f"| {contagens.index[0]} | {contagens.iloc[0]} |" in resposta
+
+
+@pytest.mark.parametrize('pergunta', [
+    "qual a média da quantidade?",
+    "qual o maior valor de quantidade?",
+    "qual a quantidade total?",
+    "Qual a média do preço em SP?",
+])
+def test_perguntas_fora_da_regra_vao_para_o_agente(df, pergunta):
+    assert resposta_rapida(df, pergunta) is None
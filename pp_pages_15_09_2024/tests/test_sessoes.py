@@ -0,0 +1,76 @@
+"""
+Sessões salvas: gravar uma análise crítica, reabrir o arquivo e conferir que
+dados, vetores de bits, ordem de exibição e metadados voltam iguais.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.dados_sinteticos import gerar_registros
+from utils import sessoes
+from utils.acumulador import converter_colunas_data
+from utils.analise import AnaliseCritica
+from utils.dataset import construir_dataframe, normalizar_dataset
+
+PARAMETROS = {'itens': ['1000'], 'data_inicial': '2024-01-01', 'data_final': '2024-06-30'}
+
+
+@pytest.fixture
+def df():
+    return normalizar_dataset(converter_colunas_data(construir_dataframe(gerar_registros(300))))
+
+
+@pytest.fixture
+def analise(df):
+    analise = AnaliseCritica(df)
+    analise.marcar_outliers()
+    analise.excluir_desconsideradas()
+    analise.marcar({linha: True for linha in df.index[:5]})
+    analise.priorizar_fora_limites()
+    return analise
+
+
+def test_ida_e_volta(tmp_path, df, analise):
+    caminho = sessoes.salvar_sessao(df, analise, PARAMETROS, pasta=str(tmp_path))
+    sessao = sessoes.abrir_sessao(caminho)
+
+    pd.testing.assert_frame_equal(sessao['df'], df)
+    reaberta = sessao['analise']
+    assert reaberta.desconsideradas.any() and reaberta.excluidas.any()
+    np.testing.assert_array_equal(reaberta.desconsideradas, analise.desconsideradas)
+    np.testing.assert_array_equal(reaberta.excluidas, analise.excluidas)
+    assert not np.array_equal(analise.ordem, np.arange(len(df)))
+    np.testing.assert_array_equal(reaberta.ordem, analise.ordem)
+    pd.testing.assert_frame_equal(reaberta.tabela(), analise.tabela())
+    assert not reaberta.pode_desfazer
+
+    assert sessao['parametros'] == PARAMETROS
+    [listada] = sessoes.listar_sessoes(str(tmp_path))
+    assert listada['caminho'] == caminho
+    assert listada['salvo_em'] == sessao['salvo_em']
+    assert listada['registros'] == len(df)
+    assert listada['analise'] is True
+    assert listada['parametros'] == PARAMETROS
+
+
+def test_sessao_sem_analise(tmp_path, df):
+    caminho = sessoes.salvar_sessao(df, pasta=str(tmp_path))
+    sessao = sessoes.abrir_sessao(caminho)
+    pd.testing.assert_frame_equal(sessao['df'], df)
+    assert sessao['analise'] is None
+    assert sessao['parametros'] == {}
+    assert sessoes.listar_sessoes(str(tmp_path))[0]['analise'] is False
+
+
+def test_analise_de_outros_dados_nao_e_salva(tmp_path, df, analise):
+    with pytest.raises(ValueError):
+        sessoes.salvar_sessao(df.iloc[:10], analise, pasta=str(tmp_path))
+    assert sessoes.listar_sessoes(str(tmp_path)) == []
+
+
+def test_arquivos_estranhos_ficam_fora_da_lista(tmp_path, df):
+    (tmp_path / 'outro.arrow').write_bytes(b'nao e arrow')
+    sessoes.salvar_sessao(df, pasta=str(tmp_path))
+    assert len(sessoes.listar_sessoes(str(tmp_path))) == 1
@@ -0,0 +1,132 @@
+import math
+import pandas as pd
+from utils.utils import limpar_e_converter
+from utils.dataset import construir_dataframe, normalizar_dataset
+from utils.metricas import metricas
+
+# Colunas convertidas para datetime ao montar o DataFrame
+COLUNAS_DATA = ['dataCompra', 'dataHoraAtualizacaoCompra', 'dataHoraAtualizacaoItem', 'dataResultado', 'dataHoraAtualizacaoUasg']
+
+
+def converter_colunas_data(df):
+    for col in COLUNAS_DATA:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+class AcumuladorResultados:
+    """
+    Acumula os registros que chegam da API página a página.
+
+    Os registros são guardados numa lista (append amortizado O(1)) e
+    deduplicados pelo idItemCompra com um dicionário chave -> posição na
+    lista. Um registro com chave já vista substitui o anterior: o stream
+    entrega primeiro o que estava no cache e depois o que a API devolveu de
+    novo (os últimos dias são sempre buscados outra vez), e a versão mais
+    recente é a que vale. O DataFrame só é montado quando pedido e fica
+    guardado até chegarem registros novos, já no formato compacto de
+    utils.dataset.construir_dataframe. Média e desvio padrão do preço
+    unitário são mantidos incrementalmente, combinando as estatísticas de
+    cada lote (método de Chan); os preços substituídos saem pela combinação
+    inversa.
+    """
+
+    def __init__(self):
+        self._registros = []
+        self._posicoes = {}
+        self._df = None
+        self._linhas_exibidas = 0
+        self._n = 0
+        self._media = 0.0
+        self._m2 = 0.0
+
+    def __len__(self):
+        return len(self._registros)
+
+    def adicionar(self, registros):
+        with metricas.medir('ingestao'):
+            return self._adicionar(registros)
+
+    def _adicionar(self, registros):
+        """Acrescenta os registros novos e substitui os já vistos; retorna quantos entraram ou mudaram."""
+        novos = []
+        # Posição -> registro que estava lá antes deste lote (só a primeira substituição conta)
+        anteriores = {}
+        total = len(self._registros)
+        for registro in registros:
+            chave = registro.get('idItemCompra')
+            posicao = self._posicoes.get(chave) if chave is not None else None
+            if posicao is None:
+                if chave is not None:
+                    self._posicoes[chave] = total + len(novos)
+                novos.append(registro)
+            elif posicao >= total:
+                # Repetido no próprio lote: ainda não entrou nas estatísticas
+                novos[posicao - total] = registro
+            else:
+                anteriores.setdefault(posicao, self._registros[posicao])
+                self._registros[posicao] = registro
+        if not novos and not anteriores:
+            return 0
+
+        self._registros.extend(novos)
+        self._df = None
+        if anteriores:
+            self._atualizar_estatisticas(anteriores.values(), remover=True)
+        self._atualizar_estatisticas(novos + [self._registros[posicao] for posicao in anteriores])
+        return len(novos) + len(anteriores)
+
+    def _atualizar_estatisticas(self, registros, remover=False):
+        precos = [limpar_e_converter(r.get('precoUnitario')) for r in registros if r.get('precoUnitario') is not None]
+        precos = [p for p in precos if p is not None and not math.isnan(p)]
+        if not precos:
+            return
+        n_lote = len(precos)
+        media_lote = sum(precos) / n_lote
+        m2_lote = sum((p - media_lote) ** 2 for p in precos)
+
+        if remover:
+            # Combinação de Chan ao contrário: o que resta é o total sem o lote
+            n_total = self._n - n_lote
+            if n_total <= 0:
+                self._n, self._media, self._m2 = 0, 0.0, 0.0
+                return
+            media_total = (self._n * self._media - n_lote * media_lote) / n_total
+            delta = media_lote - media_total
+            self._m2 = max(self._m2 - m2_lote - delta ** 2 * n_total * n_lote / self._n, 0.0)
+            self._media = media_total
+            self._n = n_total
+            return
+
+        n_total = self._n + n_lote
+        delta = media_lote - self._media
+        self._media += delta * n_lote / n_total
+        self._m2 += m2_lote + delta ** 2 * self._n * n_lote / n_total
+        self._n = n_total
+
+    def estatisticas(self):
+        """Retorna (quantidade de preços, média, coeficiente de variação em %)."""
+        if self._n == 0:
+            return 0, float('nan'), float('nan')
+        desvio_padrao = math.sqrt(self._m2 / (self._n - 1)) if self._n > 1 else 0.0
+        cv = (desvio_padrao / self._media) * 100 if self._media != 0 else 0
+        return self._n, self._media, cv
+
+    def deve_exibir(self):
+        """
+        Indica se vale a pena redesenhar a tabela parcial.
+
+        A tabela é redesenhada quando o número de linhas dobra, o que mantém
+        o custo total de exibição linear no número de registros.
+        """
+        if len(self._registros) >= max(2 * self._linhas_exibidas, 1):
+            self._linhas_exibidas = len(self._registros)
+            return True
+        return False
+
+    def para_dataframe(self):
+        if self._df is None:
+            with metricas.medir('dataframe'):
+                self._df = normalizar_dataset(converter_colunas_data(construir_dataframe(self._registros)))
+        return self._df
@@ -0,0 +1,243 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from utils.dataset import coluna_numerica, normalizar_dataset
+from utils.estatisticas import EstatisticasIncrementais
+from utils.metricas import metricas
+from utils.outliers import aparar_iterativo
+
+# Operações guardadas para desfazer
+MAX_DESFAZER = 100
+
+_VAZIO = np.array([], dtype=np.int64)
+
+
+class AnaliseCritica:
+    """
+    Estado da análise crítica: linhas desconsideradas, excluídas e ordem de exibição.
+
+    As linhas nunca saem da base; desconsiderar e excluir são dois vetores de
+    bits sobre as posições da base, e a ordem de exibição é um vetor de
+    posições. Cada operação guarda só as posições cujo bit mudou (e a ordem
+    anterior, se mudou), então desfazer e refazer custam o tamanho da mudança,
+    e as estatísticas incrementais recebem apenas essas linhas.
+
+    As linhas são identificadas pelo índice da base, que precisa ser único;
+    se não for, a base recebe um índice novo (0 a n-1).
+    """
+
+    def __init__(self, df):
+        base = normalizar_dataset(df.copy(deep=False))
+        if not base.index.is_unique:
+            base = base.reset_index(drop=True)
+        marcadas = base['Desconsiderar'].eq('Sim').to_numpy() if 'Desconsiderar' in base.columns else None
+        self.base = base.drop(columns=['Desconsiderar', 'ForaLimites'], errors='ignore')
+        self.desconsideradas = np.zeros(len(base), dtype=bool)
+        self.excluidas = np.zeros(len(base), dtype=bool)
+        self.ordem = np.arange(len(base))
+        with metricas.medir('estatisticas'):
+            self.estatisticas = EstatisticasIncrementais(coluna_numerica(self.base, 'precoUnitario'))
+        self._precos = coluna_numerica(self.base, 'precoUnitario').to_numpy(dtype='float64', na_value=np.nan)
+        self._desfazer = deque(maxlen=MAX_DESFAZER)
+        self._refazer = []
+        # Muda a cada operação; `geracao` só nas que não vêm do editor (a tabela é remontada)
+        # e `versao_linhas` só quando as linhas visíveis ou sua ordem mudam
+        self.versao = 0
+        self.geracao = 0
+        self.versao_linhas = 0
+        self._visoes = {}
+        if marcadas is not None and marcadas.any():
+            self._registrar(desconsideradas=np.flatnonzero(marcadas), historico=False)
+
+    # --- Operações -----------------------------------------------------------
+
+    def _posicoes(self, linhas):
+        posicoes = self.base.index.get_indexer(pd.Index(linhas))
+        if (posicoes < 0).any():
+            raise KeyError("Linha não encontrada na análise")
+        return posicoes
+
+    def _ativas(self, posicoes):
+        return ~self.desconsideradas[posicoes] & ~self.excluidas[posicoes]
+
+    def _executar(self, operacao, desfazendo=False):
+        desconsideradas, excluidas, ordem = operacao
+        posicoes = np.union1d(desconsideradas, excluidas)
+        ativas_antes = self._ativas(posicoes)
+        # Cada operação só inverte bits, então aplicar de novo a desfaz
+        self.desconsideradas[desconsideradas] ^= True
+        self.excluidas[excluidas] ^= True
+        ativas_depois = self._ativas(posicoes)
+        indice = self.base.index
+        self.estatisticas.remover_linhas(indice[posicoes[ativas_antes & ~ativas_depois]])
+        self.estatisticas.adicionar_linhas(indice[posicoes[~ativas_antes & ativas_depois]])
+        if ordem is not None:
+            self.ordem = ordem[0] if desfazendo else ordem[1]
+        self.versao += 1
+        # Só marcas em Desconsiderar: as linhas visíveis e sua ordem continuam as mesmas
+        estruturais = {'posicoes', 'linhas'} if not len(excluidas) and ordem is None else set()
+        if not estruturais:
+            self.versao_linhas += 1
+        self._visoes = {nome: visao for nome, visao in self._visoes.items() if nome in estruturais}
+
+    def _registrar(self, desconsideradas=_VAZIO, excluidas=_VAZIO, ordem=None, historico=True, editor=False):
+        """Aplica uma operação (posições a inverter em cada vetor) e a guarda para desfazer."""
+        operacao = (np.asarray(desconsideradas, dtype=np.int64), np.asarray(excluidas, dtype=np.int64), ordem)
+        if not len(operacao[0]) and not len(operacao[1]) and ordem is None:
+            return 0
+        self._executar(operacao)
+        if not editor:
+            self.geracao += 1
+        if historico:
+            self._desfazer.append(operacao)
+            self._refazer.clear()
+        return len(np.union1d(operacao[0], operacao[1]))
+
+    def marcar(self, marcas, editor=False):
+        """
+        Marca ou desmarca linhas em Desconsiderar numa única operação.
+
+        :param marcas: Dicionário linha (índice) -> True para desconsiderar, False para considerar
+        :param editor: True quando as marcas vêm do data_editor (a tabela não precisa ser remontada)
+        :return: Quantidade de linhas que mudaram
+        """
+        if not marcas:
+            return 0
+        posicoes = self._posicoes(list(marcas))
+        desejado = np.fromiter(marcas.values(), dtype=bool, count=len(marcas))
+        return self._registrar(desconsideradas=posicoes[self.desconsideradas[posicoes] != desejado], editor=editor)
+
+    def priorizar_fora_limites(self):
+        """Leva as linhas fora dos limites para o topo da tabela, mantendo a ordem entre elas."""
+        fora = self.fora_limites()[self.ordem]
+        nova = np.concatenate([self.ordem[fora], self.ordem[~fora]])
+        if np.array_equal(nova, self.ordem):
+            return 0
+        return self._registrar(ordem=(self.ordem, nova))
+
+    def excluir_fora_limites(self):
+        """Exclui as linhas fora dos limites; as demais voltam a ser consideradas."""
+        visiveis = ~self.excluidas
+        fora = self.fora_limites() & visiveis
+        return self._registrar(
+            desconsideradas=np.flatnonzero(visiveis & ~fora & self.desconsideradas),
+            excluidas=np.flatnonzero(fora),
+        )
+
+    def excluir_desconsideradas(self):
+        """Exclui as linhas marcadas em Desconsiderar."""
+        return self._registrar(excluidas=np.flatnonzero(self.desconsideradas & ~self.excluidas))
+
+    def marcar_outliers(self, metodo='desvio', limite_cv=25.0):
+        """
+        Marca em Desconsiderar os preços que o aparo iterativo descarta, entre as linhas ativas.
+
+        :return: (linhas marcadas, resultado de aparar_iterativo)
+        """
+        ativas = ~self.desconsideradas & ~self.excluidas
+        precos = np.where(ativas, self._precos, np.nan)
+        resultado = aparar_iterativo(precos, metodo=metodo, limite_cv=limite_cv)
+        posicoes = np.flatnonzero(~np.isnan(precos) & ~resultado['mantidos'])
+        self._registrar(desconsideradas=posicoes)
+        return self.base.index[posicoes], resultado
+
+    # --- Estado salvo ---------------------------------------------------------
+
+    def estado(self):
+        """Cópia dos vetores de bits e da ordem de exibição, para salvar a análise (sem o histórico)."""
+        return {
+            'desconsideradas': self.desconsideradas.copy(),
+            'excluidas': self.excluidas.copy(),
+            'ordem': self.ordem.copy(),
+        }
+
+    @classmethod
+    def restaurar(cls, df, desconsideradas, excluidas, ordem):
+        """
+        Análise sobre df com o estado devolvido por `estado()`.
+
+        Os vetores são copiados como estão e as estatísticas refeitas de uma
+        vez; a análise reaberta começa sem nada para desfazer.
+        """
+        analise = cls(df)
+        ordem = np.asarray(ordem, dtype=np.int64)
+        if not len(desconsideradas) == len(excluidas) == len(ordem) == len(analise.base):
+            raise ValueError("O estado salvo não corresponde aos dados")
+        analise.desconsideradas[:] = desconsideradas
+        analise.excluidas[:] = excluidas
+        analise.ordem = ordem
+        analise.estatisticas.definir_ativas(~analise.desconsideradas & ~analise.excluidas)
+        analise.versao += 1
+        analise.geracao += 1
+        analise.versao_linhas += 1
+        analise._visoes = {}
+        return analise
+
+    # --- Desfazer e refazer --------------------------------------------------
+
+    @property
+    def pode_desfazer(self):
+        return bool(self._desfazer)
+
+    @property
+    def pode_refazer(self):
+        return bool(self._refazer)
+
+    def desfazer(self):
+        if not self._desfazer:
+            return False
+        operacao = self._desfazer.pop()
+        self._executar(operacao, desfazendo=True)
+        self._refazer.append(operacao)
+        self.geracao += 1
+        return True
+
+    def refazer(self):
+        if not self._refazer:
+            return False
+        operacao = self._refazer.pop()
+        self._executar(operacao)
+        self._desfazer.append(operacao)
+        self.geracao += 1
+        return True
+
+    # --- Visões --------------------------------------------------------------
+
+    def _visao(self, nome, construir):
+        if nome not in self._visoes:
+            self._visoes[nome] = construir()
+        return self._visoes[nome]
+
+    def _posicoes_visiveis(self):
+        return self._visao('posicoes', lambda: self.ordem[~self.excluidas[self.ordem]])
+
+    def fora_limites(self):
+        """Vetor de bits das linhas com preço fora dos limites atuais (média ± 2 desvios)."""
+        def construir():
+            resumo = self.estatisticas
+            return (self._precos < resumo.limite_inferior) | (self._precos > resumo.limite_superior)
+        return self._visao('fora_limites', construir)
+
+    def tabela(self):
+        """
+        Linhas não excluídas, na ordem de exibição, com a coluna Desconsiderar ('Sim'/'Não').
+
+        É o mesmo formato do antigo df_analise: as linhas excluídas não
+        aparecem e o índice é o da base. Guardada até a próxima operação.
+        """
+        def construir():
+            linhas = self._visao('linhas', lambda: self.base.iloc[self._posicoes_visiveis()])
+            tabela = linhas.copy(deep=False)
+            # Categórica montada direto do vetor de bits (0 = 'Não', 1 = 'Sim'), sem criar os textos
+            marcas = self.desconsideradas[self._posicoes_visiveis()].astype(np.int8)
+            tabela['Desconsiderar'] = pd.Categorical.from_codes(marcas, categories=['Não', 'Sim'])
+            return tabela
+        return self._visao('tabela', construir)
+
+    def tabela_editor(self):
+        """tabela() com a coluna ForaLimites, para o data_editor."""
+        def construir():
+            tabela = self.tabela().copy(deep=False)
+            tabela.insert(len(tabela.columns) - 1, 'ForaLimites', self.fora_limites()[self._posicoes_visiveis()])
+            return tabela
+        return self._visao('tabela_editor', construir)
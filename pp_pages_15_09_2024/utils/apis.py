@@ -1,100 +1,414 @@
-import requests
 from datetime import datetime
 import pandas as pd
-import sqlite3
-import concurrent.futures
-import streamlit as st
 import aiohttp
 import asyncio
+import logging
+import os
+import random
+import time
+from datetime import timedelta
+from utils import cache, referencias
+from utils.acumulador import AcumuladorResultados
+from utils.dataset import compactar_dataframe, normalizar_dataset
+from utils.metricas import metricas
 
-@st.cache_data(ttl=3600)
-def fetch_page(url, params):
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    return None
+logger = logging.getLogger(__name__)
+
+# Parâmetros do motor de coleta da API de pesquisa de preços
+# A variável de ambiente aponta a coleta para outro servidor (como o benchmarks/servidor_stub.py)
+URL_CONSULTAR_MATERIAL = os.environ.get(
+    "URL_CONSULTAR_MATERIAL", "https://dadosabertos.compras.gov.br/modulo-pesquisa-preco/1_consultarMaterial")
+REGISTROS_POR_PAGINA = 20
+MAX_CONCORRENCIA = 8       # Requisições simultâneas
+MAX_CONCORRENCIA_LOTE = 16 # Requisições simultâneas somando todos os itens de um lote
+MAX_TENTATIVAS = 5         # Tentativas por página antes de desistir
+BACKOFF_BASE = 0.5         # Segundos
+BACKOFF_MAXIMO = 30.0      # Segundos
+TIMEOUT_REQUISICAO = 60    # Segundos
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+# Períodos com mais páginas que isto são divididos em fatias de datas, baixadas em
+# paralelo e gravadas no cache uma a uma (uma coleta interrompida continua de onde parou)
+MAX_PAGINAS_FATIA = 50
+OCUPACAO_FATIA = 0.8       # Fração de MAX_PAGINAS_FATIA que cada fatia nova deve ocupar
 
 def obter_mapeamento_modalidades():
-    conn = sqlite3.connect('data/info.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, modalidade FROM modalidades")
-    mapeamento = {row[0]: row[1] for row in cursor.fetchall()}
-    conn.close()
-    print("Mapeamento de modalidades:", mapeamento)  # Para debug
-    return mapeamento
-
-async def consultar_api_governo_async(codigo_item, data_inicial, data_final):
-    url = "https://dadosabertos.compras.gov.br/modulo-pesquisa-preco/1_consultarMaterial"
-    data_inicial = datetime.strptime(data_inicial, "%Y-%m-%d").strftime("%d-%m-%Y")
-    data_final = datetime.strptime(data_final, "%Y-%m-%d").strftime("%d-%m-%Y")
-    
+    # Lido uma vez e guardado até o info.db mudar
+    return referencias.obter_mapeamento('modalidades', 'id', 'modalidade')
+
+async def iterar_paginas_intervalo(session, semaforo, codigo_item, data_inicial, data_final, url=URL_CONSULTAR_MATERIAL):
+    """
+    Gera as páginas de um item em um intervalo de datas à medida que chegam.
+
+    :param data_inicial: datetime.date inicial (inclusive)
+    :param data_final: datetime.date final (inclusive)
+    :return: Gerador assíncrono de tuplas (numero_pagina, registros, total_registros);
+             `registros` é None quando a página não pôde ser obtida
+    """
     params = {
         "codigoItemCatalogo": codigo_item,
-        "dataInicial": data_inicial,
-        "dataFinal": data_final,
+        "dataInicial": data_inicial.strftime("%d-%m-%Y"),
+        "dataFinal": data_final.strftime("%d-%m-%Y"),
         "pagina": 1
     }
 
-    async with aiohttp.ClientSession() as session:
-        # Primeira requisição para obter o total de registros
-        first_page = await fetch_page_async(session, url, params)
-        if not first_page or 'totalRegistros' not in first_page:
-            print("Erro na primeira requisição ou 'totalRegistros' não encontrado")
-            return {"df": None, "total_registros": 0, "total_paginas": 0}
-
-        total_registros = first_page['totalRegistros']
-        total_paginas = (total_registros - 1) // 20 + 1  # Assumindo 20 registros por página
-        print(f"Total de registros: {total_registros}, Total de páginas: {total_paginas}")
-
-        # Função para processar uma página
-        async def process_page(page_num):
-            page_params = params.copy()
-            page_params['pagina'] = page_num
-            async with session.get(url, params=page_params) as response:
-                if response.status == 200:
-                    page_data = await response.json()
-                    if 'resultado' in page_data:
-                        return page_data['resultado']
-            return []
-
-        all_results = []
-        tasks = [process_page(i) for i in range(1, total_paginas + 1)]
+    # Primeira requisição para obter o total de registros
+    first_page = await fetch_page_async(session, url, params, semaforo)
+    if not first_page or 'totalRegistros' not in first_page:
+        logger.warning("Primeira página de %s a %s sem 'totalRegistros'", data_inicial, data_final)
+        yield 1, None, 0
+        return
+
+    total_registros = first_page['totalRegistros']
+    total_paginas = calcular_total_paginas(total_registros)
+    logger.debug("%s a %s: %d registros em %d páginas", data_inicial, data_final, total_registros, total_paginas)
+    # A primeira página já foi baixada, não precisa ser buscada de novo
+    yield 1, first_page.get('resultado', []), total_registros
+
+    # Função para processar uma página
+    async def process_page(page_num):
+        page_params = params.copy()
+        page_params['pagina'] = page_num
+        page_data = await fetch_page_async(session, url, page_params, semaforo)
+        if page_data is None or 'resultado' not in page_data:
+            return page_num, None
+        return page_num, page_data['resultado']
+
+    tasks = [asyncio.ensure_future(process_page(i)) for i in range(2, total_paginas + 1)]
+    try:
         for result in asyncio.as_completed(tasks):
-            data = await result
-            all_results.extend(data)
+            page_num, data = await result
+            yield page_num, data, total_registros
+    finally:
+        # Se o consumidor parar antes do fim, as páginas pendentes são canceladas
+        for task in tasks:
+            task.cancel()
+
+def calcular_total_paginas(total_registros):
+    return (total_registros - 1) // REGISTROS_POR_PAGINA + 1 if total_registros else 0
+
+def dias_por_fatia(registros_por_dia):
+    """Tamanho, em dias, das fatias para a densidade observada (None: não precisa dividir)."""
+    if not registros_por_dia:
+        return None
+    return max(1, int(MAX_PAGINAS_FATIA * REGISTROS_POR_PAGINA * OCUPACAO_FATIA / registros_por_dia))
+
+def dividir_intervalo(data_inicial, data_final, dias):
+    """Divide [data_inicial, data_final] em intervalos consecutivos de até `dias` dias."""
+    if not dias:
+        return [(data_inicial, data_final)]
+    fatias = []
+    inicio = data_inicial
+    while inicio <= data_final:
+        fim = min(inicio + timedelta(days=dias - 1), data_final)
+        fatias.append((inicio, fim))
+        inicio = fim + timedelta(days=1)
+    return fatias
+
+async def consultar_api_governo_stream(codigo_item, data_inicial, data_final, max_concorrencia=MAX_CONCORRENCIA, url=URL_CONSULTAR_MATERIAL, usar_cache=True, session=None, semaforo=None):
+    """
+    Versão em streaming de consultar_api_governo_async.
+
+    Gera lotes à medida que as páginas chegam, para que a interface possa
+    exibir resultados parciais. O primeiro lote traz o que já estava no cache.
+    Cada lote é um dicionário com 'registros', 'paginas_concluidas',
+    'total_paginas' (conhecido até o momento) e 'paginas_faltantes', uma
+    lista de tuplas (data_inicial, data_final, pagina): cada fatia de datas
+    numera as próprias páginas a partir de 1, então o número sozinho não
+    identifica a página.
+
+    :param session: aiohttp.ClientSession compartilhada (opcional); se omitida, uma nova é criada
+    :param semaforo: asyncio.Semaphore compartilhado (opcional) que limita as requisições simultâneas
+    """
+    data_inicial = cache.para_data(data_inicial)
+    data_final = cache.para_data(data_final)
+
+    # Com o cache, só os trechos do período ainda não baixados vão para a API
+    if usar_cache:
+        intervalos = cache.intervalos_faltantes(codigo_item, data_inicial, data_final)
+        registros_cache = cache.carregar_registros(codigo_item, data_inicial, data_final)
+    else:
+        intervalos = [(data_inicial, data_final)]
+        registros_cache = []
+    logger.info("Item %s: %d intervalos a buscar na API, %d registros do cache", codigo_item, len(intervalos), len(registros_cache))
+    # Itens já consultados têm a densidade conhecida: o período já começa dividido em fatias
+    densidade = cache.obter_densidade(codigo_item) if usar_cache else None
+
+    if registros_cache:
+        yield {"registros": registros_cache, "paginas_concluidas": 0, "total_paginas": 0, "paginas_faltantes": []}
+    if not intervalos:
+        return
+
+    # Limita as requisições simultâneas para não sobrecarregar a API
+    semaforo = semaforo or asyncio.Semaphore(max_concorrencia)
+    if session is None:
+        timeout = aiohttp.ClientTimeout(total=TIMEOUT_REQUISICAO)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async for lote in _transmitir_intervalos(session, semaforo, codigo_item, intervalos, url, usar_cache, densidade):
+                yield lote
+    else:
+        async for lote in _transmitir_intervalos(session, semaforo, codigo_item, intervalos, url, usar_cache, densidade):
+            yield lote
+
+async def _transmitir_intervalos(session, semaforo, codigo_item, intervalos, url, usar_cache, densidade=None):
+    """
+    Baixa os intervalos em fatias de datas paralelas e gera os lotes de registros.
+
+    Uma fatia cuja primeira página indica mais de MAX_PAGINAS_FATIA páginas é
+    trocada por fatias menores, dimensionadas pela densidade (registros por
+    dia) observada nela. Cada fatia concluída vai para o cache e é marcada
+    como coberta, então uma coleta interrompida recomeça só pelas fatias que
+    faltaram.
+    """
+    paginas_concluidas = 0
+    total_paginas = 0
+    paginas_faltantes = []
+    fila = asyncio.Queue()
+    fatias = []
+    registros_fatia = []
+    falhas_fatia = []
+    divididas = []
+    produtores = []
+    registros_observados = 0
+    dias_observados = 0
+
+    # Cada fatia é baixada em paralelo e as páginas são reunidas numa fila
+    async def produzir(indice, inicio, fim, total_anterior):
+        paginas = iterar_paginas_intervalo(session, semaforo, codigo_item, inicio, fim, url=url)
+        try:
+            async for pagina in paginas:
+                page_num, data, total_registros = pagina
+                dias = (fim - inicio).days + 1
+                # Se a fatia menor não trouxe menos registros, a API não está filtrando pelas datas
+                if (page_num == 1 and dias > 1 and calcular_total_paginas(total_registros) > MAX_PAGINAS_FATIA
+                        and total_registros < total_anterior):
+                    await fila.put((indice, ('dividir', total_registros)))
+                    return
+                await fila.put((indice, pagina))
+        finally:
+            await paginas.aclose()
+            await fila.put((indice, None))
+
+    def iniciar(inicio, fim, total_anterior=float('inf')):
+        fatias.append((inicio, fim))
+        registros_fatia.append([])
+        falhas_fatia.append(False)
+        divididas.append(False)
+        produtores.append(asyncio.ensure_future(produzir(len(fatias) - 1, inicio, fim, total_anterior)))
+
+    for inicio, fim in intervalos:
+        for fatia in dividir_intervalo(inicio, fim, dias_por_fatia(densidade)):
+            iniciar(*fatia)
+    ativos = len(produtores)
+    try:
+        while ativos:
+            indice, pagina = await fila.get()
+            inicio, fim = fatias[indice]
+            if pagina is None:
+                ativos -= 1
+                # Fatia concluída: grava no cache e, se veio completa, marca como coberta
+                if usar_cache and not divididas[indice]:
+                    cache.salvar_registros(codigo_item, registros_fatia[indice])
+                    if not falhas_fatia[indice]:
+                        cache.registrar_intervalo(codigo_item, inicio, fim)
+                registros_fatia[indice] = []
+                continue
+
+            if pagina[0] == 'dividir':
+                total_registros = pagina[1]
+                densidade = total_registros / ((fim - inicio).days + 1)
+                divididas[indice] = True
+                novas = dividir_intervalo(inicio, fim, dias_por_fatia(densidade))
+                metricas.incrementar('coleta_fatias_divididas_total')
+                logger.info("Fatia %s a %s dividida em %d (%.1f registros por dia)", inicio, fim, len(novas), densidade)
+                for nova in novas:
+                    iniciar(*nova, total_anterior=total_registros)
+                ativos += len(novas)
+                continue
+
+            page_num, data, total_registros = pagina
+            if page_num == 1:
+                total_paginas += max(calcular_total_paginas(total_registros), 1)
+                if usar_cache and data is not None:
+                    # Densidade média das fatias baixadas, usada para dividir a próxima consulta do item
+                    registros_observados += total_registros
+                    dias_observados += (fim - inicio).days + 1
+                    cache.registrar_densidade(codigo_item, registros_observados / dias_observados)
+            paginas_concluidas += 1
+            if data is None:
+                falhas_fatia[indice] = True
+                paginas_faltantes.append((inicio, fim, page_num))
+                data = []
+            else:
+                registros_fatia[indice].extend(data)
+            yield {
+                "registros": data,
+                "paginas_concluidas": paginas_concluidas,
+                "total_paginas": total_paginas,
+                "paginas_faltantes": paginas_faltantes,
+            }
+    finally:
+        for produtor in produtores:
+            produtor.cancel()
+
+async def consultar_api_governo_async(codigo_item, data_inicial, data_final, max_concorrencia=MAX_CONCORRENCIA, url=URL_CONSULTAR_MATERIAL, usar_cache=True, progresso=None):
+    """
+    Consulta todas as páginas de um item e devolve o DataFrame completo.
+
+    :param progresso: Função chamada com a fração concluída (0 a 1) a cada lote, como o
+                      `progress` de uma barra do Streamlit; None para não informar
+    """
+    acumulador = AcumuladorResultados()
+    total_paginas = 0
+    paginas_faltantes = []
+    with metricas.medir('coleta'):
+        async for lote in consultar_api_governo_stream(codigo_item, data_inicial, data_final, max_concorrencia=max_concorrencia, url=url, usar_cache=usar_cache):
+            acumulador.adicionar(lote['registros'])
+            total_paginas = lote['total_paginas']
+            paginas_faltantes = lote['paginas_faltantes']
             # Atualizar o progresso
-            progress = len(all_results) / total_registros
-            if 'progress_bar' in st.session_state:
-                st.session_state.progress_bar.progress(progress)
-
-        print(f"Total de resultados coletados: {len(all_results)}")
-
-        if all_results:
-            df = pd.DataFrame(all_results)
-            
-            # Converter colunas de data para datetime
-            date_columns = ['dataCompra', 'dataHoraAtualizacaoCompra', 'dataHoraAtualizacaoItem', 'dataResultado', 'dataHoraAtualizacaoUasg']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-            
-            return {"df": df, "total_registros": total_registros, "total_paginas": total_paginas}
-        else:
-            return {"df": None, "total_registros": 0, "total_paginas": 0}
-
-async def fetch_page_async(session, url, params):
-    async with session.get(url, params=params) as response:
-        if response.status == 200:
-            return await response.json()
-    return None
+            if progresso is not None and total_paginas:
+                progresso(min(lote['paginas_concluidas'] / total_paginas, 1.0))
+
+    logger.info("Item %s: %d registros coletados", codigo_item, len(acumulador))
+    if paginas_faltantes:
+        logger.warning("Páginas não obtidas após %d tentativas: %s", MAX_TENTATIVAS, "; ".join(descrever_paginas_faltantes(paginas_faltantes)))
+
+    if len(acumulador):
+        return {"df": acumulador.para_dataframe(), "total_registros": len(acumulador), "total_paginas": total_paginas, "paginas_faltantes": sorted(paginas_faltantes)}
+    else:
+        return {"df": None, "total_registros": 0, "total_paginas": total_paginas, "paginas_faltantes": sorted(paginas_faltantes)}
+
+async def consultar_itens_em_lote(codigos_itens, data_inicial, data_final, max_concorrencia=MAX_CONCORRENCIA_LOTE, url=URL_CONSULTAR_MATERIAL, usar_cache=True):
+    """
+    Consulta vários itens CATMAT numa única tarefa.
 
-def update_partial_dataframe(results):
-    if 'partial_df' not in st.session_state:
-        st.session_state.partial_df = pd.DataFrame()
-    
-    new_df = pd.DataFrame(results)
-    st.session_state.partial_df = pd.concat([st.session_state.partial_df, new_df]).drop_duplicates()
-    
-    # Atualizar o data_editor com os dados parciais
-    if 'data_editor' in st.session_state:
-        st.session_state.data_editor.dataframe(st.session_state.partial_df)
\ No newline at end of file
+    Todos os itens compartilham a mesma sessão HTTP (com pool de conexões) e
+    o mesmo limite global de requisições simultâneas, então o tempo total fica
+    próximo ao dos itens mais demorados, e não à soma de todos.
+
+    :param codigos_itens: Lista de códigos CATMAT
+    :return: Dicionário com 'df' (todos os itens, com a coluna 'codigoItemPesquisado'),
+             'por_item' (DataFrame com registros, páginas e tempo de cada item),
+             'total_registros' e 'paginas_faltantes' (por item, tuplas (data_inicial, data_final, pagina))
+    """
+    semaforo = asyncio.Semaphore(max_concorrencia)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT_REQUISICAO)
+    connector = aiohttp.TCPConnector(limit=max_concorrencia, ttl_dns_cache=300)
+
+    async def consultar_item(session, codigo_item):
+        inicio = time.perf_counter()
+        acumulador = AcumuladorResultados()
+        total_paginas = 0
+        paginas_faltantes = []
+        async for lote in consultar_api_governo_stream(codigo_item, data_inicial, data_final, url=url, usar_cache=usar_cache, session=session, semaforo=semaforo):
+            acumulador.adicionar(lote['registros'])
+            total_paginas = lote['total_paginas']
+            paginas_faltantes = lote['paginas_faltantes']
+        return codigo_item, acumulador, total_paginas, sorted(paginas_faltantes), time.perf_counter() - inicio
+
+    with metricas.medir('coleta'):
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            resultados = await asyncio.gather(*[consultar_item(session, codigo) for codigo in codigos_itens])
+
+    frames = []
+    por_item = []
+    for codigo_item, acumulador, total_paginas, paginas_faltantes, duracao in resultados:
+        if len(acumulador):
+            frames.append(acumulador.para_dataframe().assign(codigoItemPesquisado=str(codigo_item)))
+        por_item.append({
+            "codigoItemPesquisado": str(codigo_item),
+            "registros": len(acumulador),
+            "paginas": total_paginas,
+            "paginas_faltantes": len(paginas_faltantes),
+            "tempo_s": round(duracao, 2),
+        })
+
+    # Categorias diferentes entre itens viram texto no concat; compacta de novo
+    df = normalizar_dataset(compactar_dataframe(pd.concat(frames, ignore_index=True))) if frames else None
+    return {
+        "df": df,
+        "por_item": pd.DataFrame(por_item),
+        "total_registros": 0 if df is None else len(df),
+        "paginas_faltantes": {str(r[0]): r[3] for r in resultados if r[3]},
+    }
+
+def descrever_pagina_faltante(faltante):
+    """Texto de uma entrada de paginas_faltantes, como '01/01/2024 a 31/01/2024, página 3'."""
+    data_inicial, data_final, pagina = faltante
+    return f"{data_inicial:%d/%m/%Y} a {data_final:%d/%m/%Y}, página {pagina}"
+
+def descrever_paginas_faltantes(paginas_faltantes):
+    """
+    Textos das páginas não obtidas, para exibir ou gravar.
+
+    :param paginas_faltantes: Lista de uma consulta ou dicionário item -> lista (consultar_itens_em_lote)
+    """
+    if isinstance(paginas_faltantes, dict):
+        return [f"item {item}: {texto}" for item, lista in paginas_faltantes.items() for texto in descrever_paginas_faltantes(lista)]
+    return [descrever_pagina_faltante(faltante) for faltante in sorted(paginas_faltantes)]
+
+def calcular_espera(tentativa, retry_after=None, base=BACKOFF_BASE, maximo=BACKOFF_MAXIMO):
+    """
+    Calcula o tempo de espera antes de uma nova tentativa.
+
+    Usa backoff exponencial com "full jitter": o tempo é sorteado entre zero e
+    base * 2^tentativa, limitado a `maximo`. Se a API informar o cabeçalho
+    Retry-After, ele tem prioridade.
+
+    :param tentativa: Número da tentativa que falhou (começando em 0)
+    :param retry_after: Valor do cabeçalho Retry-After, em segundos, se houver
+    :return: Tempo de espera em segundos
+    """
+    if retry_after is not None:
+        return min(retry_after, maximo)
+    return random.uniform(0, min(maximo, base * 2 ** tentativa))
+
+def _ler_retry_after(response):
+    valor = response.headers.get('Retry-After')
+    try:
+        return max(float(valor), 0.0) if valor is not None else None
+    except ValueError:
+        return None
+
+async def fetch_page_async(session, url, params, semaforo=None, max_tentativas=None, backoff_base=None):
+    """
+    Busca uma página da API, repetindo em caso de falha temporária.
+
+    Erros de conexão, timeouts e respostas 429/5xx são repetidos com backoff
+    exponencial. Outros códigos de erro são definitivos.
+
+    :param semaforo: asyncio.Semaphore que limita as requisições simultâneas
+    :return: O JSON da página, ou None se a página não pôde ser obtida
+    """
+    semaforo = semaforo or asyncio.Semaphore(1)
+    max_tentativas = max_tentativas or MAX_TENTATIVAS
+    backoff_base = BACKOFF_BASE if backoff_base is None else backoff_base
+    for tentativa in range(max_tentativas):
+        retry_after = None
+        status = 'erro'
+        try:
+            # O semáforo só é mantido durante a requisição, não durante a espera
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    async with session.get(url, params=params) as response:
+                        status = str(response.status)
+                        if response.status == 200:
+                            pagina = await response.json()
+                            metricas.incrementar('http_paginas_total')
+                            return pagina
+                        if response.status not in STATUS_REPETIR:
+                            logger.warning("Erro %d na página %s", response.status, params.get('pagina'))
+                            metricas.incrementar('http_paginas_perdidas_total')
+                            return None
+                        retry_after = _ler_retry_after(response)
+                finally:
+                    # Latência de cada tentativa, sem a espera pelo semáforo
+                    metricas.observar('http_latencia_segundos', time.perf_counter() - inicio, status=status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.info("Falha na página %s (tentativa %d): %r", params.get('pagina'), tentativa + 1, e)
+        if tentativa < max_tentativas - 1:
+            metricas.incrementar('http_repeticoes_total', status=status)
+            await asyncio.sleep(calcular_espera(tentativa, retry_after, base=backoff_base))
+    metricas.incrementar('http_paginas_perdidas_total')
+    return None
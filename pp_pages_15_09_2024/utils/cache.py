@@ -0,0 +1,217 @@
+import json
+import sqlite3
+from datetime import date, datetime, timedelta
+
+# Banco local onde ficam os registros já baixados da API
+CAMINHO_CATALOGO = 'data/catalogo.db'
+
+# Coluna usada para posicionar cada registro no tempo (com alternativa se vier vazia)
+COLUNAS_DATA_REFERENCIA = ['dataResultado', 'dataCompra']
+
+# Os últimos dias nunca são considerados cobertos: a API ainda recebe
+# resultados novos para esse período, então ele é sempre buscado de novo.
+DIAS_ATUALIZACAO = 7
+
+
+def conectar(caminho=None):
+    conn = sqlite3.connect(caminho or CAMINHO_CATALOGO)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS registros_compra (
+            idItemCompra TEXT PRIMARY KEY,
+            codigoItemCatalogo TEXT NOT NULL,
+            data_referencia TEXT,
+            dados TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_registros_item_data
+        ON registros_compra (codigoItemCatalogo, data_referencia)
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS intervalos_cobertos (
+            codigoItemCatalogo TEXT NOT NULL,
+            data_inicial TEXT NOT NULL,
+            data_final TEXT NOT NULL,
+            PRIMARY KEY (codigoItemCatalogo, data_inicial)
+        )
+    """)
+    # Registros por dia observados na última consulta de cada item, para dimensionar as fatias
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS densidade_itens (
+            codigoItemCatalogo TEXT PRIMARY KEY,
+            registros_por_dia REAL NOT NULL,
+            atualizado_em TEXT NOT NULL
+        )
+    """)
+    return conn
+
+
+def _data_referencia(registro):
+    for coluna in COLUNAS_DATA_REFERENCIA:
+        valor = registro.get(coluna)
+        if valor:
+            return str(valor)[:10]
+    return None
+
+
+def _chave_registro(registro):
+    chave = registro.get('idItemCompra')
+    if chave is None:
+        # Sem identificador: usa o próprio conteúdo como chave
+        return json.dumps(registro, sort_keys=True, ensure_ascii=False)
+    return str(chave)
+
+
+def obter_intervalos_cobertos(codigo_item, caminho=None):
+    conn = conectar(caminho)
+    try:
+        cursor = conn.execute(
+            "SELECT data_inicial, data_final FROM intervalos_cobertos "
+            "WHERE codigoItemCatalogo = ? ORDER BY data_inicial",
+            (str(codigo_item),)
+        )
+        return [(date.fromisoformat(i), date.fromisoformat(f)) for i, f in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def calcular_intervalos_faltantes(data_inicial, data_final, cobertos):
+    """
+    Retorna os sub-intervalos de [data_inicial, data_final] que não estão em `cobertos`.
+
+    Todos os intervalos são fechados (incluem as duas datas) e `cobertos` deve
+    estar ordenado pela data inicial.
+    """
+    faltantes = []
+    cursor = data_inicial
+    for inicio, fim in cobertos:
+        if fim < cursor:
+            continue
+        if inicio > data_final:
+            break
+        if inicio > cursor:
+            faltantes.append((cursor, inicio - timedelta(days=1)))
+        cursor = max(cursor, fim + timedelta(days=1))
+        if cursor > data_final:
+            break
+    if cursor <= data_final:
+        faltantes.append((cursor, data_final))
+    return faltantes
+
+
+def intervalos_faltantes(codigo_item, data_inicial, data_final, caminho=None):
+    return calcular_intervalos_faltantes(data_inicial, data_final, obter_intervalos_cobertos(codigo_item, caminho))
+
+
+def registrar_intervalo(codigo_item, data_inicial, data_final, caminho=None):
+    """Marca o intervalo como coberto, fundindo-o com intervalos sobrepostos ou vizinhos."""
+    limite = date.today() - timedelta(days=DIAS_ATUALIZACAO)
+    data_final = min(data_final, limite)
+    if data_final < data_inicial:
+        return
+
+    conn = conectar(caminho)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "SELECT data_inicial, data_final FROM intervalos_cobertos "
+                "WHERE codigoItemCatalogo = ? AND data_inicial <= ? AND data_final >= ?",
+                (str(codigo_item), (data_final + timedelta(days=1)).isoformat(),
+                 (data_inicial - timedelta(days=1)).isoformat())
+            )
+            for inicio, fim in cursor.fetchall():
+                data_inicial = min(data_inicial, date.fromisoformat(inicio))
+                data_final = max(data_final, date.fromisoformat(fim))
+                conn.execute(
+                    "DELETE FROM intervalos_cobertos WHERE codigoItemCatalogo = ? AND data_inicial = ?",
+                    (str(codigo_item), inicio)
+                )
+            conn.execute(
+                "INSERT INTO intervalos_cobertos (codigoItemCatalogo, data_inicial, data_final) VALUES (?, ?, ?)",
+                (str(codigo_item), data_inicial.isoformat(), data_final.isoformat())
+            )
+    finally:
+        conn.close()
+
+
+def registrar_densidade(codigo_item, registros_por_dia, caminho=None):
+    conn = conectar(caminho)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO densidade_itens (codigoItemCatalogo, registros_por_dia, atualizado_em) VALUES (?, ?, ?)",
+                (str(codigo_item), float(registros_por_dia), datetime.now().isoformat(timespec='seconds'))
+            )
+    finally:
+        conn.close()
+
+
+def obter_densidade(codigo_item, caminho=None):
+    """Registros por dia observados para o item, ou None se ele nunca foi consultado."""
+    conn = conectar(caminho)
+    try:
+        linha = conn.execute(
+            "SELECT registros_por_dia FROM densidade_itens WHERE codigoItemCatalogo = ?", (str(codigo_item),)
+        ).fetchone()
+        return linha[0] if linha else None
+    finally:
+        conn.close()
+
+
+def salvar_registros(codigo_item, registros, caminho=None):
+    conn = conectar(caminho)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO registros_compra (idItemCompra, codigoItemCatalogo, data_referencia, dados) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (_chave_registro(r), str(codigo_item), _data_referencia(r), json.dumps(r, ensure_ascii=False))
+                    for r in registros
+                ]
+            )
+    finally:
+        conn.close()
+
+
+def carregar_registros(codigo_item, data_inicial, data_final, caminho=None):
+    """
+    Lê do cache os registros do item com data de referência no intervalo.
+
+    Registros sem nenhuma data de referência não podem ser posicionados no
+    tempo e são sempre incluídos.
+    """
+    conn = conectar(caminho)
+    try:
+        cursor = conn.execute(
+            "SELECT dados FROM registros_compra WHERE codigoItemCatalogo = ? "
+            "AND (data_referencia BETWEEN ? AND ? OR data_referencia IS NULL)",
+            (str(codigo_item), data_inicial.isoformat(), data_final.isoformat())
+        )
+        return [json.loads(dados) for (dados,) in cursor]
+    finally:
+        conn.close()
+
+
+def limpar_cache(codigo_item=None, caminho=None):
+    conn = conectar(caminho)
+    try:
+        with conn:
+            if codigo_item is None:
+                conn.execute("DELETE FROM registros_compra")
+                conn.execute("DELETE FROM intervalos_cobertos")
+                conn.execute("DELETE FROM densidade_itens")
+            else:
+                conn.execute("DELETE FROM registros_compra WHERE codigoItemCatalogo = ?", (str(codigo_item),))
+                conn.execute("DELETE FROM intervalos_cobertos WHERE codigoItemCatalogo = ?", (str(codigo_item),))
+                conn.execute("DELETE FROM densidade_itens WHERE codigoItemCatalogo = ?", (str(codigo_item),))
+    finally:
+        conn.close()
+
+
+def para_data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(valor, "%Y-%m-%d").date()
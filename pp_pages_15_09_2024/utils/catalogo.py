@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import re
+import sqlite3
+import unicodedata
+from utils.cache import CAMINHO_CATALOGO
+
+# Nomes aceitos para as colunas dos arquivos do catálogo CATMAT
+COLUNAS_CODIGO = ['codigoItem', 'codigo_item', 'codigoItemCatalogo', 'codigo', 'catmat', 'id']
+COLUNAS_DESCRICAO = ['descricaoItem', 'descricao_item', 'descricao', 'nomePdm', 'nome']
+
+# Linhas gravadas por transação na carga
+TAMANHO_LOTE_CARGA = 10_000
+
+# Resultados da busca por padrão
+LIMITE_BUSCA = 10
+
+# Palavras menores que isto casam com boa parte do catálogo; ordenar tudo por
+# relevância ficaria lento, então a busca só com elas sai na ordem do índice
+MIN_LETRAS_RELEVANCIA = 3
+
+
+def conectar_catalogo(caminho=None):
+    conn = sqlite3.connect(caminho or CAMINHO_CATALOGO)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalogo_itens (
+            codigo INTEGER PRIMARY KEY,
+            codigo_texto TEXT NOT NULL,
+            descricao TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_catalogo_codigo_texto
+        ON catalogo_itens (codigo_texto)
+    """)
+    # Índice de texto sobre as descrições, sem acentos e com prefixos de 2 e 3 letras pré-indexados
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS catalogo_fts USING fts5(
+            descricao,
+            content='catalogo_itens',
+            content_rowid='codigo',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    return conn
+
+
+def _escolher_coluna(colunas, candidatas):
+    normalizadas = {c.strip().lower(): c for c in colunas}
+    for candidata in candidatas:
+        if candidata.lower() in normalizadas:
+            return normalizadas[candidata.lower()]
+    return None
+
+
+def ler_arquivo_catalogo(arquivo, nome=None):
+    """
+    Lê um arquivo do catálogo (CSV ou JSON) e gera pares (código, descrição).
+
+    JSON pode ser uma lista de objetos ou um objeto com a lista em
+    'resultado'. No CSV o separador é detectado na primeira linha. Linhas sem
+    código numérico ou sem descrição são ignoradas.
+
+    :param arquivo: Caminho ou objeto de arquivo (como o do st.file_uploader)
+    :param nome: Nome do arquivo, para decidir o formato quando `arquivo` não é um caminho
+    """
+    if isinstance(arquivo, str):
+        nome = nome or arquivo
+        with open(arquivo, 'rb') as f:
+            conteudo = f.read()
+    else:
+        nome = nome or getattr(arquivo, 'name', '')
+        conteudo = arquivo.read()
+    texto = conteudo.decode('utf-8-sig') if isinstance(conteudo, bytes) else conteudo
+
+    if nome.lower().endswith('.json') or texto.lstrip()[:1] in ('[', '{'):
+        dados = json.loads(texto)
+        linhas = dados.get('resultado', []) if isinstance(dados, dict) else dados
+        colunas = list(linhas[0].keys()) if linhas else []
+    else:
+        primeira = texto.split('\n', 1)[0]
+        separador = max([';', ',', '\t', '|'], key=primeira.count)
+        leitor = csv.DictReader(io.StringIO(texto), delimiter=separador)
+        linhas = leitor
+        colunas = leitor.fieldnames or []
+
+    coluna_codigo = _escolher_coluna(colunas, COLUNAS_CODIGO)
+    coluna_descricao = _escolher_coluna(colunas, COLUNAS_DESCRICAO)
+    if coluna_codigo is None or coluna_descricao is None:
+        raise ValueError(f"Arquivo do catálogo sem colunas de código e descrição: {colunas}")
+
+    for linha in linhas:
+        codigo = str(linha.get(coluna_codigo) or '').strip()
+        descricao = str(linha.get(coluna_descricao) or '').strip()
+        if codigo.isdigit() and descricao:
+            yield int(codigo), descricao
+
+
+def carregar_catalogo(itens, caminho=None):
+    """
+    Grava itens do catálogo, substituindo os códigos que já existirem.
+
+    :param itens: Iterável de pares (código, descrição), como os de ler_arquivo_catalogo
+    :return: Quantidade de itens gravados
+    """
+    conn = conectar_catalogo(caminho)
+    total = 0
+    try:
+        lote = []
+        for codigo, descricao in itens:
+            lote.append((codigo, str(codigo), descricao))
+            if len(lote) >= TAMANHO_LOTE_CARGA:
+                total += _gravar_lote(conn, lote)
+                lote = []
+        if lote:
+            total += _gravar_lote(conn, lote)
+        # Refaz o índice de texto de uma vez, mais rápido que atualizar linha a linha
+        with conn:
+            conn.execute("INSERT INTO catalogo_fts(catalogo_fts) VALUES ('rebuild')")
+    finally:
+        conn.close()
+    return total
+
+
+def _gravar_lote(conn, lote):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO catalogo_itens (codigo, codigo_texto, descricao) VALUES (?, ?, ?)",
+            lote,
+        )
+    return len(lote)
+
+
+def contar_itens(caminho=None):
+    conn = conectar_catalogo(caminho)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM catalogo_itens").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _palavras(termo):
+    texto = unicodedata.normalize('NFKD', termo)
+    return re.findall(r'\w+', ''.join(c for c in texto if not unicodedata.combining(c)).lower())
+
+
+def _consulta_fts(palavras):
+    # Cada palavra vira um prefixo entre aspas ("seringa"* AND "desc"*), sem operadores do usuário
+    return ' AND '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar_itens(termo, limite=LIMITE_BUSCA, caminho=None):
+    """
+    Busca de itens para digitação com sugestões.
+
+    Só dígitos: códigos que começam com o termo, em ordem de código. Texto:
+    itens cuja descrição tem todas as palavras (como prefixo, sem acentos),
+    ordenados pela relevância (bm25) quando alguma palavra tem ao menos
+    MIN_LETRAS_RELEVANCIA letras.
+
+    :return: Lista de tuplas (código, descrição)
+    """
+    termo = (termo or '').strip()
+    if not termo:
+        return []
+    conn = conectar_catalogo(caminho)
+    try:
+        if termo.isdigit():
+            # Intervalo de texto no índice: '123' <= codigo_texto < '124'
+            fim = termo[:-1] + chr(ord(termo[-1]) + 1)
+            return conn.execute(
+                "SELECT codigo, descricao FROM catalogo_itens "
+                "WHERE codigo_texto >= ? AND codigo_texto < ? ORDER BY codigo_texto LIMIT ?",
+                (termo, fim, limite),
+            ).fetchall()
+        palavras = _palavras(termo)
+        if not palavras:
+            return []
+        ordem = "ORDER BY bm25(catalogo_fts) " if max(map(len, palavras)) >= MIN_LETRAS_RELEVANCIA else ""
+        return conn.execute(
+            f"SELECT rowid, descricao FROM catalogo_fts WHERE catalogo_fts MATCH ? {ordem}LIMIT ?",
+            (_consulta_fts(palavras), limite),
+        ).fetchall()
+    finally:
+        conn.close()
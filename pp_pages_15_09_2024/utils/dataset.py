@@ -0,0 +1,165 @@
+import pandas as pd
+from utils.esquema import COLUNAS_PARA_REMOVER, COLUNAS_CATEGORICAS, COLUNAS_IDENTIFICADORES, tipo_coluna
+from utils.formatacao import converter_numerico
+from utils.referencias import traduzir_codigos
+
+# Texto com até esta proporção de valores distintos também vira categoria
+PROPORCAO_CATEGORIA = 0.5
+
+# Colunas numéricas convertidas uma única vez, na chegada dos dados.
+# A coluna original fica intacta para exibição; a versão float64 segue ao
+# lado dela no mesmo DataFrame, então filtros, edições e cópias mantêm as
+# duas alinhadas linha a linha.
+COLUNAS_NUMERICAS = {
+    'precoUnitario': 'precoUnitarioNum',
+    'quantidade': 'quantidadeNum',
+}
+
+
+def _compactar_numerica(serie):
+    valores = pd.to_numeric(serie, errors='coerce')
+    if valores.isna().all() and serie.notna().any():
+        # Nada numérico (texto formatado): mantém como veio e deixa a conversão para normalizar_dataset
+        return serie
+    if serie.name in COLUNAS_NUMERICAS:
+        # Preço e quantidade mantêm o tipo que o pandas daria (int64 ou float64, nulo como NaN),
+        # do qual dependem as colunas tipadas e as máscaras de exibição
+        return valores
+    if (valores.dropna() % 1 == 0).all():
+        inteiros = valores.astype('Int64')
+        limite = inteiros.abs().max()
+        if pd.isna(limite) or limite < 2 ** 31:
+            return inteiros.astype('Int32')
+        return inteiros
+    return valores.astype('Float64')
+
+
+def _compactar_texto(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    if serie.name in COLUNAS_CATEGORICAS:
+        return serie.astype('category')
+    nao_nulos = serie.count()
+    if nao_nulos and serie.nunique() <= nao_nulos * PROPORCAO_CATEGORIA:
+        return serie.astype('category')
+    return serie
+
+
+def compactar_dataframe(df):
+    """
+    Reduz o uso de memória do DataFrame seguindo o esquema de ESQUEMA_COLUNAS.
+
+    Remove as colunas de COLUNAS_PARA_REMOVER, guarda texto repetido como
+    categoria, números inteiros em tipos inteiros anuláveis e datas como
+    datetime. Colunas que não estão no esquema só passam pela regra de
+    texto repetido. Pode ser chamada de novo sobre um DataFrame já compactado.
+
+    :param df: DataFrame com os registros da API
+    :return: Novo DataFrame compactado
+    """
+    df = df.drop(columns=[c for c in COLUNAS_PARA_REMOVER if c in df.columns])
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        tipo = tipo_coluna(coluna)
+        if coluna in COLUNAS_IDENTIFICADORES:
+            tipo = 'text'
+        if tipo == 'date':
+            if not pd.api.types.is_datetime64_any_dtype(serie.dtype):
+                serie = pd.to_datetime(serie, errors='coerce')
+        elif tipo == 'number':
+            serie = _compactar_numerica(serie)
+        elif serie.dtype == object or pd.api.types.is_string_dtype(serie.dtype):
+            if serie.map(type, na_action='ignore').isin([str]).all():
+                serie = _compactar_texto(serie)
+        colunas[coluna] = serie
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def construir_dataframe(registros):
+    """
+    Monta o DataFrame compactado direto da lista de registros da API.
+
+    As colunas de COLUNAS_PARA_REMOVER nem chegam a ser criadas, e os códigos
+    com tabela de referência no info.db (como a modalidade) viram nomes.
+    """
+    colunas = list(dict.fromkeys(chave for registro in registros for chave in registro))
+    colunas = [coluna for coluna in colunas if coluna not in COLUNAS_PARA_REMOVER]
+    return traduzir_codigos(compactar_dataframe(pd.DataFrame.from_records(registros, columns=colunas)))
+
+
+def normalizar_dataset(df):
+    """
+    Prepara o DataFrame vindo da API para uso em todas as páginas.
+
+    Acrescenta as colunas numéricas tipadas (float64) definidas em
+    COLUNAS_NUMERICAS, se ainda não existirem. Quando a coluna original já é
+    float64 ela mesma serve para os cálculos e nenhuma cópia é criada.
+
+    :param df: DataFrame com os registros da API
+    :return: O mesmo DataFrame, com as colunas tipadas
+    """
+    for origem, destino in COLUNAS_NUMERICAS.items():
+        if origem in df.columns and destino not in df.columns and df[origem].dtype != 'float64':
+            df[destino] = converter_numerico(df[origem])
+    return df
+
+
+def coluna_numerica(df, coluna):
+    """
+    Retorna a versão float64 de uma coluna numérica.
+
+    Usa a coluna tipada criada por normalizar_dataset; só converte a partir do
+    texto se ela não existir (dados carregados antes da normalização).
+    """
+    destino = COLUNAS_NUMERICAS.get(coluna)
+    if destino is not None and destino in df.columns:
+        return df[destino]
+    if df[coluna].dtype == 'float64':
+        return df[coluna]
+    return converter_numerico(df[coluna])
+
+
+def dataset_tipado(df):
+    """
+    DataFrame só com tipos de verdade, para o agente e outros consumidores.
+
+    Cada coluna de COLUNAS_NUMERICAS passa a ser numérica (a versão tipada
+    substitui o texto) e as colunas tipadas internas saem.
+    """
+    internas = [destino for destino in COLUNAS_NUMERICAS.values() if destino in df.columns]
+    if not internas:
+        return df
+    df = df.copy(deep=False)
+    for origem, destino in COLUNAS_NUMERICAS.items():
+        if destino in df.columns and origem in df.columns and not pd.api.types.is_numeric_dtype(df[origem].dtype):
+            df[origem] = df[destino]
+    return df.drop(columns=internas)
+
+
+def _copy_on_write():
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+
+def copia_isolada(df):
+    """
+    Cópia de df que pode ser alterada sem mexer no original.
+
+    Com copy-on-write (padrão a partir do pandas 3) a cópia rasa já basta e não
+    duplica os dados. Sem ele, escritas dentro da cópia (df.loc[...] = ...,
+    inplace=True) chegariam às colunas compartilhadas, então a cópia é profunda.
+    """
+    return df.copy(deep=not _copy_on_write())
+
+
+def colunas_exibicao(df):
+    """Colunas do DataFrame sem as colunas tipadas internas."""
+    internas = set(COLUNAS_NUMERICAS.values())
+    return [coluna for coluna in df.columns if coluna not in internas]
+
+
+def ocultar_colunas_internas():
+    """column_config que esconde as colunas tipadas nas tabelas do Streamlit."""
+    return {destino: None for destino in COLUNAS_NUMERICAS.values()}
@@ -0,0 +1,95 @@
+# Esquema das colunas da API de pesquisa de preços, sem dependência do Streamlit.
+# utils.config monta a configuração das tabelas da interface a partir daqui; o
+# tratamento dos dados (dataset, relatório, linha de comando) usa só este módulo.
+
+# Lista de colunas a serem removidas
+COLUNAS_PARA_REMOVER = [
+    "idItemCompra",
+    "forma",
+    "criterioJulgamento",
+    "dataHoraAtualizacaoUasg",
+    "dataHoraAtualizacaoCompra",
+    "dataHoraAtualizacaoItem",
+    "nomeUnidadeMedida",
+    "siglaUnidadeMedida",
+    "nomeUnidadeFornecimento",
+    "percentualMaiorDesconto",
+    "codigoMunicipio",
+    "codigoOrgao",
+    # Adicione aqui outras colunas que deseja remover
+]
+
+# Colunas de texto com poucos valores distintos, guardadas como categorias
+COLUNAS_CATEGORICAS = [
+    "estado",
+    "municipio",
+    "modalidade",
+    "nomeOrgao",
+    "poder",
+    "esfera",
+]
+
+# Colunas numéricas na configuração que são, na verdade, identificadores (mantidas como texto)
+COLUNAS_IDENTIFICADORES = [
+    "niFornecedor",
+]
+
+# Tipo ('number', 'text' ou 'date'), rótulo, ajuda e opções de exibição de cada coluna
+ESQUEMA_COLUNAS = {
+    "precoUnitario": {
+        "tipo": "number",
+        "rotulo": "Preço Unitário",
+        "ajuda": "Preço unitário do item",
+        "opcoes": {"min_value": 0, "format": "R$ %.2f"},
+    },
+    "numeroItemCompra": {
+        "tipo": "number",
+        "rotulo": "Número do Item",
+        "ajuda": "Número do item na compra",
+        "opcoes": {"min_value": 1, "step": 1},
+    },
+    "modalidade": {"tipo": "text", "rotulo": "Modalidade", "ajuda": "Modalidade da compra"},
+    "idCompra": {"tipo": "text", "rotulo": "ID da Compra", "ajuda": "Identificador único da compra"},
+    "descricaoItem": {"tipo": "text", "rotulo": "Descrição", "ajuda": "Descrição detalhada do item"},
+    "codigoItemCatalogo": {
+        "tipo": "number",
+        "rotulo": "CATMAT",
+        "ajuda": "Código do item no catálogo de materiais",
+        "opcoes": {"min_value": 0, "step": 1},
+    },
+    "siglaUnidadeFornecimento": {"tipo": "text", "rotulo": "Unidade de Medida", "ajuda": "Sigla da unidade de fornecimento"},
+    "capacidadeUnidadeFornecimento": {"tipo": "text", "rotulo": "Capacidade", "ajuda": "Capacidade da unidade de fornecimento"},
+    "niFornecedor": {
+        "tipo": "number",
+        "rotulo": "CNPJ",
+        "ajuda": "CNPJ do fornecedor",
+        "opcoes": {"min_value": 0, "format": "%d"},
+    },
+    "nomeFornecedor": {"tipo": "text", "rotulo": "Fornecedor", "ajuda": "Nome do fornecedor"},
+    "dataCompra": {"tipo": "date", "rotulo": "Data da Compra", "ajuda": "Data em que a compra foi realizada"},
+    "dataResultado": {"tipo": "date", "rotulo": "Data do Resultado", "ajuda": "Data do resultado da compra"},
+    "quantidade": {
+        "tipo": "number",
+        "rotulo": "Quantidade",
+        "ajuda": "Quantidade do item comprado",
+        "opcoes": {"min_value": 0, "step": 1},
+    },
+    "marca": {"tipo": "text", "rotulo": "Marca", "ajuda": "Marca do produto"},
+    "codigoUasg": {"tipo": "text", "rotulo": "UASG", "ajuda": "Código da Unidade Administrativa de Serviços Gerais"},
+    "nomeUasg": {"tipo": "text", "rotulo": "Nome do órgão", "ajuda": "Nome da Unidade Administrativa de Serviços Gerais"},
+    "municipio": {"tipo": "text", "rotulo": "Município", "ajuda": "Município onde a compra foi realizada"},
+    "estado": {"tipo": "text", "rotulo": "Estado", "ajuda": "Estado onde a compra foi realizada"},
+    "nomeOrgao": {"tipo": "text", "rotulo": "Nome da Entidade", "ajuda": "Nome completo do órgão responsável pela compra"},
+    "poder": {"tipo": "text", "rotulo": "Poder", "ajuda": "Poder ao qual o órgão pertence"},
+    "esfera": {"tipo": "text", "rotulo": "Esfera", "ajuda": "Esfera administrativa do órgão"},
+}
+
+
+def tipo_coluna(coluna):
+    """Tipo da coluna no esquema ('number', 'text' ou 'date'), ou None se ela não estiver nele."""
+    return ESQUEMA_COLUNAS.get(coluna, {}).get("tipo")
+
+
+def rotulo_coluna(coluna):
+    """Rótulo da coluna para exibição; colunas fora do esquema ficam com o próprio nome."""
+    return ESQUEMA_COLUNAS.get(coluna, {}).get("rotulo") or coluna
@@ -0,0 +1,214 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Lotes com mais linhas que o maior destes dois limites refazem a árvore e os acumuladores de
+# uma vez (O(n)) em vez de atualizar linha a linha (O(k log n)). O mínimo fixo mantém as
+# alterações do dia a dia (marcar algumas linhas) sempre no caminho incremental.
+MIN_LINHAS_RECONSTRUCAO = 1000
+PROPORCAO_RECONSTRUCAO = 0.01
+
+
+class EstatisticasIncrementais:
+    """
+    Estatísticas do preço unitário que acompanham a exclusão e a volta de linhas.
+
+    Média e variância são mantidas pelo método de Welford (contagem, média e
+    M2), que permite tirar ou recolocar um valor em O(1). Mediana, mínimo e
+    máximo vêm de uma árvore de Fenwick sobre a posição de cada linha na
+    ordem dos preços: marcar uma linha como ativa ou inativa e achar o k-ésimo
+    menor preço custam O(log n). Lotes grandes (excluir tudo que está fora dos
+    limites, reabrir uma análise salva) refazem árvore e acumuladores de uma
+    vez, vetorizado, em O(n); ver `limite_reconstrucao`.
+
+    As linhas são identificadas pelo índice da Series usada na criação, que
+    deve ser único. Valores nulos são ignorados, como no pandas.
+    """
+
+    def __init__(self, serie, limite_reconstrucao=None):
+        """
+        :param serie: Preços, indexados pela linha
+        :param limite_reconstrucao: Lotes com mais linhas que isto são refeitos de uma vez.
+                                    None: max(MIN_LINHAS_RECONSTRUCAO, PROPORCAO_RECONSTRUCAO * n);
+                                    0 reconstrói sempre e math.inf nunca
+        """
+        serie = pd.Series(serie, dtype='float64')
+        valores = serie.to_numpy()
+        validos = ~np.isnan(valores)
+
+        self._indice = serie.index
+        self._valores = valores
+        if limite_reconstrucao is None:
+            limite_reconstrucao = max(MIN_LINHAS_RECONSTRUCAO, PROPORCAO_RECONSTRUCAO * len(valores))
+        self.limite_reconstrucao = limite_reconstrucao
+        self._ativos = validos.copy()
+
+        # Posição de cada linha na ordem crescente dos preços (-1 para nulos)
+        ordem = np.flatnonzero(validos)[np.argsort(valores[validos], kind='stable')]
+        self._posicao = np.full(len(valores), -1, dtype=np.int64)
+        self._posicao[ordem] = np.arange(len(ordem))
+        self._ordenados = valores[ordem]
+
+        # Com todas as linhas ativas, cada nó i da árvore soma exatamente lowbit(i) linhas
+        tamanho = len(ordem)
+        indices = np.arange(1, tamanho + 1)
+        self._arvore = [0] + (indices & -indices).tolist()
+        self._passo_inicial = 1 << (tamanho.bit_length() - 1) if tamanho else 0
+
+        # Estatísticas iniciais em duas passadas, numericamente exatas
+        self._n = tamanho
+        self._media = float(self._ordenados.mean()) if tamanho else 0.0
+        self._m2 = float(((self._ordenados - self._media) ** 2).sum()) if tamanho else 0.0
+
+    def _reconstruir(self):
+        """Refaz a árvore e média/M2 a partir de _ativos, vetorizado."""
+        tamanho = len(self._ordenados)
+        contagens = np.zeros(tamanho, dtype=np.int64)
+        contagens[self._posicao[self._ativos]] = 1
+        # O nó i soma as contagens de (i - lowbit(i), i]: diferença de duas somas acumuladas
+        acumuladas = np.concatenate([[0], np.cumsum(contagens)])
+        indices = np.arange(1, tamanho + 1)
+        self._arvore = [0] + (acumuladas[indices] - acumuladas[indices - (indices & -indices)]).tolist()
+        ativos = self._valores[self._ativos]
+        self._n = len(ativos)
+        self._media = float(ativos.mean()) if self._n else 0.0
+        self._m2 = float(((ativos - self._media) ** 2).sum()) if self._n else 0.0
+
+    def definir_ativas(self, mascara):
+        """Troca de uma vez o conjunto de linhas consideradas (vetor de bits na ordem da Series)."""
+        self._ativos = np.asarray(mascara, dtype=bool) & (self._posicao >= 0)
+        self._reconstruir()
+
+    # --- Árvore de Fenwick -------------------------------------------------
+
+    def _atualizar_arvore(self, posicao, delta):
+        i = posicao + 1
+        arvore = self._arvore
+        while i < len(arvore):
+            arvore[i] += delta
+            i += i & -i
+
+    def _k_esimo(self, k):
+        """Valor do k-ésimo menor preço ativo (k começa em 1)."""
+        posicao = 0
+        passo = self._passo_inicial
+        arvore = self._arvore
+        while passo:
+            proxima = posicao + passo
+            if proxima < len(arvore) and arvore[proxima] < k:
+                posicao = proxima
+                k -= arvore[proxima]
+            passo >>= 1
+        return float(self._ordenados[posicao])
+
+    # --- Inclusão e exclusão de linhas --------------------------------------
+
+    def _posicoes(self, linhas):
+        posicoes = self._indice.get_indexer(pd.Index(linhas))
+        if (posicoes < 0).any():
+            raise KeyError("Linha não encontrada nas estatísticas")
+        return posicoes
+
+    def remover_linhas(self, linhas):
+        """Tira as linhas (pelo índice) das estatísticas. Linhas já inativas são ignoradas."""
+        posicoes = self._posicoes(linhas)
+        if len(posicoes) > self.limite_reconstrucao:
+            self._ativos[posicoes] = False
+            self._reconstruir()
+            return
+        for i in posicoes:
+            if not self._ativos[i]:
+                continue
+            self._ativos[i] = False
+            self._atualizar_arvore(self._posicao[i], -1)
+            x = self._valores[i]
+            n = self._n - 1
+            if n == 0:
+                self._n, self._media, self._m2 = 0, 0.0, 0.0
+                continue
+            media = self._media - (x - self._media) / n
+            # Com um único valor a variância é zero; o max evita resíduo negativo de arredondamento
+            self._m2 = max(self._m2 - (x - self._media) * (x - media), 0.0) if n > 1 else 0.0
+            self._media = media
+            self._n = n
+
+    def adicionar_linhas(self, linhas):
+        """Volta a considerar as linhas (pelo índice). Linhas já ativas ou nulas são ignoradas."""
+        posicoes = self._posicoes(linhas)
+        if len(posicoes) > self.limite_reconstrucao:
+            self._ativos[posicoes] = self._posicao[posicoes] >= 0
+            self._reconstruir()
+            return
+        for i in posicoes:
+            if self._ativos[i] or self._posicao[i] < 0:
+                continue
+            self._ativos[i] = True
+            self._atualizar_arvore(self._posicao[i], 1)
+            x = self._valores[i]
+            self._n += 1
+            delta = x - self._media
+            self._media += delta / self._n
+            self._m2 += delta * (x - self._media)
+
+    def linhas_ativas(self):
+        return self._indice[self._ativos]
+
+    # --- Estatísticas ------------------------------------------------------
+
+    @property
+    def n(self):
+        return self._n
+
+    @property
+    def media(self):
+        return self._media if self._n else float('nan')
+
+    @property
+    def desvio_padrao(self):
+        # Mesmo critério do pandas (ddof=1)
+        return math.sqrt(self._m2 / (self._n - 1)) if self._n > 1 else float('nan')
+
+    @property
+    def limite_inferior(self):
+        return self.media - 2 * self.desvio_padrao
+
+    @property
+    def limite_superior(self):
+        return self.media + 2 * self.desvio_padrao
+
+    @property
+    def cv(self):
+        # Coeficiente de variação em %, como nas páginas
+        if not self._n or self.media == 0:
+            return 0
+        return (self.desvio_padrao / self.media) * 100
+
+    @property
+    def mediana(self):
+        if not self._n:
+            return float('nan')
+        meio = (self._n + 1) // 2
+        if self._n % 2:
+            return self._k_esimo(meio)
+        return (self._k_esimo(meio) + self._k_esimo(meio + 1)) / 2
+
+    @property
+    def minimo(self):
+        return self._k_esimo(1) if self._n else float('nan')
+
+    @property
+    def maximo(self):
+        return self._k_esimo(self._n) if self._n else float('nan')
+
+    def resumo(self):
+        return {
+            'media': self.media,
+            'desvio_padrao': self.desvio_padrao,
+            'limite_inferior': self.limite_inferior,
+            'limite_superior': self.limite_superior,
+            'cv': self.cv,
+            'mediana': self.mediana,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+            'n': self.n,
+        }
@@ -0,0 +1,300 @@
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.metricas import cronometrado
+
+# Versões vetorizadas (coluna inteira de uma vez) de aplicar_mascara e
+# limpar_e_converter, de utils.utils. O resultado é idêntico ao da aplicação
+# célula a célula: o caminho rápido usa métodos de string do pandas e NumPy,
+# e apenas os valores que ele não consegue tratar (raros) passam pela versão
+# escalar.
+
+# Tipo de máscara aplicado a cada coluna na exibição
+FORMATACOES_COLUNAS = {
+    'niFornecedor': 'cnpj',
+    'precoUnitario': 'preco',
+    'quantidade': 'quantidade',
+    'codigoItemCatalogo': 'catmat',
+    'dataResultado': 'data',
+}
+
+_RE_DATA_ISO = r'^\d{4}-\d{1,2}-\d{1,2}$'
+_RE_CNPJ = r'^(\d{2})(\d{3})(\d{3})(\d{4})(\d{2})$'
+
+
+def _mascara_texto(serie):
+    # Os métodos .str devolvem NaN para o que não é string
+    if pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        return pd.Series(False, index=serie.index)
+    return serie.str.len().notna()
+
+
+def _mascara_ascii(serie, texto):
+    # Textos só com ASCII; os demais podem ter dígitos Unicode que o float() do Python aceita
+    # e o pd.to_numeric não, então vão pela versão escalar
+    return texto & ~serie.where(texto, '').str.contains(r'[^\x00-\x7f]', regex=True).fillna(False).astype(bool)
+
+
+def _textos(serie):
+    # Equivale a str(valor) em cada célula
+    return serie.astype(object).astype(str)
+
+
+def _montar_resultado(serie, valores, nulos):
+    resultado = pd.Series(valores, index=serie.index, name=serie.name, dtype=object)
+    resultado[nulos.to_numpy()] = ''
+    return resultado.infer_objects()
+
+
+def _preco_escalar(valor):
+    try:
+        if isinstance(valor, str):
+            return float(re.sub(r'[^\d.,]', '', valor).replace(',', '.'))
+        return float(valor)
+    except ValueError:
+        return valor
+
+
+def formatar_preco(serie):
+    nulos = serie.isna()
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        if not nulos.any():
+            return serie.astype('float64')
+        return _montar_resultado(serie, serie.astype('float64').to_numpy(dtype=object), nulos)
+
+    valores = serie.to_numpy(dtype=object, copy=True)
+    texto = _mascara_ascii(serie, _mascara_texto(serie))
+    limpos = serie[texto].str.replace(r'[^\d.,]', '', regex=True).str.replace(',', '.', regex=False)
+    numeros = pd.to_numeric(limpos, errors='coerce').astype('float64')
+    convertidos = numeros.notna().to_numpy()
+    posicoes = np.flatnonzero(texto.to_numpy())
+    valores[posicoes[convertidos]] = numeros.to_numpy()[convertidos]
+
+    # Valores que não são texto ASCII nem nulos (números guardados como objeto, dígitos Unicode)
+    outros = np.flatnonzero((~texto & ~nulos).to_numpy())
+    for i in outros:
+        valores[i] = _preco_escalar(valores[i])
+    return _montar_resultado(serie, valores, nulos)
+
+
+def _quantidade_escalar(valor):
+    try:
+        numero = float(str(valor).replace('.', '').replace(',', '.'))
+        return formatar_inteiro_agrupado(numero)
+    except ValueError:
+        return str(valor)
+
+
+def formatar_inteiro_agrupado(numero):
+    """Equivale a locale.format_string('%.0f', numero, grouping=True) em pt_BR, sem depender do locale."""
+    texto = '%.0f' % numero
+    sinal = '-' if texto.startswith('-') else ''
+    digitos = texto.lstrip('-')
+    if not digitos.isdigit():
+        return texto
+    return sinal + re.sub(r'(\d)(?=(?:\d{3})+$)', r'\1.', digitos)
+
+
+def _agrupar_inteiros(inteiros):
+    # '{:,}' agrupa com vírgula; em pt_BR o separador de milhar é o ponto
+    if len(inteiros) == 0:
+        return np.empty(0, dtype=object)
+    return pd.Series(inteiros, dtype='int64').map('{:,}'.format).str.replace(',', '.', regex=False).to_numpy(dtype=object)
+
+
+def formatar_quantidade(serie):
+    nulos = serie.isna()
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        numeros = serie.astype('float64').to_numpy()
+    elif pd.api.types.is_float_dtype(serie.dtype):
+        # str(x) de um float inteiro abaixo de 1e16 é 'N.0'; sem o ponto, vira N * 10
+        x = serie.to_numpy(dtype='float64', na_value=np.nan)
+        inteiro = np.isfinite(x) & (x == np.trunc(x)) & (np.abs(x) < 1e16)
+        numeros = np.where(inteiro, x * 10, np.nan)
+    else:
+        textos = _textos(serie)
+        numeros = pd.to_numeric(
+            textos.str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce'
+        ).astype('float64').to_numpy()
+
+    arredondados = np.rint(numeros)
+    rapidos = np.isfinite(arredondados) & (np.abs(arredondados) < 2 ** 53) & ~nulos.to_numpy()
+    valores = np.empty(len(serie), dtype=object)
+
+    inteiros = _agrupar_inteiros(arredondados[rapidos].astype('int64'))
+    # '%.0f' preserva o sinal de -0
+    inteiros[np.signbit(arredondados[rapidos]) & (arredondados[rapidos] == 0)] = '-0'
+    valores[rapidos] = inteiros
+
+    lentos = np.flatnonzero(~rapidos & ~nulos.to_numpy())
+    originais = serie.to_numpy(dtype=object)
+    for i in lentos:
+        valores[i] = _quantidade_escalar(originais[i])
+    return _montar_resultado(serie, valores, nulos)
+
+
+def _catmat_escalar(valor):
+    try:
+        return str(int(float(valor)))
+    except (ValueError, OverflowError):
+        return str(valor)
+
+
+def formatar_catmat(serie):
+    nulos = serie.isna()
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        numeros = serie.astype('float64').to_numpy()
+    else:
+        texto = _mascara_texto(serie).to_numpy()
+        numeros = np.full(len(serie), np.nan)
+        numeros[texto] = pd.to_numeric(serie[texto], errors='coerce').astype('float64').to_numpy()
+
+    truncados = np.trunc(numeros)
+    rapidos = np.isfinite(truncados) & (np.abs(truncados) < 2 ** 53) & ~nulos.to_numpy()
+    valores = np.empty(len(serie), dtype=object)
+    valores[rapidos] = pd.Series(truncados[rapidos].astype('int64')).astype(str).to_numpy()
+
+    lentos = np.flatnonzero(~rapidos & ~nulos.to_numpy())
+    originais = serie.to_numpy(dtype=object)
+    for i in lentos:
+        valores[i] = _catmat_escalar(originais[i])
+    return _montar_resultado(serie, valores, nulos)
+
+
+def _data_escalar(valor):
+    try:
+        if isinstance(valor, (datetime, pd.Timestamp)):
+            return valor.strftime("%d/%m/%Y")
+        elif isinstance(valor, str):
+            return datetime.strptime(valor, "%Y-%m-%d").strftime("%d/%m/%Y")
+        else:
+            return str(valor)
+    except ValueError:
+        return str(valor)
+
+
+def formatar_data(serie):
+    nulos = serie.isna()
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        return _montar_resultado(serie, serie.dt.strftime('%d/%m/%Y').to_numpy(dtype=object), nulos)
+
+    valores = np.empty(len(serie), dtype=object)
+    texto = _mascara_texto(serie)
+    iso = texto & serie.where(texto, '').str.match(_RE_DATA_ISO).fillna(False).astype(bool)
+    datas = pd.to_datetime(serie[iso], format='%Y-%m-%d', errors='coerce')
+    convertidas = datas.notna().to_numpy()
+    posicoes = np.flatnonzero(iso.to_numpy())
+    valores[posicoes[convertidas]] = datas[convertidas].dt.strftime('%d/%m/%Y').to_numpy(dtype=object)
+
+    rapidos = np.zeros(len(serie), dtype=bool)
+    rapidos[posicoes[convertidas]] = True
+    lentos = np.flatnonzero(~rapidos & ~nulos.to_numpy())
+    originais = serie.to_numpy(dtype=object)
+    for i in lentos:
+        valores[i] = _data_escalar(originais[i])
+    return _montar_resultado(serie, valores, nulos)
+
+
+def formatar_cnpj(serie):
+    nulos = serie.isna()
+    textos = _textos(serie)
+    digitos = textos.str.replace(r'\D', '', regex=True)
+    completos = digitos.str.len() == 14
+    mascarados = digitos.str.replace(_RE_CNPJ, r'\1.\2.\3/\4-\5', regex=True)
+    return _montar_resultado(serie, mascarados.where(completos, textos).to_numpy(dtype=object), nulos)
+
+
+_FORMATADORES = {
+    'preco': formatar_preco,
+    'quantidade': formatar_quantidade,
+    'catmat': formatar_catmat,
+    'data': formatar_data,
+    'cnpj': formatar_cnpj,
+}
+
+
+def _formatar_texto(serie):
+    return _montar_resultado(serie, _textos(serie).to_numpy(dtype=object), serie.isna())
+
+
+def _pode_fatorar(serie):
+    # Valores iguais de tipos diferentes (1 e 1.0, por exemplo) formatam
+    # diferente; colunas object só são fatoradas se tiverem apenas strings
+    if serie.dtype != object:
+        return True
+    return pd.api.types.infer_dtype(serie, skipna=True) in ('string', 'empty')
+
+
+def _por_valores_unicos(serie, funcao, vazio):
+    """
+    Aplica `funcao` apenas aos valores distintos da coluna e espalha o
+    resultado de volta. Colunas como data, CATMAT, CNPJ e quantidade repetem
+    muito os mesmos valores, então o trabalho cai para poucas células.
+    """
+    if len(serie) == 0 or not _pode_fatorar(serie):
+        return funcao(serie)
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    if len(unicos) > len(serie) // 2:
+        return funcao(serie)
+    convertidos = funcao(pd.Series(unicos, dtype=serie.dtype)).to_numpy(dtype=object)
+    valores = np.append(convertidos, vazio)[codigos]
+    return pd.Series(valores, index=serie.index, name=serie.name, dtype=object).infer_objects()
+
+
+def formatar_coluna(serie, tipo):
+    """
+    Versão vetorizada de `serie.apply(lambda x: aplicar_mascara(x, tipo))`.
+
+    :param serie: Coluna a ser formatada
+    :param tipo: 'cnpj', 'preco', 'quantidade', 'catmat' ou 'data'; outros tipos viram texto
+    :return: Nova Series com os valores formatados
+    """
+    formatador = _FORMATADORES.get(tipo, _formatar_texto)
+    if tipo == 'preco' and pd.api.types.is_numeric_dtype(serie.dtype):
+        # Preços numéricos já são convertidos direto pelo NumPy
+        return formatador(serie)
+    return _por_valores_unicos(serie, formatador, '')
+
+
+@cronometrado('formatacao')
+def aplicar_formatacoes_colunas(df, formatacoes=None):
+    """Aplica as máscaras de exibição às colunas do DataFrame, uma coluna por vez."""
+    formatacoes = FORMATACOES_COLUNAS if formatacoes is None else formatacoes
+    for coluna, tipo in formatacoes.items():
+        if coluna in df.columns:
+            df[coluna] = formatar_coluna(df[coluna], tipo)
+    return df
+
+
+def converter_numerico(serie):
+    """
+    Versão vetorizada de `serie.apply(limpar_e_converter)`.
+
+    Textos perdem tudo que não for dígito, ponto ou vírgula, e a vírgula vira
+    ponto. O que não puder ser convertido vira NaN.
+
+    :return: Series float64
+    """
+    if pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype):
+        return serie.astype('float64')
+    return _por_valores_unicos(serie, _converter_numerico, np.nan).astype('float64')
+
+
+def _converter_numerico(serie):
+    resultado = np.full(len(serie), np.nan)
+    # str.isdigit aceita alguns dígitos não ASCII que \d não aceita: esses vão pela versão escalar
+    ascii_ = _mascara_ascii(serie, _mascara_texto(serie))
+    limpos = serie[ascii_].str.replace(r'[^\d.,]', '', regex=True).str.replace(',', '.', regex=False)
+    resultado[ascii_.to_numpy()] = pd.to_numeric(limpos, errors='coerce').astype('float64').to_numpy()
+
+    originais = serie.to_numpy(dtype=object)
+    for i in np.flatnonzero(~ascii_.to_numpy() & serie.notna().to_numpy()):
+        valor = originais[i]
+        if isinstance(valor, str):
+            valor = ''.join(c for c in valor if c.isdigit() or c in ['.', ',']).replace(',', '.')
+        try:
+            resultado[i] = float(valor)
+        except (TypeError, ValueError):
+            pass
+    return pd.Series(resultado, index=serie.index, name=serie.name)
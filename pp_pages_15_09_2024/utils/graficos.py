@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from utils.metricas import metricas
+
+# Acima disto o gráfico de dispersão recebe uma amostra, não todos os pontos
+LIMITE_PONTOS = 5_000
+# Faixas por eixo da grade de densidade (e da amostragem estratificada)
+FAIXAS_DENSIDADE = 40
+# Faixas do histograma de preços
+FAIXAS_HISTOGRAMA = 30
+
+
+def _validos(x, y):
+    """Pares (x, y) finitos como arrays float64."""
+    x = pd.to_numeric(pd.Series(x), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    y = pd.to_numeric(pd.Series(y), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    validos = np.isfinite(x) & np.isfinite(y)
+    return x[validos], y[validos]
+
+
+def _celulas(valores, faixas):
+    """Índice da faixa (0 a faixas-1) de cada valor, com faixas de mesma largura."""
+    minimo, maximo = valores.min(), valores.max()
+    if maximo == minimo:
+        return np.zeros(len(valores), dtype=np.int64)
+    posicao = ((valores - minimo) / (maximo - minimo) * faixas).astype(np.int64)
+    return np.minimum(posicao, faixas - 1)
+
+
+def faixas_histograma(valores, faixas=FAIXAS_HISTOGRAMA):
+    """Histograma já contado: DataFrame com inicio, fim e registros de cada faixa."""
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[np.isfinite(valores)]
+    if len(valores) == 0:
+        return pd.DataFrame({'inicio': [], 'fim': [], 'registros': []})
+    contagens, bordas = np.histogram(valores, bins=faixas)
+    return pd.DataFrame({'inicio': bordas[:-1], 'fim': bordas[1:], 'registros': contagens})
+
+
+def densidade_2d(x, y, faixas=FAIXAS_DENSIDADE):
+    """
+    Contagem de pontos numa grade faixas x faixas (histograma 2D).
+
+    Só as células com pontos são devolvidas, então o tamanho não passa de
+    faixas² linhas, qualquer que seja a quantidade de pontos.
+
+    :return: DataFrame com x_inicio, x_fim, y_inicio, y_fim e registros
+    """
+    if len(x) == 0:
+        return pd.DataFrame({'x_inicio': [], 'x_fim': [], 'y_inicio': [], 'y_fim': [], 'registros': []})
+    contagens, bordas_x, bordas_y = np.histogram2d(x, y, bins=faixas)
+    ix, iy = np.nonzero(contagens)
+    return pd.DataFrame({
+        'x_inicio': bordas_x[ix], 'x_fim': bordas_x[ix + 1],
+        'y_inicio': bordas_y[iy], 'y_fim': bordas_y[iy + 1],
+        'registros': contagens[ix, iy].astype(np.int64),
+    })
+
+
+def amostrar_pontos(x, y, limite=LIMITE_PONTOS, faixas=FAIXAS_DENSIDADE, seed=0):
+    """
+    Posições de uma amostra estratificada de no máximo `limite` pontos.
+
+    Cada célula ocupada da grade faixas x faixas entra com pelo menos um
+    ponto e os mínimos e máximos de x e y entram sempre, então regiões
+    esparsas e valores extremos continuam visíveis; o restante da cota é
+    sorteado entre os demais pontos, mantendo a forma das regiões densas. A
+    mesma entrada gera sempre a mesma amostra.
+    """
+    total = len(x)
+    if total <= limite:
+        return np.arange(total)
+    extremos = np.unique([x.argmin(), x.argmax(), y.argmin(), y.argmax()])
+    ordem = np.random.default_rng(seed).permutation(total)
+    celula = (_celulas(x, faixas) * faixas + _celulas(y, faixas))[ordem]
+    # Primeira ocorrência de cada célula na ordem sorteada
+    _, primeiras = np.unique(celula, return_index=True)
+    candidatos = np.concatenate([ordem[primeiras], np.delete(ordem, primeiras)])
+    candidatos = candidatos[~np.isin(candidatos, extremos)]
+    return np.sort(np.concatenate([extremos, candidatos[:limite - len(extremos)]]))
+
+
+def ajustar_tendencia(x, y):
+    """
+    Reta de mínimos quadrados (a mesma do trendline="ols" do Plotly).
+
+    :return: dict com inclinacao, intercepto, r2 e os pontos extremos da reta,
+             ou None se não houver variação em x
+    """
+    if len(x) < 2:
+        return None
+    media_x, media_y = x.mean(), y.mean()
+    dx, dy = x - media_x, y - media_y
+    sxx = np.dot(dx, dx)
+    if sxx == 0:
+        return None
+    inclinacao = np.dot(dx, dy) / sxx
+    intercepto = media_y - inclinacao * media_x
+    syy = np.dot(dy, dy)
+    r2 = (np.dot(dx, dy) ** 2 / (sxx * syy)) if syy else 1.0
+    extremos = np.array([x.min(), x.max()])
+    return {
+        'inclinacao': float(inclinacao),
+        'intercepto': float(intercepto),
+        'r2': float(r2),
+        'x': extremos.tolist(),
+        'y': (intercepto + inclinacao * extremos).tolist(),
+    }
+
+
+def preparar_dispersao(x, y, limite=LIMITE_PONTOS, faixas=FAIXAS_DENSIDADE, faixas_histograma_y=FAIXAS_HISTOGRAMA):
+    """
+    Dados prontos para os gráficos de quantidade x preço.
+
+    O que vai para o navegador tem tamanho limitado: a dispersão recebe no
+    máximo `limite` pontos (amostra estratificada), a densidade no máximo
+    faixas² células e o histograma de y já vem contado. Correlação e reta de
+    tendência são calculadas sobre todos os pontos. Quem chama guarda o
+    resultado no cache de visões (utils.visoes), pela versão dos dados.
+
+    :return: dict com total, pontos (DataFrame x/y), amostrado, densidade,
+             histograma, correlacao e tendencia
+    """
+    x, y = _validos(x, y)
+    with metricas.medir('graficos'):
+        posicoes = amostrar_pontos(x, y, limite, faixas)
+        correlacao = float(np.corrcoef(x, y)[0, 1]) if len(x) > 1 and x.std() and y.std() else float('nan')
+        preparado = {
+            'total': len(x),
+            'pontos': pd.DataFrame({'x': x[posicoes], 'y': y[posicoes]}),
+            'amostrado': len(posicoes) < len(x),
+            'densidade': densidade_2d(x, y, faixas),
+            'histograma': faixas_histograma(y, faixas_histograma_y),
+            'correlacao': correlacao,
+            'tendencia': ajustar_tendencia(x, y),
+        }
+    return preparado
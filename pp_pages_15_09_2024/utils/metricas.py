@@ -0,0 +1,228 @@
+import cProfile
+import io
+import json
+import math
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Limites (s) das faixas dos histogramas de tempo, como os buckets do Prometheus
+FAIXAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Observações individuais guardadas para a exportação em JSON lines
+MAX_EVENTOS = 10_000
+# Prefixo dos nomes na exportação para o Prometheus
+PREFIXO_PROMETHEUS = "pesquisa_precos_"
+
+
+class Histograma:
+    """Contagens por faixa, soma, mínimo e máximo de uma série de observações."""
+
+    def __init__(self, faixas=FAIXAS_SEGUNDOS):
+        self.faixas = faixas
+        self.contagens = [0] * (len(faixas) + 1)
+        self.n = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def observar(self, valor):
+        indice = next((i for i, limite in enumerate(self.faixas) if valor <= limite), len(self.faixas))
+        self.contagens[indice] += 1
+        self.n += 1
+        self.soma += valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def quantil(self, q):
+        """Quantil aproximado por interpolação dentro da faixa (como o histogram_quantile do Prometheus)."""
+        if not self.n:
+            return math.nan
+        alvo = q * self.n
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            if contagem and acumulado + contagem >= alvo:
+                inicio = self.faixas[i - 1] if i else 0.0
+                fim = self.faixas[i] if i < len(self.faixas) else self.maximo
+                estimado = inicio + (fim - inicio) * (alvo - acumulado) / contagem
+                return min(max(estimado, self.minimo), self.maximo)
+            acumulado += contagem
+        return self.maximo
+
+    def resumo(self):
+        return {
+            'n': self.n,
+            'soma': self.soma,
+            'media': self.soma / self.n if self.n else math.nan,
+            'p50': self.quantil(0.5),
+            'p95': self.quantil(0.95),
+            'maximo': self.maximo if self.n else math.nan,
+        }
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted(rotulos.items()))
+
+
+class Metricas:
+    """
+    Contadores e histogramas do processo, para o painel de desempenho e a exportação.
+
+    Cada métrica tem um nome e rótulos opcionais (por exemplo, a etapa ou o
+    status HTTP), como no Prometheus. Além dos agregados, as últimas
+    MAX_EVENTOS observações ficam guardadas com o horário, para a exportação
+    em JSON lines. Pode ser usada de várias threads (coleta, agente).
+    """
+
+    def __init__(self, max_eventos=MAX_EVENTOS):
+        self._lock = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+        self.eventos = deque(maxlen=max_eventos)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + valor
+            self.eventos.append({'ts': time.time(), 'tipo': 'contador', 'nome': nome, 'valor': valor, 'rotulos': rotulos})
+
+    def observar(self, nome, valor, **rotulos):
+        chave = _chave(nome, rotulos)
+        with self._lock:
+            if chave not in self.histogramas:
+                self.histogramas[chave] = Histograma()
+            self.histogramas[chave].observar(valor)
+            self.eventos.append({'ts': time.time(), 'tipo': 'histograma', 'nome': nome, 'valor': valor, 'rotulos': rotulos})
+
+    @contextmanager
+    def medir(self, etapa, **rotulos):
+        """Cronometra o bloco como uma observação de `etapa_segundos`, mesmo se ele falhar."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar('etapa_segundos', time.perf_counter() - inicio, etapa=etapa, **rotulos)
+
+    def contador(self, nome, **rotulos):
+        """Valor do contador; sem rótulos, a soma de todas as suas séries."""
+        with self._lock:
+            if rotulos:
+                return self.contadores.get(_chave(nome, rotulos), 0)
+            return sum(valor for (n, _), valor in self.contadores.items() if n == nome)
+
+    def histograma(self, nome, **rotulos):
+        with self._lock:
+            return self.histogramas.get(_chave(nome, rotulos))
+
+    def resumo(self):
+        """Uma linha por série de histograma (nome, rótulos, n, soma, média, p50, p95, máximo), pronta para pd.DataFrame."""
+        with self._lock:
+            return [
+                {'nome': nome, 'rotulos': dict(rotulos), **histograma.resumo()}
+                for (nome, rotulos), histograma in sorted(self.histogramas.items())
+            ]
+
+    def paginas_por_segundo(self):
+        """Páginas recebidas da API por segundo de coleta."""
+        coleta = self.histograma('etapa_segundos', etapa='coleta')
+        if coleta is None or not coleta.soma:
+            return math.nan
+        return self.contador('http_paginas_total') / coleta.soma
+
+    def para_jsonl(self):
+        """Observações guardadas, uma por linha em JSON."""
+        with self._lock:
+            eventos = list(self.eventos)
+        return "".join(json.dumps(evento, ensure_ascii=False) + "\n" for evento in eventos)
+
+    def para_prometheus(self):
+        """Contadores e histogramas no formato de texto do Prometheus."""
+        linhas = []
+        with self._lock:
+            contadores = sorted(self.contadores.items())
+            histogramas = sorted(self.histogramas.items())
+        for nome in dict.fromkeys(n for (n, _), _ in contadores):
+            linhas.append(f"# TYPE {PREFIXO_PROMETHEUS}{nome} counter")
+            linhas.extend(f"{PREFIXO_PROMETHEUS}{nome}{_rotulos_prometheus(r)} {valor}"
+                          for (n, r), valor in contadores if n == nome)
+        for nome in dict.fromkeys(n for (n, _), _ in histogramas):
+            linhas.append(f"# TYPE {PREFIXO_PROMETHEUS}{nome} histogram")
+            for (n, rotulos), histograma in histogramas:
+                if n != nome:
+                    continue
+                acumulado = 0
+                for limite, contagem in zip((*histograma.faixas, '+Inf'), histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f"{PREFIXO_PROMETHEUS}{nome}_bucket{_rotulos_prometheus((*rotulos, ('le', limite)))} {acumulado}")
+                linhas.append(f"{PREFIXO_PROMETHEUS}{nome}_sum{_rotulos_prometheus(rotulos)} {histograma.soma}")
+                linhas.append(f"{PREFIXO_PROMETHEUS}{nome}_count{_rotulos_prometheus(rotulos)} {histograma.n}")
+        return "\n".join(linhas) + "\n"
+
+    def limpar(self):
+        with self._lock:
+            self.contadores.clear()
+            self.histogramas.clear()
+            self.eventos.clear()
+
+
+def _rotulos_prometheus(rotulos):
+    if not rotulos:
+        return ""
+    escapados = (str(valor).replace('\\', '\\\\').replace('"', '\\"') for _, valor in rotulos)
+    return "{" + ",".join(f'{nome}="{valor}"' for (nome, _), valor in zip(rotulos, escapados)) + "}"
+
+
+metricas = Metricas()
+
+
+def cronometrado(etapa):
+    """Decorador: cada chamada da função vira uma observação da etapa em `metricas`."""
+    def decorador(funcao):
+        @wraps(funcao)
+        def cronometrar(*args, **kwargs):
+            with metricas.medir(etapa):
+                return funcao(*args, **kwargs)
+        return cronometrar
+    return decorador
+
+
+class Perfilador:
+    """
+    cProfile ligado sob demanda, para perfilar uma única execução (um rerun do app).
+
+    `iniciar` liga o cProfile; `parar` desliga e devolve o relatório do
+    pstats com as funções mais caras pelo tempo acumulado. Os dados brutos
+    ficam em `dados` (formato do pstats, para abrir no snakeviz e afins).
+    """
+
+    def __init__(self, linhas=40):
+        self.linhas = linhas
+        self._perfil = None
+        self.dados = None
+
+    @property
+    def ativo(self):
+        return self._perfil is not None
+
+    def iniciar(self):
+        if self._perfil is None:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+
+    def parar(self):
+        if self._perfil is None:
+            return None
+        self._perfil.disable()
+        perfil, self._perfil = self._perfil, None
+        saida = io.StringIO()
+        estatisticas = pstats.Stats(perfil, stream=saida)
+        estatisticas.sort_stats('cumulative').print_stats(self.linhas)
+        self.dados = perfil
+        return saida.getvalue()
+
+    def salvar(self, caminho):
+        """Grava o último perfil no formato do pstats."""
+        if self.dados is not None:
+            self.dados.dump_stats(caminho)
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Métodos de exclusão de valores discrepantes disponíveis na análise crítica
+METODOS_OUTLIERS = {
+    'desvio': 'Média ± 2 desvios padrão',
+    'mad': 'Mediana ± 3 MAD',
+    'iqr': 'Intervalo interquartil (1,5 × IQR)',
+    'tukey': 'Cercas externas de Tukey (3 × IQR)',
+}
+
+# Fator que torna o MAD comparável ao desvio padrão em dados normais
+FATOR_MAD = 1.4826
+
+
+def calcular_limites(valores, metodo='desvio'):
+    """
+    Calcula os limites inferior e superior de aceitação dos preços.
+
+    :param valores: Array NumPy de preços, sem nulos
+    :param metodo: Uma das chaves de METODOS_OUTLIERS
+    :return: (limite_inferior, limite_superior)
+    """
+    if metodo == 'desvio':
+        media = valores.mean()
+        desvio_padrao = valores.std(ddof=1) if len(valores) > 1 else np.nan
+        return media - 2 * desvio_padrao, media + 2 * desvio_padrao
+    if metodo == 'mad':
+        mediana = np.median(valores)
+        mad = FATOR_MAD * np.median(np.abs(valores - mediana))
+        return mediana - 3 * mad, mediana + 3 * mad
+    if metodo in ('iqr', 'tukey'):
+        q1, q3 = np.percentile(valores, [25, 75])
+        fator = 1.5 if metodo == 'iqr' else 3.0
+        return q1 - fator * (q3 - q1), q3 + fator * (q3 - q1)
+    raise ValueError(f"Método de exclusão desconhecido: {metodo}")
+
+
+def _coeficiente_variacao(valores):
+    if len(valores) < 2:
+        return 0.0
+    media = valores.mean()
+    return (valores.std(ddof=1) / media) * 100 if media != 0 else 0.0
+
+
+def aparar_iterativo(valores, metodo='desvio', limite_cv=25.0, max_iteracoes=50):
+    """
+    Exclui valores discrepantes repetidamente até o CV ficar dentro do limite.
+
+    Faz de uma vez o que o analista faria clicando várias vezes em "Excluir
+    fora dos limites". Trabalha só com uma máscara booleana sobre o array de
+    preços, sem copiar o DataFrame a cada rodada.
+
+    :param valores: Preços (array ou Series); nulos são ignorados
+    :param metodo: Uma das chaves de METODOS_OUTLIERS
+    :param limite_cv: Para quando o coeficiente de variação (%) fica igual ou abaixo deste valor
+    :param max_iteracoes: Número máximo de rodadas
+    :return: Dicionário com 'mantidos' (máscara booleana alinhada a `valores`),
+             'iteracoes' (lista com o estado de cada rodada antes da exclusão)
+             e 'cv_final' (coeficiente de variação dos valores mantidos)
+    """
+    valores = np.asarray(valores, dtype='float64')
+    mantidos = ~np.isnan(valores)
+    iteracoes = []
+
+    for iteracao in range(1, max_iteracoes + 1):
+        atuais = valores[mantidos]
+        cv = _coeficiente_variacao(atuais)
+        if len(atuais) < 3 or cv <= limite_cv:
+            break
+
+        limite_inferior, limite_superior = calcular_limites(atuais, metodo)
+        fora = mantidos & ((valores < limite_inferior) | (valores > limite_superior))
+        excluidos = int(fora.sum())
+        iteracoes.append({
+            'iteracao': iteracao,
+            'registros': len(atuais),
+            'media': float(atuais.mean()),
+            'cv': float(cv),
+            'limite_inferior': float(limite_inferior),
+            'limite_superior': float(limite_superior),
+            'excluidos': excluidos,
+        })
+        if excluidos == 0:
+            break
+        mantidos &= ~fora
+
+    return {'mantidos': mantidos, 'iteracoes': iteracoes, 'cv_final': float(_coeficiente_variacao(valores[mantidos]))}
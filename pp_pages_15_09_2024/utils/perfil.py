@@ -0,0 +1,117 @@
+import pandas as pd
+from utils.esquema import ESQUEMA_COLUNAS
+from utils.dataset import COLUNAS_NUMERICAS, coluna_numerica
+
+# Tamanho máximo do perfil, em caracteres (~4 caracteres por token)
+MAX_CARACTERES_PERFIL = 6000
+# Valores mais frequentes listados por coluna de texto
+MAX_CATEGORIAS = 5
+# Grupos listados nos quantis de preço por estado e modalidade
+MAX_GRUPOS_PERFIL = 15
+# Colunas de texto com mais valores distintos que isto não têm os mais frequentes listados
+MAX_DISTINTOS_PERFIL = 5000
+
+
+def _numero(valor):
+    if pd.isna(valor):
+        return "-"
+    return f"{valor:.2f}" if abs(valor) < 1e6 else f"{valor:.3g}"
+
+
+def _secao_esquema(df):
+    linhas = ["Colunas (nome | tipo | não nulos | descrição):"]
+    for coluna in df.columns:
+        rotulo = ESQUEMA_COLUNAS.get(coluna, {}).get('rotulo') or ''
+        linhas.append(f"- {coluna} | {df[coluna].dtype} | {df[coluna].count()} | {rotulo}")
+    return "\n".join(linhas)
+
+
+def _secao_numericas(df):
+    linhas = ["Resumo numérico (n | média | desvio | mín | p25 | mediana | p75 | máx):"]
+    for coluna in df.columns:
+        if coluna in COLUNAS_NUMERICAS:
+            serie = coluna_numerica(df, coluna)
+        elif pd.api.types.is_numeric_dtype(df[coluna].dtype) and not pd.api.types.is_bool_dtype(df[coluna].dtype):
+            serie = df[coluna].astype('float64')
+        else:
+            continue
+        q = serie.quantile([0.25, 0.5, 0.75])
+        valores = [serie.mean(), serie.std(), serie.min(), q[0.25], q[0.5], q[0.75], serie.max()]
+        linhas.append(f"- {coluna}: {serie.count()} | " + " | ".join(_numero(v) for v in valores))
+    return "\n".join(linhas)
+
+
+def _secao_datas(df):
+    linhas = ["Períodos:"]
+    for coluna in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[coluna].dtype):
+            linhas.append(f"- {coluna}: {df[coluna].min():%Y-%m-%d} a {df[coluna].max():%Y-%m-%d}")
+    return "\n".join(linhas) if len(linhas) > 1 else ""
+
+
+def _secao_categorias(df):
+    linhas = [f"Valores mais frequentes (até {MAX_CATEGORIAS}):"]
+    for coluna in df.columns:
+        serie = df[coluna]
+        texto = isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(serie.dtype) or serie.dtype == object
+        if not texto or coluna in COLUNAS_NUMERICAS or coluna in COLUNAS_NUMERICAS.values():
+            continue
+        distintos = serie.nunique()
+        if distintos > MAX_DISTINTOS_PERFIL:
+            linhas.append(f"- {coluna}: {distintos} valores distintos")
+            continue
+        frequentes = serie.value_counts().head(MAX_CATEGORIAS)
+        itens = ", ".join(f"{str(valor)[:40]} ({contagem})" for valor, contagem in frequentes.items())
+        linhas.append(f"- {coluna} ({distintos} distintos): {itens}")
+    return "\n".join(linhas)
+
+
+def _secao_quantis_grupo(df, grupo):
+    if grupo not in df.columns or 'precoUnitario' not in df.columns:
+        return ""
+    preco = coluna_numerica(df, 'precoUnitario')
+    agrupado = preco.groupby(df[grupo], observed=True)
+    tabela = pd.DataFrame({
+        'n': agrupado.count(),
+        'p25': agrupado.quantile(0.25),
+        'mediana': agrupado.median(),
+        'p75': agrupado.quantile(0.75),
+    }).sort_values('n', ascending=False).head(MAX_GRUPOS_PERFIL)
+    linhas = [f"Preço unitário por {grupo} (n | p25 | mediana | p75), {MAX_GRUPOS_PERFIL} maiores grupos:"]
+    for indice, linha in tabela.iterrows():
+        linhas.append(f"- {indice}: {int(linha['n'])} | {_numero(linha['p25'])} | {_numero(linha['mediana'])} | {_numero(linha['p75'])}")
+    return "\n".join(linhas)
+
+
+def perfil_dataset(df, max_caracteres=MAX_CARACTERES_PERFIL):
+    """
+    Resumo compacto do DataFrame para o prompt do agente.
+
+    Traz esquema, resumo das colunas numéricas, períodos, valores mais
+    frequentes e quantis do preço por estado e modalidade, para o agente
+    responder sem gastar chamadas à ferramenta só para descobrir tipos e
+    distribuições. As seções entram em ordem de importância até o limite de
+    `max_caracteres`; a última é cortada numa quebra de linha.
+
+    :param df: DataFrame tipado (antes de aplicar as máscaras de exibição)
+    :return: Texto do perfil
+    """
+    secoes = [
+        f"O DataFrame `df` tem {len(df)} linhas e {len(df.columns)} colunas.",
+        _secao_esquema(df),
+        _secao_numericas(df),
+        _secao_datas(df),
+        _secao_quantis_grupo(df, 'estado'),
+        _secao_quantis_grupo(df, 'modalidade'),
+        _secao_categorias(df),
+    ]
+    perfil = ""
+    for secao in filter(None, secoes):
+        candidato = f"{perfil}\n\n{secao}" if perfil else secao
+        if len(candidato) <= max_caracteres:
+            perfil = candidato
+            continue
+        corte = candidato.rfind("\n", 0, max_caracteres)
+        perfil = candidato[:corte] if corte > len(perfil) else perfil
+        break
+    return perfil
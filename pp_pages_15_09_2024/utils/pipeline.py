@@ -0,0 +1,147 @@
+import asyncio
+import concurrent.futures
+import json
+import math
+import os
+import time
+import pandas as pd
+from utils import apis
+from utils.analise import AnaliseCritica
+from utils.metricas import metricas
+from utils.relatorio import FORMATOS_RELATORIO, MAX_PROCESSOS_EXPORTACAO, exportar_relatorio, montar_relatorio
+
+# Pipeline de lote: busca → limpeza → estatísticas → exportação, sem interface.
+# Só usa módulos de dados (nada de Streamlit, gráficos ou agentes), para rodar
+# em servidor ou agendado e começar rápido.
+
+# Formatos de saída por item: a tabela da análise em CSV e os do relatório
+FORMATOS_SAIDA = ('csv', *FORMATOS_RELATORIO)
+
+
+def processar_item(item, df, pasta_saida, formatos=('csv', 'html'), metodo='desvio', limite_cv=25.0):
+    """
+    Análise crítica automática e exportação de um item.
+
+    Marca em Desconsiderar os preços que o aparo iterativo descarta (como na
+    página de análise) e grava os arquivos do item em `pasta_saida`.
+
+    :param item: Código do item, usado no nome dos arquivos
+    :param df: Registros do item
+    :param formatos: Formatos de FORMATOS_SAIDA
+    :return: Dicionário com as estatísticas dos preços aceitos e os arquivos gravados
+    """
+    analise = AnaliseCritica(df)
+    desconsideradas, resultado = analise.marcar_outliers(metodo=metodo, limite_cv=limite_cv)
+    tabela = analise.tabela()
+
+    base = os.path.join(pasta_saida, f"mapa_de_precos_{item}")
+    arquivos = []
+    if 'csv' in formatos:
+        tabela.to_csv(f"{base}.csv", index=False)
+        arquivos.append(f"{base}.csv")
+    formatos_relatorio = [f for f in formatos if f in FORMATOS_RELATORIO]
+    if formatos_relatorio:
+        relatorio = montar_relatorio(analise.base, tabela, titulo=f"Mapa de preços - item {item}")
+        for formato in formatos_relatorio:
+            caminho = f"{base}.{FORMATOS_RELATORIO[formato][1]}"
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(exportar_relatorio(relatorio, formato))
+            arquivos.append(caminho)
+
+    return {
+        'item': str(item),
+        'registros': len(tabela),
+        'desconsiderados': len(desconsideradas),
+        'iteracoes': len(resultado['iteracoes']),
+        **analise.estatisticas.resumo(),
+        'arquivos': arquivos,
+    }
+
+
+def _processar_item(args):
+    return processar_item(*args)
+
+
+def processar_itens(dados, pasta_saida, formatos=('csv', 'html'), metodo='desvio', limite_cv=25.0,
+                    max_processos=MAX_PROCESSOS_EXPORTACAO):
+    """
+    Processa vários itens, um por processo (no próprio processo com um item só ou max_processos=1).
+
+    :param dados: Dicionário item -> DataFrame com os registros do item
+    :return: Lista com o resultado de processar_item de cada item, na ordem de `dados`
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    tarefas = [(item, df, pasta_saida, formatos, metodo, limite_cv) for item, df in dados.items()]
+    if max_processos > 1 and len(tarefas) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(max_processos, len(tarefas))) as executor:
+            return list(executor.map(_processar_item, tarefas))
+    return [_processar_item(tarefa) for tarefa in tarefas]
+
+
+def separar_por_item(df):
+    """Dicionário item -> registros, pela coluna codigoItemPesquisado do resultado de consultar_itens_em_lote."""
+    if df is None:
+        return {}
+    return {str(item): grupo for item, grupo in df.groupby('codigoItemPesquisado', observed=True, sort=False)}
+
+
+def executar_pipeline(codigos_itens, data_inicial, data_final, pasta_saida, formatos=('csv', 'html'),
+                      metodo='desvio', limite_cv=25.0, usar_cache=True, max_processos=MAX_PROCESSOS_EXPORTACAO,
+                      url=apis.URL_CONSULTAR_MATERIAL):
+    """
+    Busca os itens na API e grava a análise e os relatórios de cada um em `pasta_saida`.
+
+    A busca de todos os itens é uma só tarefa assíncrona (consultar_itens_em_lote);
+    a análise e a exportação rodam em processos, um item por vez em cada.
+    Além dos arquivos de cada item, grava resumo.csv e resumo.json com uma
+    linha por item (itens sem registros aparecem com registros = 0).
+
+    :param data_inicial: Data inicial no formato 'AAAA-MM-DD'
+    :param data_final: Data final no formato 'AAAA-MM-DD'
+    :return: DataFrame do resumo
+    """
+    inicio = time.perf_counter()
+    coleta = asyncio.run(apis.consultar_itens_em_lote(codigos_itens, data_inicial, data_final, url=url, usar_cache=usar_cache))
+    tempo_coleta = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    # Os processos não compartilham as métricas; a etapa é medida inteira aqui
+    with metricas.medir('processamento'):
+        resultados = {r['item']: r for r in processar_itens(separar_por_item(coleta['df']), pasta_saida, formatos=formatos,
+                                                             metodo=metodo, limite_cv=limite_cv, max_processos=max_processos)}
+    tempo_processamento = time.perf_counter() - inicio
+
+    linhas = []
+    for coleta_item in coleta['por_item'].to_dict('records'):
+        item = coleta_item['codigoItemPesquisado']
+        resultado = resultados.get(item, {'item': item, 'registros': 0, 'arquivos': []})
+        linhas.append({
+            **resultado,
+            'paginas': coleta_item['paginas'],
+            'paginas_faltantes': coleta_item['paginas_faltantes'],
+            # Fatia de datas e número de cada página não obtida, para buscar de novo
+            'paginas_nao_obtidas': apis.descrever_paginas_faltantes(coleta['paginas_faltantes'].get(item, [])),
+            'tempo_coleta_s': coleta_item['tempo_s'],
+        })
+    resumo = pd.DataFrame(linhas)
+
+    resumo.drop(columns=['arquivos']).assign(paginas_nao_obtidas=resumo['paginas_nao_obtidas'].str.join('; ')) \
+        .to_csv(os.path.join(pasta_saida, 'resumo.csv'), index=False)
+    with open(os.path.join(pasta_saida, 'resumo.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'data_inicial': data_inicial,
+            'data_final': data_final,
+            'metodo': metodo,
+            'limite_cv': limite_cv,
+            'tempo_coleta_s': round(tempo_coleta, 2),
+            'tempo_processamento_s': round(tempo_processamento, 2),
+            'itens': [{chave: _valor_json(valor) for chave, valor in linha.items()} for linha in linhas],
+        }, arquivo, ensure_ascii=False, indent=2)
+    return resumo
+
+
+def _valor_json(valor):
+    # Estatísticas de item sem preço são NaN, que não existe em JSON
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    return None if isinstance(valor, float) and math.isnan(valor) else valor
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+# Banco com as tabelas de referência (códigos da API -> nomes)
+CAMINHO_INFO = 'data/info.db'
+
+# Colunas da API traduzidas na chegada: coluna -> (tabela, coluna do código, coluna do nome)
+TRADUCOES_COLUNAS = {
+    'modalidade': ('modalidades', 'id', 'modalidade'),
+}
+
+# Tabelas e mapeamentos já lidos: chave -> (mtime do arquivo, valor)
+_memoria = {}
+_lock = threading.Lock()
+
+
+def _memorizado(caminho, chave, construir):
+    """Valor guardado para a chave enquanto o arquivo não mudar; None se o banco não existir."""
+    try:
+        mtime = os.stat(caminho).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lock:
+        guardado = _memoria.get(chave)
+        if guardado is not None and guardado[0] == mtime:
+            return guardado[1]
+    valor = construir()
+    with _lock:
+        _memoria[chave] = (mtime, valor)
+    return valor
+
+
+def carregar_tabela(tabela, caminho=None):
+    """
+    Lê uma tabela de referência do info.db, guardando o resultado na memória.
+
+    A tabela só é lida de novo quando o arquivo muda (mtime diferente). Se o
+    banco não existir, devolve um DataFrame vazio.
+    """
+    caminho = caminho or CAMINHO_INFO
+
+    def ler():
+        conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+        try:
+            return pd.read_sql_query(f'SELECT * FROM "{tabela}"', conn)
+        finally:
+            conn.close()
+
+    dados = _memorizado(caminho, (caminho, tabela), ler)
+    return pd.DataFrame() if dados is None else dados
+
+
+def obter_mapeamento(tabela, coluna_codigo, coluna_nome, caminho=None):
+    """Dicionário código -> nome de uma tabela de referência (não deve ser alterado)."""
+    caminho = caminho or CAMINHO_INFO
+
+    def montar():
+        dados = carregar_tabela(tabela, caminho)
+        if dados.empty:
+            return {}
+        return dict(zip(dados[coluna_codigo].astype(str), dados[coluna_nome]))
+
+    return _memorizado(caminho, (caminho, tabela, coluna_codigo, coluna_nome), montar) or {}
+
+
+def limpar_referencias():
+    with _lock:
+        _memoria.clear()
+
+
+def _normalizar_codigo(valor, largura):
+    # A API manda 5 ou "5"; a tabela guarda "05"
+    texto = str(valor).strip()
+    if texto.endswith('.0'):
+        texto = texto[:-2]
+    return texto.zfill(largura) if texto.isdigit() else texto
+
+
+def traduzir_codigos(df, traducoes=None, caminho=None):
+    """
+    Troca os códigos das colunas de TRADUCOES_COLUNAS pelos nomes.
+
+    A tradução é feita uma vez por código distinto (factorize) e o resultado
+    vira uma coluna categórica montada direto dos códigos, sem consulta linha
+    a linha. Códigos sem nome na tabela ficam como estão; colunas já
+    traduzidas passam sem mudança.
+
+    :return: Novo DataFrame com as colunas traduzidas
+    """
+    traducoes = TRADUCOES_COLUNAS if traducoes is None else traducoes
+    df = df.copy(deep=False)
+    for coluna, (tabela, coluna_codigo, coluna_nome) in traducoes.items():
+        if coluna not in df.columns:
+            continue
+        mapeamento = obter_mapeamento(tabela, coluna_codigo, coluna_nome, caminho)
+        if not mapeamento:
+            continue
+        largura = max(len(codigo) for codigo in mapeamento)
+        codigos, unicos = pd.factorize(df[coluna])
+        nomes = [mapeamento.get(_normalizar_codigo(valor, largura), str(valor)) for valor in unicos]
+        # Códigos diferentes podem ter o mesmo nome; as categorias precisam ser únicas
+        posicao_nome, categorias = pd.factorize(pd.Index(nomes, dtype=object))
+        novos_codigos = np.where(codigos >= 0, posicao_nome[codigos] if len(nomes) else codigos, -1)
+        df[coluna] = pd.Categorical.from_codes(novos_codigos, categories=categorias.astype(str))
+    return df
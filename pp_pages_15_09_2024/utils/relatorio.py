@@ -0,0 +1,416 @@
+import concurrent.futures
+import hashlib
+import html
+import io
+import os
+import zipfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.esquema import rotulo_coluna
+from utils.dataset import coluna_numerica
+from utils.formatacao import aplicar_formatacoes_colunas
+
+# Colunas das tabelas do mapa de preços, na ordem em que aparecem
+COLUNAS_RELATORIO = [
+    'codigoItemCatalogo', 'descricaoItem', 'nomeFornecedor', 'niFornecedor', 'marca', 'nomeUasg',
+    'municipio', 'estado', 'modalidade', 'dataResultado', 'quantidade', 'precoUnitario',
+]
+# Coluna que identifica o item em buscas de um ou vários itens
+COLUNAS_ITEM = ['codigoItemPesquisado', 'codigoItemCatalogo']
+# Faixas do histograma de preços
+FAIXAS_HISTOGRAMA = 20
+# O PDF lista no máximo estas linhas por tabela (HTML e XLSX trazem todas)
+MAX_LINHAS_PDF = 300
+FORMATOS_RELATORIO = {
+    'html': ('text/html', 'html'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+# Processos usados na exportação de vários itens
+MAX_PROCESSOS_EXPORTACAO = min(4, os.cpu_count() or 1)
+
+
+def _moeda(valor):
+    return "-" if pd.isna(valor) else f"R$ {valor:.2f}"
+
+
+def _impressao(*partes):
+    """Hash das entradas de uma seção: Series, DataFrames ou valores simples."""
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        if isinstance(parte, (pd.Series, pd.DataFrame)):
+            h.update(pd.util.hash_pandas_object(parte, index=True).to_numpy().tobytes())
+            h.update(repr(list(parte.columns) if isinstance(parte, pd.DataFrame) else parte.name).encode())
+        else:
+            h.update(repr(parte).encode())
+    return h.hexdigest()
+
+
+def separar_linhas(df, df_analise):
+    """
+    Separa as linhas aceitas e as excluídas da análise crítica.
+
+    Excluídas são as marcadas em Desconsiderar e as que saíram do df_analise
+    pelos botões de exclusão (o índice do df original é mantido na análise).
+
+    :return: (aceitas, excluidas), DataFrames com o índice do df original
+    """
+    if df_analise is None:
+        return df, df.iloc[0:0]
+    aceitas = df_analise
+    if 'Desconsiderar' in df_analise.columns:
+        aceitas = df_analise[df_analise['Desconsiderar'] != 'Sim']
+    removidas = df.loc[df.index.difference(df_analise.index)] if df is not None else df_analise.iloc[0:0]
+    marcadas = df_analise.loc[df_analise.index.difference(aceitas.index)]
+    excluidas = pd.concat([marcadas, removidas]) if len(removidas) else marcadas
+    return aceitas, excluidas
+
+
+# --- Seções -----------------------------------------------------------------
+
+def secao_estatisticas(precos):
+    validos = precos.dropna()
+    media = validos.mean()
+    desvio = validos.std()
+    cv = (desvio / media) * 100 if len(validos) > 1 and media else 0.0
+    return {
+        'titulo': 'Estatísticas dos preços aceitos',
+        'tipo': 'metricas',
+        'dados': [
+            ('Registros com preço', str(len(validos))),
+            ('Média', _moeda(media)),
+            ('Mediana', _moeda(validos.median())),
+            ('Menor preço', _moeda(validos.min())),
+            ('Maior preço', _moeda(validos.max())),
+            ('Desvio padrão', _moeda(desvio)),
+            ('Limite inferior (média - 2 DP)', _moeda(media - 2 * desvio)),
+            ('Limite superior (média + 2 DP)', _moeda(media + 2 * desvio)),
+            ('Coeficiente de variação', f"{cv:.2f}%"),
+        ],
+    }
+
+
+def secao_resumo_itens(itens, precos, aceitas):
+    """Uma linha por item: registros, aceitos e estatísticas dos preços aceitos."""
+    dados = pd.DataFrame({'item': itens, 'preco': precos, 'aceita': aceitas})
+    aceitos = dados[dados['aceita']]
+    grupos = aceitos.groupby('item', observed=True)['preco']
+    tabela = pd.DataFrame({
+        'Registros': dados.groupby('item', observed=True).size(),
+        'Aceitos': grupos.count(),
+        'Média': grupos.mean(),
+        'Mediana': grupos.median(),
+        'Menor preço': grupos.min(),
+        'Maior preço': grupos.max(),
+        'CV (%)': grupos.std() / grupos.mean() * 100,
+    })
+    tabela['Aceitos'] = tabela['Aceitos'].fillna(0).astype(int)
+    for coluna in ['Média', 'Mediana', 'Menor preço', 'Maior preço']:
+        tabela[coluna] = tabela[coluna].map(_moeda)
+    tabela['CV (%)'] = tabela['CV (%)'].map(lambda v: "-" if pd.isna(v) else f"{v:.2f}")
+    tabela = tabela.reset_index().rename(columns={'item': 'Item'})
+    return {'titulo': 'Resumo por item', 'tipo': 'tabela', 'dados': tabela}
+
+
+def secao_tabela(titulo, df):
+    colunas = [c for c in COLUNAS_RELATORIO if c in df.columns]
+    tabela = aplicar_formatacoes_colunas(df[colunas].copy(deep=False))
+    tabela = tabela.astype(object).where(tabela.notna(), '')
+    return {'titulo': titulo, 'tipo': 'tabela', 'dados': tabela.rename(columns=rotulo_coluna).reset_index(drop=True)}
+
+
+def secao_histograma(precos):
+    validos = precos.dropna().to_numpy(dtype='float64')
+    if len(validos) == 0:
+        contagens, bordas = np.array([], dtype=int), np.array([0.0])
+    else:
+        contagens, bordas = np.histogram(validos, bins=FAIXAS_HISTOGRAMA)
+    return {
+        'titulo': 'Distribuição dos preços aceitos',
+        'tipo': 'histograma',
+        'dados': {'bordas': bordas.tolist(), 'contagens': contagens.tolist()},
+    }
+
+
+class CacheSecoes:
+    """
+    Guarda as seções já montadas e as versões renderizadas de cada uma.
+
+    Cada seção é identificada pelo hash das suas entradas, então só as seções
+    cujas entradas mudaram são refeitas: trocar o título ou voltar a uma
+    marcação anterior reaproveita tudo, e desconsiderar uma linha não refaz o
+    resumo dos outros itens. As entradas mais antigas saem quando o cache
+    passa de `max_entradas`.
+    """
+
+    def __init__(self, max_entradas=64):
+        self.max_entradas = max_entradas
+        self._secoes = {}
+        self._renderizadas = {}
+        self.montadas = 0
+        self.reaproveitadas = 0
+
+    def secao(self, chave, construir):
+        if chave in self._secoes:
+            self.reaproveitadas += 1
+            return self._secoes[chave]
+        self.montadas += 1
+        if len(self._secoes) >= self.max_entradas:
+            self._secoes.pop(next(iter(self._secoes)))
+        self._secoes[chave] = construir()
+        return self._secoes[chave]
+
+    def renderizada(self, chave, formato, renderizar):
+        if (chave, formato) not in self._renderizadas:
+            if len(self._renderizadas) >= self.max_entradas:
+                self._renderizadas.pop(next(iter(self._renderizadas)))
+            self._renderizadas[(chave, formato)] = renderizar()
+        return self._renderizadas[(chave, formato)]
+
+
+def montar_relatorio(df, df_analise=None, titulo="Mapa de preços", cache=None):
+    """
+    Monta as seções do mapa de preços a partir dos dados e da análise crítica.
+
+    :param df: DataFrame com todos os registros buscados
+    :param df_analise: DataFrame da análise crítica (None usa todos os registros como aceitos)
+    :param cache: CacheSecoes para reaproveitar seções entre chamadas
+    :return: Dicionário com 'titulo', 'gerado_em' e 'secoes' (lista de (chave, seção))
+    """
+    cache = cache if cache is not None else CacheSecoes()
+    aceitas, excluidas = separar_linhas(df, df_analise)
+    precos_aceitos = coluna_numerica(aceitas, 'precoUnitario') if 'precoUnitario' in aceitas.columns else pd.Series(dtype='float64')
+
+    base = df if df is not None else df_analise
+    coluna_item = next((c for c in COLUNAS_ITEM if c in base.columns), None)
+    secoes = []
+
+    chave = _impressao('estatisticas', precos_aceitos)
+    secoes.append((chave, cache.secao(chave, lambda: secao_estatisticas(precos_aceitos))))
+
+    if coluna_item is not None and 'precoUnitario' in base.columns:
+        itens = base[coluna_item].astype(str)
+        precos = coluna_numerica(base, 'precoUnitario')
+        mascara = pd.Series(base.index.isin(aceitas.index), index=base.index)
+        chave = _impressao('resumo_itens', itens, precos, mascara)
+        secoes.append((chave, cache.secao(chave, lambda: secao_resumo_itens(itens, precos, mascara))))
+
+    chave = _impressao('histograma', precos_aceitos)
+    secoes.append((chave, cache.secao(chave, lambda: secao_histograma(precos_aceitos))))
+
+    colunas = [c for c in COLUNAS_RELATORIO if c in base.columns]
+    chave = _impressao('aceitas', aceitas[colunas])
+    secoes.append((chave, cache.secao(chave, lambda: secao_tabela('Preços aceitos', aceitas))))
+    chave = _impressao('excluidas', excluidas[colunas])
+    secoes.append((chave, cache.secao(chave, lambda: secao_tabela('Preços excluídos', excluidas))))
+
+    return {'titulo': titulo, 'gerado_em': datetime.now().strftime('%d/%m/%Y %H:%M'), 'secoes': secoes}
+
+
+# --- HTML -------------------------------------------------------------------
+
+def _histograma_svg(dados, largura=640, altura=220):
+    contagens, bordas = dados['contagens'], dados['bordas']
+    if not contagens:
+        return "<p>Sem preços para exibir.</p>"
+    maximo = max(contagens) or 1
+    barra = largura / len(contagens)
+    retangulos = []
+    for i, contagem in enumerate(contagens):
+        h = (altura - 30) * contagem / maximo
+        retangulos.append(
+            f'<rect x="{i * barra:.1f}" y="{altura - 20 - h:.1f}" width="{barra - 2:.1f}" height="{h:.1f}" fill="#4c78a8">'
+            f'<title>{_moeda(bordas[i])} a {_moeda(bordas[i + 1])}: {contagem}</title></rect>'
+        )
+    return (
+        f'<svg width="{largura}" height="{altura}" xmlns="http://www.w3.org/2000/svg">{"".join(retangulos)}'
+        f'<text x="0" y="{altura - 4}" font-size="11">{_moeda(bordas[0])}</text>'
+        f'<text x="{largura}" y="{altura - 4}" font-size="11" text-anchor="end">{_moeda(bordas[-1])}</text></svg>'
+    )
+
+
+def _secao_html(secao):
+    titulo = f"<h2>{html.escape(secao['titulo'])}</h2>"
+    if secao['tipo'] == 'metricas':
+        linhas = "".join(f"<tr><th>{html.escape(r)}</th><td>{html.escape(v)}</td></tr>" for r, v in secao['dados'])
+        return f"{titulo}<table class='metricas'>{linhas}</table>"
+    if secao['tipo'] == 'histograma':
+        return titulo + _histograma_svg(secao['dados'])
+    tabela = secao['dados']
+    if tabela.empty:
+        return f"{titulo}<p>Nenhum registro.</p>"
+    # Montado coluna a coluna: bem mais rápido que DataFrame.to_html em tabelas grandes
+    cabecalho = "".join(f"<th>{html.escape(str(c))}</th>" for c in tabela.columns)
+    celulas = [("<td>" + tabela[c].astype(str).map(html.escape) + "</td>").to_numpy(dtype=object) for c in tabela.columns]
+    linhas = "".join("<tr>" + "".join(linha) + "</tr>" for linha in zip(*celulas))
+    return f"{titulo}<table><thead><tr>{cabecalho}</tr></thead><tbody>{linhas}</tbody></table>"
+
+
+def gerar_html(relatorio, cache=None):
+    cache = cache if cache is not None else CacheSecoes()
+    corpo = "".join(cache.renderizada(chave, 'html', lambda s=secao: _secao_html(s)) for chave, secao in relatorio['secoes'])
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>{html.escape(relatorio['titulo'])}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; font-size: 12px; margin-bottom: 1.5em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; }}
+th {{ background: #f0f0f0; }}
+</style></head><body>
+<h1>{html.escape(relatorio['titulo'])}</h1><p>Gerado em {relatorio['gerado_em']}</p>
+{corpo}
+</body></html>""".encode('utf-8')
+
+
+# --- XLSX -------------------------------------------------------------------
+
+def gerar_xlsx(relatorio, cache=None):
+    """Planilha com uma aba por seção. Requer o pacote openpyxl."""
+    try:
+        from openpyxl.chart import BarChart, Reference
+    except ImportError:
+        raise RuntimeError("Exportar para XLSX requer o pacote openpyxl (pip install openpyxl)")
+
+    saida = io.BytesIO()
+    with pd.ExcelWriter(saida, engine='openpyxl') as writer:
+        for _, secao in relatorio['secoes']:
+            aba = secao['titulo'][:31]
+            if secao['tipo'] == 'metricas':
+                pd.DataFrame(secao['dados'], columns=['Estatística', 'Valor']).to_excel(writer, sheet_name=aba, index=False)
+            elif secao['tipo'] == 'histograma':
+                bordas, contagens = secao['dados']['bordas'], secao['dados']['contagens']
+                faixas = [f"{bordas[i]:.2f} a {bordas[i + 1]:.2f}" for i in range(len(contagens))]
+                pd.DataFrame({'Faixa de preço': faixas, 'Registros': contagens}).to_excel(writer, sheet_name=aba, index=False)
+                if contagens:
+                    planilha = writer.sheets[aba]
+                    grafico = BarChart()
+                    grafico.title = secao['titulo']
+                    grafico.add_data(Reference(planilha, min_col=2, min_row=1, max_row=len(contagens) + 1), titles_from_data=True)
+                    grafico.set_categories(Reference(planilha, min_col=1, min_row=2, max_row=len(contagens) + 1))
+                    planilha.add_chart(grafico, "D2")
+            else:
+                secao['dados'].to_excel(writer, sheet_name=aba, index=False)
+    return saida.getvalue()
+
+
+# --- PDF --------------------------------------------------------------------
+
+def _texto_pdf(valor):
+    # As fontes padrão do PDF só cobrem latin-1
+    return str(valor).encode('latin-1', 'replace').decode('latin-1')
+
+
+def gerar_pdf(relatorio, cache=None):
+    """PDF paisagem com métricas, histograma e tabelas. Requer o pacote fpdf2."""
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        raise RuntimeError("Exportar para PDF requer o pacote fpdf2 (pip install fpdf2)")
+
+    pdf = FPDF(orientation='L', format='A4')
+    pdf.set_auto_page_break(auto=True, margin=12)
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.cell(0, 10, _texto_pdf(relatorio['titulo']), new_x='LMARGIN', new_y='NEXT')
+    pdf.set_font('Helvetica', '', 9)
+    pdf.cell(0, 6, _texto_pdf(f"Gerado em {relatorio['gerado_em']}"), new_x='LMARGIN', new_y='NEXT')
+
+    for _, secao in relatorio['secoes']:
+        pdf.ln(4)
+        pdf.set_font('Helvetica', 'B', 12)
+        pdf.cell(0, 8, _texto_pdf(secao['titulo']), new_x='LMARGIN', new_y='NEXT')
+        pdf.set_font('Helvetica', '', 8)
+        if secao['tipo'] == 'metricas':
+            for rotulo, valor in secao['dados']:
+                pdf.cell(70, 5, _texto_pdf(rotulo))
+                pdf.cell(0, 5, _texto_pdf(valor), new_x='LMARGIN', new_y='NEXT')
+        elif secao['tipo'] == 'histograma':
+            contagens = secao['dados']['contagens']
+            if contagens:
+                largura, altura = pdf.epw, 45
+                x0, y0 = pdf.l_margin, pdf.get_y()
+                barra = largura / len(contagens)
+                maximo = max(contagens) or 1
+                pdf.set_fill_color(76, 120, 168)
+                for i, contagem in enumerate(contagens):
+                    h = altura * contagem / maximo
+                    pdf.rect(x0 + i * barra, y0 + altura - h, barra - 1, h, style='F')
+                pdf.set_y(y0 + altura + 1)
+                bordas = secao['dados']['bordas']
+                pdf.cell(largura / 2, 5, _texto_pdf(_moeda(bordas[0])))
+                pdf.cell(largura / 2, 5, _texto_pdf(_moeda(bordas[-1])), align='R', new_x='LMARGIN', new_y='NEXT')
+        else:
+            tabela = secao['dados']
+            if tabela.empty:
+                pdf.cell(0, 5, 'Nenhum registro.', new_x='LMARGIN', new_y='NEXT')
+                continue
+            largura = pdf.epw / len(tabela.columns)
+            pdf.set_font('Helvetica', 'B', 7)
+            for coluna in tabela.columns:
+                pdf.cell(largura, 5, _texto_pdf(coluna)[:30], border=1)
+            pdf.ln()
+            pdf.set_font('Helvetica', '', 7)
+            for linha in tabela.head(MAX_LINHAS_PDF).itertuples(index=False):
+                for valor in linha:
+                    pdf.cell(largura, 5, _texto_pdf(valor)[:int(largura / 1.4)], border=1)
+                pdf.ln()
+            if len(tabela) > MAX_LINHAS_PDF:
+                pdf.cell(0, 5, _texto_pdf(f"... mais {len(tabela) - MAX_LINHAS_PDF} linhas (veja a exportação em HTML ou XLSX)"), new_x='LMARGIN', new_y='NEXT')
+    return bytes(pdf.output())
+
+
+GERADORES = {'html': gerar_html, 'xlsx': gerar_xlsx, 'pdf': gerar_pdf}
+
+
+def exportar_relatorio(relatorio, formato, cache=None):
+    """
+    Bytes do relatório no formato pedido ('html', 'xlsx' ou 'pdf').
+
+    Com `cache`, o arquivo fica guardado enquanto título e seções não mudarem.
+    """
+    if cache is None:
+        return GERADORES[formato](relatorio, cache)
+    versao = (relatorio['titulo'], tuple(chave for chave, _ in relatorio['secoes']))
+    return cache.renderizada(versao, formato, lambda: GERADORES[formato](relatorio, cache))
+
+
+# --- Vários itens -----------------------------------------------------------
+
+def _exportar_item(args):
+    item, df_item, df_analise_item, formato = args
+    relatorio = montar_relatorio(df_item, df_analise_item, titulo=f"Mapa de preços - item {item}")
+    return item, exportar_relatorio(relatorio, formato)
+
+
+def exportar_itens(df, df_analise=None, formato='html', max_processos=MAX_PROCESSOS_EXPORTACAO):
+    """
+    Exporta um relatório por item num arquivo ZIP.
+
+    Cada item é montado e renderizado num processo separado; com um item só
+    (ou max_processos=1) tudo roda no próprio processo.
+
+    :return: Bytes do arquivo ZIP
+    """
+    coluna_item = next((c for c in COLUNAS_ITEM if c in df.columns), None)
+    if coluna_item is None:
+        raise ValueError("Os dados não têm coluna de item para separar os relatórios")
+    itens = df[coluna_item].astype(str)
+    itens_analise = df_analise[coluna_item].astype(str) if df_analise is not None else None
+    tarefas = [
+        (item, df[itens == item], df_analise[itens_analise == item] if df_analise is not None else None, formato)
+        for item in pd.unique(itens)
+    ]
+
+    if max_processos > 1 and len(tarefas) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(max_processos, len(tarefas))) as executor:
+            arquivos = list(executor.map(_exportar_item, tarefas))
+    else:
+        arquivos = [_exportar_item(tarefa) for tarefa in tarefas]
+
+    extensao = FORMATOS_RELATORIO[formato][1]
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zip_saida:
+        for item, conteudo in arquivos:
+            zip_saida.writestr(f"mapa_de_precos_{item}.{extensao}", conteudo)
+    return saida.getvalue()
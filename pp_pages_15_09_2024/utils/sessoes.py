@@ -0,0 +1,156 @@
+import json
+import os
+import re
+from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from utils.analise import AnaliseCritica
+
+# Pasta onde ficam as análises salvas (um arquivo Arrow IPC por sessão)
+PASTA_SESSOES = 'data/sessoes'
+EXTENSAO = '.arrow'
+
+# Chave dos metadados do esquema Arrow com os parâmetros da sessão
+CHAVE_METADADOS = b'pesquisa_precos'
+VERSAO_FORMATO = 1
+
+# Colunas com o estado da análise crítica, alinhadas às linhas dos dados
+COLUNAS_ESTADO = {
+    'desconsideradas': '__desconsiderada',
+    'excluidas': '__excluida',
+    'ordem': '__ordem',
+}
+
+
+def _nome_arquivo(parametros, salvo_em):
+    itens = (parametros or {}).get('itens') or []
+    rotulo = itens[0] if len(itens) == 1 else f"{len(itens)}_itens" if itens else "sessao"
+    periodo = [(parametros or {}).get(chave) for chave in ('data_inicial', 'data_final')]
+    partes = [str(rotulo), *[p for p in periodo if p], salvo_em.strftime('%Y%m%d-%H%M%S')]
+    return re.sub(r'[^\w.-]', '_', "_".join(partes)) + EXTENSAO
+
+
+def salvar_sessao(df, analise=None, parametros=None, pasta=None):
+    """
+    Grava a sessão de análise num arquivo Arrow IPC, sem compressão.
+
+    O arquivo guarda o DataFrame com os tipos que ele tem (categorias, inteiros
+    anuláveis, datas), o estado da análise crítica (linhas desconsideradas,
+    excluídas e a ordem de exibição; o histórico de desfazer não vai junto) e
+    os parâmetros da busca nos metadados. Sem compressão, a leitura pode mapear
+    o arquivo na memória em vez de copiá-lo.
+
+    :param df: DataFrame da busca (st.session_state.df)
+    :param analise: AnaliseCritica sobre df, ou None se a análise ainda não começou
+    :param parametros: Dicionário com os parâmetros da busca (itens, datas...), serializável em JSON
+    :return: Caminho do arquivo gravado
+    """
+    pasta = pasta or PASTA_SESSOES
+    os.makedirs(pasta, exist_ok=True)
+    salvo_em = datetime.now()
+    tabela = pa.Table.from_pandas(df, preserve_index=True)
+    if analise is not None:
+        estado = analise.estado()
+        if len(estado['ordem']) != len(df):
+            raise ValueError("A análise não corresponde aos dados da sessão")
+        for chave, coluna in COLUNAS_ESTADO.items():
+            tabela = tabela.append_column(coluna, pa.array(estado[chave]))
+    metadados = {
+        'versao': VERSAO_FORMATO,
+        'salvo_em': salvo_em.isoformat(timespec='seconds'),
+        'registros': len(df),
+        'analise': analise is not None,
+        'parametros': parametros or {},
+    }
+    tabela = tabela.replace_schema_metadata({
+        **(tabela.schema.metadata or {}),
+        CHAVE_METADADOS: json.dumps(metadados, ensure_ascii=False, default=str).encode(),
+    })
+
+    caminho = os.path.join(pasta, _nome_arquivo(parametros, salvo_em))
+    # Gravado ao lado e renomeado: uma sessão interrompida no meio nunca aparece na lista
+    temporario = caminho + '.tmp'
+    with pa.OSFile(temporario, 'wb') as arquivo, ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _ler_metadados(schema):
+    bruto = (schema.metadata or {}).get(CHAVE_METADADOS)
+    if bruto is None:
+        raise ValueError("O arquivo não é uma sessão salva pelo app")
+    metadados = json.loads(bruto)
+    if metadados.get('versao') != VERSAO_FORMATO:
+        raise ValueError(f"Sessão salva em outro formato (versão {metadados.get('versao')})")
+    return metadados
+
+
+def abrir_sessao(caminho):
+    """
+    Reabre uma sessão salva por salvar_sessao, sem consultar a API.
+
+    O arquivo é mapeado na memória: as colunas numéricas sem nulos do
+    DataFrame apontam direto para o arquivo (somente leitura) e as demais são
+    montadas a partir dele. A análise crítica volta com as mesmas marcações.
+
+    :return: Dicionário com df, analise (AnaliseCritica ou None), parametros, salvo_em e caminho
+    """
+    with pa.memory_map(caminho, 'r') as origem:
+        tabela = ipc.open_file(origem).read_all()
+    metadados = _ler_metadados(tabela.schema)
+
+    estado = None
+    if metadados['analise']:
+        estado = {chave: tabela.column(coluna).to_numpy() for chave, coluna in COLUNAS_ESTADO.items()}
+        tabela = tabela.drop_columns(list(COLUNAS_ESTADO.values()))
+    df = tabela.to_pandas(split_blocks=True)
+
+    analise = None
+    if estado is not None:
+        analise = AnaliseCritica.restaurar(
+            df, np.asarray(estado['desconsideradas'], dtype=bool), np.asarray(estado['excluidas'], dtype=bool), estado['ordem'],
+        )
+    return {
+        'df': df,
+        'analise': analise,
+        'parametros': metadados['parametros'],
+        'salvo_em': metadados['salvo_em'],
+        'caminho': caminho,
+    }
+
+
+def listar_sessoes(pasta=None):
+    """
+    Sessões salvas na pasta, da mais recente para a mais antiga.
+
+    Lê só os metadados de cada arquivo (o rodapé do Arrow IPC), não os dados.
+    Arquivos que não são sessões do app ficam de fora.
+
+    :return: Lista de dicionários com caminho, salvo_em, registros, analise e parametros
+    """
+    pasta = pasta or PASTA_SESSOES
+    if not os.path.isdir(pasta):
+        return []
+    sessoes = []
+    for nome in os.listdir(pasta):
+        if not nome.endswith(EXTENSAO):
+            continue
+        caminho = os.path.join(pasta, nome)
+        try:
+            with pa.memory_map(caminho, 'r') as origem:
+                metadados = _ler_metadados(ipc.open_file(origem).schema)
+        except (pa.ArrowInvalid, ValueError):
+            continue
+        sessoes.append({'caminho': caminho, **{chave: metadados[chave] for chave in ('salvo_em', 'registros', 'analise', 'parametros')}})
+    return sorted(sessoes, key=lambda sessao: sessao['salvo_em'], reverse=True)
+
+
+def descrever_sessao(sessao):
+    """Texto curto da sessão para listas de seleção."""
+    parametros = sessao['parametros']
+    itens = ", ".join(map(str, parametros.get('itens') or [])) or "sem item"
+    periodo = f"{parametros['data_inicial']} a {parametros['data_final']}" if parametros.get('data_inicial') else ""
+    salvo_em = sessao['salvo_em'].replace('T', ' ')
+    return " · ".join(parte for parte in (itens, periodo, f"{sessao['registros']} registros", salvo_em) if parte)
@@ -1,11 +1,9 @@
+import io
 import re
 import numpy as np
-import locale
 from datetime import datetime
 import pandas as pd
-
-# Configurar a localização para usar vírgula como separador decimal
-locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+from utils.formatacao import formatar_inteiro_agrupado
 
 def aplicar_mascara(valor, tipo):
     """
@@ -34,7 +32,7 @@ def aplicar_mascara(valor, tipo):
     if tipo == 'quantidade':
         try:
             numero = float(str(valor).replace('.', '').replace(',', '.'))
-            return locale.format_string('%.0f', numero, grouping=True)
+            return formatar_inteiro_agrupado(numero)
         except ValueError:
             return str(valor)
 
@@ -96,4 +94,35 @@ def limpar_e_converter(valor):
     try:
         return float(valor)
     except ValueError:
-        return None
\ No newline at end of file
+        return None
+
+def extrair_codigos_itens(texto):
+    """
+    Extrai os códigos CATMAT de um texto livre (separados por vírgula, ponto e vírgula, espaço ou linha).
+
+    :return: Lista de códigos sem repetição, na ordem em que aparecem
+    """
+    codigos = re.findall(r'\d+', texto or '')
+    return list(dict.fromkeys(codigos))
+
+def ler_codigos_csv(arquivo):
+    """
+    Lê os códigos CATMAT de um CSV.
+
+    Usa a coluna cujo nome contém 'codigo' ou 'catmat'; se não houver, usa a
+    primeira coluna. Um arquivo sem cabeçalho (só códigos) também é aceito.
+    """
+    conteudo = arquivo.read()
+    if isinstance(conteudo, bytes):
+        conteudo = conteudo.decode('utf-8-sig', errors='ignore')
+    if not conteudo.strip():
+        return []
+    primeira_linha = conteudo.splitlines()[0]
+    separador = next((s for s in [';', '\t', ',', '|'] if s in primeira_linha), ',')
+    df = pd.read_csv(io.StringIO(conteudo), sep=separador, dtype=str)
+    coluna = next((c for c in df.columns if 'codigo' in c.lower() or 'catmat' in c.lower()), df.columns[0])
+    valores = list(df[coluna].dropna())
+    if str(coluna).strip().isdigit():
+        # O "cabeçalho" é na verdade o primeiro código
+        valores.insert(0, coluna)
+    return extrair_codigos_itens('\n'.join(valores))
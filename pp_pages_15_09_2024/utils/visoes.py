@@ -0,0 +1,134 @@
+import hashlib
+import itertools
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+import pandas as pd
+
+# Memória máxima das visões guardadas (todas as sessões do servidor)
+MAX_BYTES_VISOES = 256 * 1024 * 1024
+
+# Impressões já calculadas, por objeto DataFrame (evita refazer o hash a cada rerun).
+# DataFrames não são hasháveis, então a chave é o id() e a referência fraca confirma o objeto.
+_impressoes = {}
+
+
+def impressao_dataset(df):
+    """
+    Hash do conteúdo do DataFrame: colunas, tipos, índice e valores.
+
+    DataFrames com os mesmos dados têm a mesma impressão, mesmo sendo objetos
+    diferentes. O resultado fica guardado para o objeto, então o DataFrame não
+    deve ser alterado no lugar depois de passar por aqui.
+    """
+    guardada = _impressoes.get(id(df))
+    if guardada is not None and guardada[0]() is df:
+        return guardada[1]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(zip(df.columns, map(str, df.dtypes)))).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    impressao = h.hexdigest()
+    chave = id(df)
+    _impressoes[chave] = (weakref.ref(df, lambda _: _impressoes.pop(chave, None)), impressao)
+    return impressao
+
+
+# Versão de cada objeto já visto pelo cache de visões: um número que nunca se repete,
+# nem entre sessões, guardado enquanto o objeto existir
+_versoes = {}
+_proxima_versao = itertools.count(1)
+
+
+def versao_objeto(objeto):
+    """
+    Número que identifica o objeto enquanto ele existir, em O(1).
+
+    Os dados da sessão não são alterados no lugar (cada mudança gera um
+    DataFrame novo), então o próprio objeto serve de versão, sem ler o conteúdo.
+    """
+    guardada = _versoes.get(id(objeto))
+    if guardada is not None and guardada[0]() is objeto:
+        return guardada[1]
+    versao = next(_proxima_versao)
+    chave = id(objeto)
+    _versoes[chave] = (weakref.ref(objeto, lambda _: _versoes.pop(chave, None)), versao)
+    return versao
+
+
+def _tamanho(valor):
+    """Bytes aproximados de uma visão guardada."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True, index=True)
+        return int(uso.sum() if isinstance(uso, pd.Series) else uso)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanho(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_tamanho(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheVisoes:
+    """
+    Cache LRU das visões derivadas dos dados (tabela formatada, máscara de
+    outliers, dados dos gráficos...), com limite de memória.
+
+    Cada visão é identificada pelo nome, pela versão dos dados de origem
+    (o objeto DataFrame e, se houver, um contador de alterações) e pelos
+    parâmetros, sem ler o conteúdo dos dados. Um rerun que não muda nada
+    encontra tudo pronto; as visões menos usadas saem quando o total passa de
+    `max_bytes`. Os valores são compartilhados e não devem ser alterados.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES_VISOES):
+        self.max_bytes = max_bytes
+        self._visoes = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+
+    def __len__(self):
+        return len(self._visoes)
+
+    def obter(self, chave, construir):
+        with self._lock:
+            if chave in self._visoes:
+                self._visoes.move_to_end(chave)
+                self.acertos += 1
+                return self._visoes[chave][0]
+        # Montada fora do lock; duas sessões podem montar a mesma visão ao mesmo tempo
+        valor = construir()
+        tamanho = _tamanho(valor)
+        with self._lock:
+            self.faltas += 1
+            if tamanho > self.max_bytes:
+                return valor
+            anterior = self._visoes.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+            self._visoes[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, (_, removido) = self._visoes.popitem(last=False)
+                self.bytes -= removido
+        return valor
+
+    def visao(self, nome, df, construir, versao=None, **parametros):
+        """
+        Visão `nome` do DataFrame com os parâmetros dados, montada por
+        `construir()` só quando os dados ou os parâmetros mudam.
+
+        :param versao: Contador de alterações de df, quando ele muda sem virar
+            outro objeto (como AnaliseCritica.versao_linhas para a base da análise)
+        """
+        chave = (nome, versao_objeto(df), versao, tuple(sorted(parametros.items())))
+        return self.obter(chave, construir)
+
+    def limpar(self):
+        with self._lock:
+            self._visoes.clear()
+            self.bytes = 0
+
+
+cache_visoes = CacheVisoes()